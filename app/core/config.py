@@ -0,0 +1,89 @@
+# Arquivo: app/core/config.py
+import os
+
+# Pasta raiz onde ficam APKs, relatórios e artefatos gerados
+STORAGE_DIR = os.getenv("SURF_STORAGE_DIR", "storage")
+
+# Fila de jobs: quantidade de pipelines executando em paralelo
+JOB_MAX_WORKERS = int(os.getenv("SURF_JOB_MAX_WORKERS", "4"))
+
+# Quantos jobs finalizados manter em memória para consulta
+JOB_HISTORICO_MAX = int(os.getenv("SURF_JOB_HISTORICO_MAX", "200"))
+
+# Cache de resultados: versão do analisador/regras (entra na chave do cache)
+# e tamanho máximo em disco antes da remoção dos itens menos usados (LRU)
+ANALYZER_VERSION = "2.6.1"
+CACHE_MAX_BYTES = int(os.getenv("SURF_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+# Pool de processos do SAST (um processo por arquivo DEX / arquivo de código)
+# SURF_SAST_PROCESSOS=0 desativa o pool e executa tudo no processo do servidor
+SAST_PROCESSOS = int(os.getenv("SURF_SAST_PROCESSOS", str(os.cpu_count() or 1)))
+SAST_TIMEOUT_TAREFA = int(os.getenv("SURF_SAST_TIMEOUT", "300"))
+SAST_MEMORIA_MB = int(os.getenv("SURF_SAST_MEMORIA_MB", "2048"))
+
+# Uploads: tamanho máximo aceito por arquivo e validade das sessões de upload
+# retomável (sessões paradas há mais tempo são descartadas)
+UPLOAD_MAX_BYTES = int(os.getenv("SURF_UPLOAD_MAX_MB", "512")) * 1024 * 1024
+UPLOAD_SESSAO_TTL = int(os.getenv("SURF_UPLOAD_SESSAO_TTL", str(24 * 3600)))
+
+# Limites em disco dos uploads concluídos (storage/blobs) e dos modelos de APK
+# serializados (storage/apk_models); acima deles, os mais antigos são removidos
+BLOBS_MAX_BYTES = int(os.getenv("SURF_BLOBS_MAX_MB", "4096")) * 1024 * 1024
+APK_MODELOS_MAX_BYTES = int(os.getenv("SURF_APK_MODELOS_MAX_MB", "1024")) * 1024 * 1024
+
+# Eventos de progresso (SSE): quantos eventos por job ficam guardados para replay
+EVENTOS_BUFFER_MAX = int(os.getenv("SURF_EVENTOS_BUFFER_MAX", "2000"))
+
+# Pool de workers do pytest (processos pré-aquecidos que executam as suítes fora
+# do servidor). SURF_PYTEST_PROCESSOS=0 volta a rodar o pytest no próprio processo.
+PYTEST_PROCESSOS = int(os.getenv("SURF_PYTEST_PROCESSOS", "2"))
+PYTEST_TIMEOUT = int(os.getenv("SURF_PYTEST_TIMEOUT", "1800"))
+PYTEST_MAX_EXECUCOES = int(os.getenv("SURF_PYTEST_MAX_EXECUCOES", "20"))
+
+# Suítes estáticas (tests_repo) são divididas em fatias executadas em paralelo
+# nos workers do pytest; 1 executa a suíte inteira em um único worker
+PYTEST_FATIAS = int(os.getenv("SURF_PYTEST_FATIAS", str(max(PYTEST_PROCESSOS, 1))))
+
+# Farm de dispositivos: cada job de testes mobile arrenda um celular (adb) e uma
+# porta de Appium (a partir de APPIUM_PORTA_INICIAL). Dispositivos que falham
+# DISPOSITIVO_MAX_FALHAS vezes seguidas ficam em quarentena por DISPOSITIVO_QUARENTENA_S.
+ADB_CMD = os.getenv("SURF_ADB", "adb")
+APPIUM_HOST = os.getenv("SURF_APPIUM_HOST", "localhost")
+APPIUM_PORTA_INICIAL = int(os.getenv("SURF_APPIUM_PORTA_INICIAL", "4723"))
+APPIUM_INICIAR = os.getenv("SURF_APPIUM_INICIAR", "0") == "1"
+DISPOSITIVO_ESPERA_S = int(os.getenv("SURF_DISPOSITIVO_ESPERA_S", "600"))
+DISPOSITIVO_MAX_FALHAS = int(os.getenv("SURF_DISPOSITIVO_MAX_FALHAS", "3"))
+DISPOSITIVO_QUARENTENA_S = int(os.getenv("SURF_DISPOSITIVO_QUARENTENA_S", "900"))
+
+# Sessões do Appium mantidas abertas entre jobs (por dispositivo, dentro do worker
+# do pytest): recicladas após SESSAO_MAX_USOS execuções ou em caso de erro.
+# SURF_APPIUM_LIMPAR_DADOS=1 executa `pm clear` no app a cada reuso.
+SESSAO_REUSO = os.getenv("SURF_APPIUM_REUSO", "1") == "1"
+SESSAO_MAX_USOS = int(os.getenv("SURF_APPIUM_SESSAO_MAX_USOS", "20"))
+SESSAO_LIMPAR_DADOS = os.getenv("SURF_APPIUM_LIMPAR_DADOS", "0") == "1"
+
+# Métricas de runtime coletadas no dispositivo durante os testes mobile
+# (inicialização via `am start -W`, memória, CPU e frames) e limites do Quality Gate
+METRICAS_RUNTIME = os.getenv("SURF_METRICAS_RUNTIME", "1") == "1"
+METRICAS_INTERVALO_S = float(os.getenv("SURF_METRICAS_INTERVALO_S", "1.0"))
+METRICAS_REPETICOES_INICIALIZACAO = int(os.getenv("SURF_METRICAS_REPETICOES_INICIALIZACAO", "3"))
+LIMITE_INICIALIZACAO_FRIO_MS = int(os.getenv("SURF_LIMITE_INICIALIZACAO_FRIO_MS", "2000"))
+LIMITE_MEMORIA_PSS_MB = int(os.getenv("SURF_LIMITE_MEMORIA_PSS_MB", "300"))
+LIMITE_CPU_PERCENTUAL = int(os.getenv("SURF_LIMITE_CPU_PERCENTUAL", "80"))
+LIMITE_JANK_PERCENTUAL = int(os.getenv("SURF_LIMITE_JANK_PERCENTUAL", "10"))
+
+# Checagens simuladas da suíte estática (tests_repo, marcador `simulado`): desativadas
+# por padrão para que o mesmo APK sempre tenha o mesmo resultado. Quando ativadas,
+# os sorteios usam uma semente derivada do SHA-256 do APK (e entram na chave do cache).
+TESTES_SIMULADOS = os.getenv("SURF_TESTES_SIMULADOS", "0") == "1"
+
+# Relatórios PDF: gerados em segundo plano (pool de processos próprio) depois que
+# o Quality Gate decide; SURF_RELATORIO_PROCESSOS=0 gera em uma thread do servidor
+RELATORIO_PROCESSOS = int(os.getenv("SURF_RELATORIO_PROCESSOS", "1"))
+RELATORIO_TIMEOUT = int(os.getenv("SURF_RELATORIO_TIMEOUT", "600"))
+
+# Dados internos do servidor: fora do STORAGE_DIR, que é servido publicamente em /storage
+DATA_DIR = os.getenv("SURF_DATA_DIR", "data")
+
+# Histórico persistente das análises (SQLite): execuções, achados e resultados de teste
+RUNS_DB = os.getenv("SURF_RUNS_DB", os.path.join(DATA_DIR, "runs.db"))
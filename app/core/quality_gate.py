@@ -1,5 +1,9 @@
 # Arquivo: app/core/quality_gate.py
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import (
+    LIMITE_CPU_PERCENTUAL, LIMITE_INICIALIZACAO_FRIO_MS, LIMITE_JANK_PERCENTUAL, LIMITE_MEMORIA_PSS_MB,
+)
 
 class QualityGateEvaluator:
     @staticmethod
@@ -34,4 +38,29 @@ class QualityGateEvaluator:
                 motivos.append(f"Concentração de falhas na área '{area}': {qtd} (Limite: {limite:.1f})")
 
         aprovado = len(motivos) == 0
-        return aprovado, motivos
\ No newline at end of file
+        return aprovado, motivos
+
+    @staticmethod
+    def avaliar_metricas_runtime(metricas: Optional[Dict]) -> Tuple[bool, List[str]]:
+        """Limites de performance medidos no dispositivo (resumo do MetricsSampler)."""
+        motivos = []
+        if not metricas:
+            return True, motivos
+
+        frio = metricas.get("inicializacao", {}).get("frio_ms", {})
+        if frio.get("p50") is not None and frio["p50"] > LIMITE_INICIALIZACAO_FRIO_MS:
+            motivos.append(f"[RUNTIME] Inicialização a frio lenta: p50 {frio['p50']:.0f} ms (Meta: < {LIMITE_INICIALIZACAO_FRIO_MS} ms)")
+
+        memoria = metricas.get("memoria_pss_mb", {}).get("resumo", {})
+        if memoria.get("p95") is not None and memoria["p95"] > LIMITE_MEMORIA_PSS_MB:
+            motivos.append(f"[RUNTIME] Consumo de memória alto: p95 {memoria['p95']:.1f} MB (Máx: {LIMITE_MEMORIA_PSS_MB} MB)")
+
+        cpu = metricas.get("cpu_percentual", {}).get("resumo", {})
+        if cpu.get("p95") is not None and cpu["p95"] > LIMITE_CPU_PERCENTUAL:
+            motivos.append(f"[RUNTIME] Uso de CPU alto: p95 {cpu['p95']:.1f}% (Máx: {LIMITE_CPU_PERCENTUAL}%)")
+
+        jank = metricas.get("frames", {}).get("percentual_janky")
+        if jank is not None and jank > LIMITE_JANK_PERCENTUAL:
+            motivos.append(f"[RUNTIME] Frames lentos (Jank): {jank:.1f}% (Máx: {LIMITE_JANK_PERCENTUAL}%)")
+
+        return len(motivos) == 0, motivos
@@ -1,32 +1,96 @@
 # Arquivo: app/main.py
+import asyncio
+import json
 import shutil
 import os
-import socket
-import time
-from fastapi import FastAPI, UploadFile, File, Form
+from typing import Optional, Tuple
+from fastapi import FastAPI, Form, Header, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from app.core.config import JOB_HISTORICO_MAX, STORAGE_DIR
 from app.models.schemas import ExecutionRequest, TestResultInput, QualityGateResponse, FaseTeste
-from app.services.test_runner import TestRunner
-from app.core.quality_gate import QualityGateEvaluator
-from app.services.pdf_reporter import PDFReporter
-from app.services.apk_analyzer import ApkAnalyzer
+from app.services.device_pool import pool_dispositivos
+from app.services.event_bus import EVENTO_FIM, barramento_eventos
+from app.services.exporters import ARTEFATOS, ArtifactExporter
+from app.services.job_queue import fila_jobs
+from app.services.pipeline import AnalysisPipeline
+from app.services.pytest_pool import pool_pytest
+from app.services.report_queue import fila_relatorios
+from app.services.result_cache import ResultCache, cache_resultados
+from app.services.result_views import TAMANHO_PAGINA, ResultViews
+from app.services.run_store import historico_execucoes
+from app.services.upload_service import UploadRejected, UploadService
+from app.services.upload_sessions import sessoes_upload
 
 app = FastAPI(title="PyQualityGate Platform")
 
-# Armazena os últimos resultados dos testes (em memória)
-latest_results = {
-    "stats": {
-        "testsRun": 0,
-        "passed": 0,
-        "failed": 0,
-        "coverage": 0
-    },
-    "last_analysis": None,
-    "analysis_in_progress": False,
-    "current_stage": "IDLE"
-}
+def _registrar_execucao(job):
+    """Ouvinte da fila: grava cada job concluído no histórico (estatísticas e última análise)."""
+    if job["status"] != "COMPLETED" or not job["resultado"]:
+        return
+    try:
+        historico_execucoes.registrar(job["resultado"], job["arquivo"])
+    except Exception as e:
+        print(f"Aviso: Falha ao gravar o job {job['id']} no histórico: {e}")
+
+# Último (status, estágio, relatório) publicado por job: o ouvinte é chamado a cada
+# atualização do registro, mas só mudanças de estágio/relatório viram eventos
+_estagios_publicados = {}
+
+def _publicar_estado_job(job):
+    """Ouvinte da fila: publica as transições de estágio no barramento de eventos (SSE)."""
+    relatorio = (job.get("resultado") or {}).get("relatorio_status")
+    estado = (job["status"], job["stage"], relatorio)
+    anterior = _estagios_publicados.get(job["id"])
+    if anterior == estado:
+        return
+    _estagios_publicados[job["id"]] = estado
+
+    if anterior is None or anterior[:2] != estado[:2]:
+        barramento_eventos.publicar(job["id"], "estagio", {
+            "status": job["status"],
+            "stage": job["stage"],
+            "analyses": _progresso_estagios(job["stage"])
+        })
+    if relatorio in ("PRONTO", "ERRO"):
+        # O PDF é gerado depois do Quality Gate: o job já concluiu quando ele fica pronto
+        barramento_eventos.publicar(job["id"], "relatorio", {
+            "status": relatorio,
+            "url": job["resultado"].get("relatorio_pdf"),
+            "erro": job["resultado"].get("relatorio_erro"),
+        })
+    if job["status"] == "ERROR" or (job["status"] == "COMPLETED" and relatorio != "GERANDO"):
+        _estagios_publicados.pop(job["id"], None)
+        barramento_eventos.publicar(job["id"], EVENTO_FIM, {
+            "status": job["status"],
+            "erro": job.get("erro"),
+            "status_url": f"/api/jobs/{job['id']}"
+        })
+
+def _limpar_job_descartado(job):
+    """Ouvinte de descarte da fila: apaga a pasta do job e os uploads que só ele usava."""
+    AnalysisPipeline.remover_pasta_job(job["id"])
+    for sha256 in job.get("blobs", []):
+        UploadService.liberar_blob(sha256)
+
+fila_jobs.adicionar_ouvinte(_registrar_execucao)
+fila_jobs.adicionar_ouvinte(_publicar_estado_job)
+fila_jobs.adicionar_ouvinte_descarte(_limpar_job_descartado)
+
+@app.on_event("startup")
+def aquecer_workers():
+    """Sobe os workers do pytest junto com a API (imports pesados fora do primeiro job)."""
+    removidas = AnalysisPipeline.limpar_pastas_antigas(JOB_HISTORICO_MAX)
+    if removidas:
+        print(f"Retenção: {removidas} pasta(s) de jobs antigos removida(s).")
+    pool_pytest.aquecer()
+
+@app.on_event("shutdown")
+def encerrar_workers():
+    pool_pytest.encerrar()
+    fila_relatorios.encerrar()
 
 # Configurar CORS para permitir requisições do front-end
 app.add_middleware(
@@ -35,8 +99,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Upload-Offset", "Upload-Length"],
 )
 
+class CompressaoMiddleware:
+    """
+    GZip das respostas JSON/HTML. Ficam de fora o stream SSE (a compressão segura
+    os eventos no buffer), os arquivos do storage e os artefatos dos jobs (PDFs já
+    compactados, downloads por Range).
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        caminho = scope.get("path", "") if scope["type"] == "http" else ""
+        if caminho.endswith("/eventos") or caminho.startswith("/storage/") or "/artefatos/" in caminho:
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+app.add_middleware(CompressaoMiddleware, minimum_size=1024)
+
+@app.exception_handler(UploadRejected)
+async def upload_recusado(request: Request, erro: UploadRejected):
+    """Uploads recusados (tamanho, formato, offset, sessão inexistente) viram respostas JSON."""
+    return JSONResponse(status_code=erro.status_code, content={"message": str(erro)})
+
 # Servir arquivos estáticos do frontend
 if os.path.exists("frontend"):
     app.mount("/static", StaticFiles(directory="frontend"), name="static")
@@ -77,248 +167,442 @@ async def get_system_status():
             "test_runner": "online",
             "quality_gate": "online",
             "pdf_reporter": "online"
-        }
+        },
+        "jobs_em_andamento": len(fila_jobs.em_andamento())
     }
 
+@app.get("/api/devices")
+def listar_dispositivos():
+    """Dispositivos da farm (adb) com estado, porta do Appium arrendada e job atual."""
+    pool_dispositivos.descobrir()
+    return {"dispositivos": pool_dispositivos.listar()}
+
 # Nova rota para obter estatísticas
 @app.get("/api/stats")
 async def get_stats():
-    """Retorna estatísticas gerais do sistema baseadas nos últimos testes executados"""
-    return latest_results["stats"]
+    """Estatísticas do último job executado e totais do histórico de análises"""
+    return historico_execucoes.estatisticas()
+
+@app.get("/api/runs")
+def listar_execucoes(
+    package: Optional[str] = None,
+    version_code: Optional[str] = None,
+    sha256: Optional[str] = None,
+    status: Optional[str] = None,
+    desde: Optional[float] = None,
+    ate: Optional[float] = None,
+    pagina: int = 1,
+    tamanho: int = TAMANHO_PAGINA,
+):
+    """Histórico de análises (mais recentes primeiro), filtrável por pacote, versão, hash do APK, status e período (epoch)."""
+    return historico_execucoes.listar(package, version_code, sha256, status, desde, ate, pagina, tamanho)
 
-@app.post("/executar-teste-apk")
-def upload_e_testar(
-    arquivo: UploadFile = File(None),
-    codigo: UploadFile = File(None),
-    fase: str = Form("E2E")
+@app.get("/api/runs/tendencias")
+def tendencias_execucoes(package: Optional[str] = None, dias: int = 30):
+    """Série diária de execuções, aprovação e defeitos S1/S2 nos últimos `dias`."""
+    return {"package": package, "dias": dias, "serie": historico_execucoes.tendencias(package, dias)}
+
+@app.get("/api/runs/testes-instaveis")
+def testes_instaveis(
+    package: Optional[str] = None, janela: int = 50, minimo: int = 3, limite: int = 50, por_apk: bool = False
 ):
     """
-    Endpoint principal que realiza o ciclo completo:
-    1. Upload do APK
-    2. Análise Estática de Código (Segurança)
-    3. Testes Dinâmicos (Simulação)
-    4. Quality Gate (Aprovação/Reprovação)
-    5. Geração de PDF
+    Testes que alternam entre aprovado e reprovado nas últimas `janela` execuções,
+    por app (com `por_apk=true`, por binário: mesmo SHA-256 do APK).
     """
-    if not arquivo and not codigo:
-        return JSONResponse(status_code=400, content={"message": "Nenhum arquivo enviado. Envie um APK ou Código Fonte."})
-
-    global latest_results
-    latest_results["analysis_in_progress"] = True
-    latest_results["current_stage"] = "SAST"
-    
-    try:
+    return {
+        "package": package,
+        "janela": janela,
+        "por_apk": por_apk,
+        "testes": historico_execucoes.testes_instaveis(package, janela, minimo, limite, por_apk),
+    }
 
-        # 1. SALVAR O APK
-        # Melhoria: Limpar storage antigo de APKs para economizar espaço, mantendo a pasta
-        storage_dir = "storage"
-        os.makedirs(storage_dir, exist_ok=True)
-        
-        # Remove APKs antigos para evitar confusão
-        for f in os.listdir(storage_dir):
-            if f.endswith(".apk") or f.endswith(".zip"):
-                try: os.remove(os.path.join(storage_dir, f))
-                except: pass
-                
-        caminho_apk = None
-        if arquivo:
-            caminho_apk = os.path.join("storage", arquivo.filename)
-            with open(caminho_apk, "wb") as buffer:
-                shutil.copyfileobj(arquivo.file, buffer)
-            print(f"APK recebido e salvo em: {caminho_apk}")
-        else:
-            print("Nenhum APK enviado. Pulando análise de binário.")
-        
-        # 1.1 SALVAR CÓDIGO FONTE (SE HOUVER)
-        resultado_source = {"falhas_encontradas": []}
-        if codigo:
-            caminho_codigo = os.path.join("storage", codigo.filename)
-            with open(caminho_codigo, "wb") as buffer:
-                shutil.copyfileobj(codigo.file, buffer)
-            print(f"Código fonte recebido e salvo em: {caminho_codigo}")
-            
-            # Executa análise do ZIP
-            print("Iniciando varredura do Código Fonte...")
-            resultado_source = ApkAnalyzer.analisar_source_code(caminho_codigo)
+async def _receber_formulario(request: Request, campos_arquivo: Tuple[str, ...] = ("arquivo", "codigo")):
+    """Lê o formulário da requisição em fluxo: os arquivos vão direto para storage/uploads."""
+    return await UploadService.receber_formulario(request.headers.get("content-type"), request.stream(), campos_arquivo)
 
-        # --- NOVA ETAPA: ANÁLISE ESTÁTICA DO CÓDIGO (SAST) ---
-        print("Iniciando Análise de Código e Segurança...")
-        latest_results["current_stage"] = "SAST_RUNNING"
-        
-        resultado_codigo = {"falhas_encontradas": []}
-        if caminho_apk:
-            resultado_codigo = ApkAnalyzer.analisar_codigo(caminho_apk)
-
-        # Extrai falhas do código para somar no Quality Gate
-        # Junta falhas do APK (Engenharia Reversa) + Falhas do ZIP (Código Fonte)
-        falhas_apk = resultado_codigo.get("falhas_encontradas", [])
-        falhas_source = resultado_source.get("falhas_encontradas", [])
-        falhas_codigo = falhas_apk + falhas_source
-        
-        s1_codigo = sum(1 for f in falhas_codigo if f['severidade'] == 'S1')
-        s2_codigo = sum(1 for f in falhas_codigo if f['severidade'] == 'S2')
+def _campo_bool(campos: dict, nome: str, padrao: bool) -> bool:
+    valor = campos.get(nome)
+    if valor is None or valor == "":
+        return padrao
+    return valor.strip().lower() in ("1", "true", "on", "yes", "sim")
 
-        print(f"Análise de Código concluída. S1: {s1_codigo}, S2: {s2_codigo}")
+def _descartar_recebidos(arquivos: dict) -> None:
+    for recebido in arquivos.values():
+        if os.path.exists(recebido["caminho"]):
+            os.remove(recebido["caminho"])
 
-        # 2. CONFIGURAR AMBIENTE E RODAR TESTES DINÂMICOS (DAST)
-        latest_results["current_stage"] = "DAST"
-        
-        resultados_testes = {
-            "total_testes": 0, "executados": 0, "aprovados": 0,
-            "defeitos_s1": 0, "defeitos_s2": 0, "falhas_por_area": {},
-            "lista_testes": []
-        }
-        modo_execucao = "APENAS_CODIGO_FONTE"
+def _preparar_entrada(recebido: Optional[dict], upload_id: Optional[str], pasta: str):
+    """
+    Coloca um arquivo de entrada na pasta do job e retorna (caminho, sha256, nome).
+    Com `upload_id`, usa o arquivo já recebido por /api/uploads (sem copiar os bytes);
+    senão move para a pasta do job o temporário gravado durante a leitura do multipart.
+    """
+    if upload_id:
+        sessao = sessoes_upload.obter(upload_id)
+        if not sessao["concluido"]:
+            raise UploadRejected(f"Upload '{upload_id}' ainda não foi concluído.", 409)
+        caminho = UploadService.vincular_blob(sessao["sha256"], os.path.join(pasta, sessao["nome"]))
+        if caminho is None:
+            raise UploadRejected(f"Conteúdo do upload '{upload_id}' não está mais disponível.", 404)
+        return caminho, sessao["sha256"], sessao["nome"]
+
+    if recebido:
+        caminho = os.path.join(pasta, UploadService.nome_seguro(recebido["nome"]))
+        os.replace(recebido["caminho"], caminho)
+        return caminho, recebido["sha256"], recebido["nome"]
+
+    return None, None, None
+
+def _submeter_job(
+    arquivo: Optional[dict],
+    codigo: Optional[dict],
+    fase: str,
+    projeto: Optional[str] = None,
+    apk_upload_id: Optional[str] = None,
+    codigo_upload_id: Optional[str] = None,
+) -> dict:
+    """
+    Coloca os arquivos recebidos na pasta exclusiva de um novo job e o coloca na fila.
+    Uploads idênticos (mesmo SHA-256 e fase) já analisados são respondidos pelo cache.
+    O código fonte é indexado por `projeto` (padrão: pacote do APK), então um novo
+    upload do mesmo projeto só varre os arquivos com conteúdo alterado.
+    """
+    job_id = fila_jobs.novo_id()
+    pasta = AnalysisPipeline.pasta_job(job_id)
 
-        if caminho_apk:
-            os.environ["TARGET_APK_PATH"] = os.path.abspath(caminho_apk)
-            
-            # Tenta rodar testes mobile reais (Appium) primeiro
-            caminho_testes = "tests_mobile"
-            modo_execucao = "REAL_DEVICE"
+    try:
+        caminho_apk, sha256_apk, nome_apk = _preparar_entrada(arquivo, apk_upload_id, pasta)
+        caminho_codigo, sha256_codigo, nome_codigo = _preparar_entrada(codigo, codigo_upload_id, pasta)
+    except UploadRejected:
+        shutil.rmtree(pasta, ignore_errors=True)
+        _descartar_recebidos({campo: r for campo, r in (("arquivo", arquivo), ("codigo", codigo)) if r})
+        raise
+
+    nome_job = nome_apk or nome_codigo
+    if caminho_apk:
+        print(f"APK recebido e salvo em: {caminho_apk} (sha256: {sha256_apk})")
+    if caminho_codigo:
+        print(f"Código fonte recebido e salvo em: {caminho_codigo}")
+
+    chave_cache = ResultCache.chave(sha256_apk, sha256_codigo, fase)
+    em_cache = cache_resultados.obter(chave_cache)
+    if em_cache is not None:
+        print(f"Resultado encontrado no cache para {nome_job}. Pulando análise.")
+        shutil.rmtree(pasta, ignore_errors=True)
+        return fila_jobs.registrar_concluido(
+            job_id, nome_job, dict(em_cache, job_id=job_id, cache=True, fase=fase, sha256_apk=sha256_apk)
+        )
 
-            print(f"Tentando executar testes em: {caminho_testes}")
-            try:
-                # Verifica se o Appium está rodando antes de tentar testar
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(2.0) # Aumentado timeout para evitar falsos negativos
-                if sock.connect_ex(('localhost', 4723)) != 0:
-                    sock.close()
-                    raise Exception("Servidor Appium não detectado na porta 4723.")
-                sock.close()
-
-                # Rodamos o TestRunner
-                resultados_testes = TestRunner.executar_testes(caminho_testes)
-                
-                # Se não retornou nada ou zero testes, assume falha de conexão com Appium
-                if not resultados_testes or resultados_testes.get('total_testes', 0) == 0:
-                    raise Exception("Falha de conexão com Appium ou nenhum teste encontrado.")
-                    
-                # Se rodou mas TUDO falhou (0 aprovados), assume erro de ambiente (ex: Appium travado)
-                # e força o fallback para Simulação para o usuário ver o fluxo funcionar.
-                if resultados_testes.get('aprovados', 0) == 0:
-                    raise Exception("Todos os testes mobile falharam (provável erro de conexão).")
-                    
-            except Exception as e:
-                print(f"⚠️ Ambiente mobile indisponível: {e}")
-                print("ℹ️ Executando Análise Estática Avançada (Verificação estrutural e de segurança).")
-                caminho_testes = "tests_repo"
-                modo_execucao = "ANALISE_ESTATICA"
-                resultados_testes = TestRunner.executar_testes(caminho_testes)
-
-        if not resultados_testes:
-            # Fallback se o teste falhar em gerar XML
-            resultados_testes = {
-                "total_testes": 0, "executados": 0, "aprovados": 0,
-                "defeitos_s1": 0, "defeitos_s2": 0, "falhas_por_area": {},
-                "lista_testes": []
-            }
+    # Uploads retomáveis ficam vinculados à pasta do job até ele sair do histórico
+    blobs = [sha256 for sha256, upload_id in ((sha256_apk, apk_upload_id), (sha256_codigo, codigo_upload_id)) if upload_id]
+    return fila_jobs.submeter(
+        job_id,
+        nome_job,
+        AnalysisPipeline.executar,
+        blobs=blobs,
+        caminho_apk=caminho_apk,
+        caminho_codigo=caminho_codigo,
+        fase=fase,
+        nome_apk=nome_apk,
+        nome_codigo=nome_codigo,
+        sha256_apk=sha256_apk,
+        chave_cache=chave_cache,
+        projeto=projeto,
+    )
+
+def _submeter_do_formulario(campos: dict, arquivos: dict, responder):
+    """Submete o job a partir do formulário lido em fluxo e devolve `responder(job)`."""
+    apk_upload_id = campos.get("apk_upload_id") or None
+    codigo_upload_id = campos.get("codigo_upload_id") or None
+    if not (arquivos or apk_upload_id or codigo_upload_id):
+        return JSONResponse(status_code=400, content={"message": "Nenhum arquivo enviado. Envie um APK ou Código Fonte."})
 
-        # 3. UNIFICAR OS RESULTADOS (CÓDIGO + TESTES)
-        total_s1 = resultados_testes['defeitos_s1'] + s1_codigo
-        total_s2 = resultados_testes['defeitos_s2'] + s2_codigo
-
-        # Adiciona as falhas de código na lista de "motivos" do Quality Gate
-        motivos_codigo = [f"[CÓDIGO] {f['mensagem']}" for f in falhas_codigo]
-
-        # 4. QUALITY GATE & RELATÓRIO
-        latest_results["current_stage"] = "QUALITY_GATE"
-        aprovado, motivos_gate = QualityGateEvaluator.avaliar_e2e_para_uat(
-            resultados_testes['total_testes'],
-            resultados_testes['executados'],
-            resultados_testes['aprovados'],
-            total_s1, # Soma total de defeitos críticos
-            total_s2,
-            resultados_testes['falhas_por_area']
-        )
+    job = _submeter_job(
+        arquivos.get("arquivo"), arquivos.get("codigo"), campos.get("fase") or "E2E",
+        campos.get("projeto") or None, apk_upload_id, codigo_upload_id,
+    )
+    return responder(job)
 
-        # Junta todos os motivos
-        todos_motivos = motivos_codigo + motivos_gate
+def _resposta_job(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "status_url": f"/api/jobs/{job['id']}"
+    }
 
-        # Garante reprovação se houver falha de código crítica
-        if s1_codigo > 0:
-            aprovado = False
+@app.post("/api/jobs", status_code=202)
+async def submeter_job(request: Request):
+    """
+    Enfileira o ciclo completo de análise (SAST, testes, Quality Gate e PDF)
+    e retorna imediatamente o ID do job para acompanhamento.
+    Formulário multipart: `arquivo` (APK), `codigo` (ZIP), `fase` (padrão E2E),
+    `projeto`, `apk_upload_id` e `codigo_upload_id`. Os arquivos são gravados
+    conforme chegam, direto no destino.
+    """
+    campos, arquivos = await _receber_formulario(request)
+    return await asyncio.to_thread(_submeter_do_formulario, campos, arquivos, _resposta_job)
 
-        pdf = PDFReporter.gerar(resultados_testes, aprovado, todos_motivos, fase)
+@app.get("/api/jobs")
+async def listar_jobs(limite: int = 50):
+    """Lista os jobs mais recentes (sem o resultado completo)."""
+    return {"jobs": fila_jobs.listar(limite)}
 
-        # Atualiza os resultados globais com os valores reais
-        total_testes = resultados_testes['total_testes']
-        total_aprovados = resultados_testes['aprovados']
-        total_falhas = total_testes - total_aprovados
-        coverage = round((total_aprovados / total_testes * 100) if total_testes > 0 else 0)
+@app.get("/api/jobs/{job_id}")
+async def obter_job(job_id: str, completo: bool = False):
+    """
+    Retorna o estado do job e, quando concluído, o resumo do resultado da análise
+    (listas de testes e falhas em /testes e /falhas; `completo=true` traz tudo).
+    """
+    job = fila_jobs.obter(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"message": f"Job '{job_id}' não encontrado."})
+    if job.get("resultado") and not completo:
+        job["resultado"] = ResultViews.resumir(job["resultado"])
+    return dict(job, analyses=_progresso_estagios(job["stage"]))
+
+def _resultado_do_job(job_id: str) -> Optional[dict]:
+    """Resultado completo do job (ou o gravado no histórico, se o job já saiu da fila)."""
+    job = fila_jobs.obter(job_id)
+    if job is not None and job.get("resultado"):
+        return job["resultado"]
+    return historico_execucoes.resultado(job_id)
+
+@app.get("/api/jobs/{job_id}/testes")
+async def listar_testes_job(
+    job_id: str,
+    status: Optional[str] = None,
+    severidade: Optional[str] = None,
+    classname: Optional[str] = None,
+    pagina: int = 1,
+    tamanho: int = TAMANHO_PAGINA,
+    detalhes: bool = False
+):
+    """Testes do job, paginados e filtráveis por status, severidade e classname (trecho)."""
+    resultado = _resultado_do_job(job_id)
+    if resultado is None:
+        return JSONResponse(status_code=404, content={"message": f"Resultado do job '{job_id}' não encontrado."})
+    return ResultViews.testes(resultado, status, severidade, classname, pagina, tamanho, detalhes)
+
+@app.get("/api/jobs/{job_id}/falhas")
+async def listar_falhas_job(
+    job_id: str,
+    severidade: Optional[str] = None,
+    tipo: Optional[str] = None,
+    arquivo: Optional[str] = None,
+    pagina: int = 1,
+    tamanho: int = TAMANHO_PAGINA
+):
+    """Falhas do SAST do job, paginadas e filtráveis por severidade, tipo e arquivo (trecho)."""
+    resultado = _resultado_do_job(job_id)
+    if resultado is None:
+        return JSONResponse(status_code=404, content={"message": f"Resultado do job '{job_id}' não encontrado."})
+    return ResultViews.falhas(resultado, severidade, tipo, arquivo, pagina, tamanho)
+
+# Leitura dos artefatos em blocos (respostas parciais com Range)
+BLOCO_ARTEFATO = 64 * 1024
+
+def _arquivo_artefato(job_id: str, nome: str) -> Optional[str]:
+    """Arquivo do artefato: o registrado no resultado (inclusive do cache) ou, com o job em andamento, o da pasta do job."""
+    caminho = ArtifactExporter.caminho(os.path.join(STORAGE_DIR, "jobs", job_id), nome)
+    if caminho is None:
+        return None
+    # Job lido uma única vez: ele pode sair da fila entre duas consultas
+    job = fila_jobs.obter(job_id)
+    resultado = (job or {}).get("resultado") or historico_execucoes.resultado(job_id)
+    url = ((resultado or {}).get("artefatos") or {}).get(nome)
+    if url:
+        caminho = os.path.join(STORAGE_DIR, url[len("/storage/"):])
+    elif job is None:
+        return None
+    return caminho if os.path.exists(caminho) else None
+
+def _intervalo_bytes(cabecalho: Optional[str], tamanho: int) -> Optional[Tuple[int, int]]:
+    """
+    Intervalo (início, fim inclusivo) de um header `Range: bytes=...` com um único
+    intervalo; None se ausente ou com vários intervalos (resposta completa).
+    ValueError se o intervalo não puder ser atendido (416).
+    """
+    if not cabecalho or not cabecalho.startswith("bytes=") or "," in cabecalho:
+        return None
+    if tamanho == 0:
+        raise ValueError(cabecalho)
+    inicio, _, fim = cabecalho[len("bytes="):].strip().partition("-")
+    if not inicio:
+        # Sufixo: os últimos N bytes
+        if not fim.isdigit() or int(fim) == 0:
+            raise ValueError(cabecalho)
+        return max(tamanho - int(fim), 0), tamanho - 1
+    if not inicio.isdigit() or (fim and not fim.isdigit()) or int(inicio) >= tamanho:
+        raise ValueError(cabecalho)
+    ultimo = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if ultimo < int(inicio):
+        raise ValueError(cabecalho)
+    return int(inicio), ultimo
+
+def _ler_intervalo(caminho: str, inicio: int, fim: int):
+    with open(caminho, "rb") as f:
+        f.seek(inicio)
+        restante = fim - inicio + 1
+        while restante > 0:
+            bloco = f.read(min(BLOCO_ARTEFATO, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+
+@app.get("/api/jobs/{job_id}/artefatos/{nome}")
+def baixar_artefato(job_id: str, nome: str, cabecalho_range: Optional[str] = Header(None, alias="Range")):
+    """
+    Artefatos do job para CI: `sarif` (SAST em SARIF 2.1.0), `jsonl` (um achado/teste
+    por linha) e `junit` (XML do pytest). Aceita `Range: bytes=...` (206), o que permite
+    acompanhar o JSON Lines enquanto o job roda ou retomar downloads.
+    """
+    caminho = _arquivo_artefato(job_id, nome)
+    if caminho is None:
+        return JSONResponse(status_code=404, content={"message": f"Artefato '{nome}' do job '{job_id}' não encontrado."})
 
-        latest_results["stats"] = {
-            "testsRun": total_testes,
-            "passed": total_aprovados,
-            "failed": total_falhas,
-            "coverage": coverage
+    media_type = ARTEFATOS[nome][1]
+    tamanho = os.path.getsize(caminho)
+    try:
+        intervalo = _intervalo_bytes(cabecalho_range, tamanho)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{tamanho}"})
+    if intervalo is None:
+        return FileResponse(caminho, media_type=media_type, headers={"Accept-Ranges": "bytes"})
+
+    inicio, fim = intervalo
+    return StreamingResponse(
+        _ler_intervalo(caminho, inicio, fim),
+        status_code=206,
+        media_type=media_type,
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {inicio}-{fim}/{tamanho}",
+            "Content-Length": str(fim - inicio + 1),
         }
+    )
 
-        latest_results["last_analysis"] = {
-            "arquivo": arquivo.filename if arquivo else codigo.filename,
-            "analise_estatica": resultado_codigo,
-            "analise_dinamica": resultados_testes,
-            "status_final": "APROVADO" if aprovado else "REPROVADO",
-            "s1_total": total_s1,
-            "s2_total": total_s2,
-            "motivos": todos_motivos
-        }
+@app.get("/api/jobs/{job_id}/eventos")
+async def eventos_job(job_id: str, desde: int = 0, last_event_id: Optional[str] = Header(None)):
+    """
+    Stream SSE com o progresso do job: transições de estágio (`estagio`), progresso
+    do SAST (`sast_progresso`: DEX n/m, arquivos varridos), resultado de cada teste
+    (`teste`), o relatório PDF pronto (`relatorio`) e o evento final (`fim`). Quem conecta depois recebe o replay dos
+    eventos anteriores; na reconexão, o header Last-Event-ID evita repetições.
+    """
+    # Job lido uma única vez: o stream usa este registro mesmo que ele saia da fila depois
+    job = fila_jobs.obter(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"message": f"Job '{job_id}' não encontrado."})
+    if last_event_id and last_event_id.isdigit():
+        desde = int(last_event_id)
+
+    def formatar(evento):
+        dados = json.dumps(evento["dados"], ensure_ascii=False)
+        return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {dados}\n\n"
+
+    async def stream():
+        yield "retry: 3000\n\n"
+        if not barramento_eventos.existe(job_id) and job["status"] in ("COMPLETED", "ERROR"):
+            # Replay já descartado: informa apenas o estado final
+            yield formatar({"id": desde + 1, "tipo": EVENTO_FIM, "dados": {
+                "status": job["status"], "erro": job.get("erro"), "status_url": f"/api/jobs/{job_id}"
+            }})
+            return
+
+        eventos = barramento_eventos.assinar(job_id, desde)
+        proximo = asyncio.ensure_future(eventos.__anext__())
+        try:
+            while True:
+                concluidos, _ = await asyncio.wait({proximo}, timeout=15)
+                if not concluidos:
+                    yield ": keepalive\n\n" # Mantém a conexão aberta em proxies
+                    continue
+                try:
+                    evento = proximo.result()
+                except StopAsyncIteration:
+                    return
+                yield formatar(evento)
+                proximo = asyncio.ensure_future(eventos.__anext__())
+        finally:
+            # Cliente desconectado: cancela a espera (o gerador remove a inscrição)
+            proximo.cancel()
+            try:
+                await proximo
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+            await eventos.aclose()
 
-        latest_results["current_stage"] = "COMPLETED"
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-        return {
-            "arquivo": arquivo.filename if arquivo else "Não fornecido",
-            "codigo_fonte": codigo.filename if codigo else "Não fornecido",
-            "analise_estatica": {
-                "debuggable": "Sim (FALHA)" if s1_codigo > 0 else "Não (OK)",
-                "falhas_identificadas": falhas_codigo
-            },
-            "analise_dinamica": resultados_testes,
-            "status_final": "APROVADO" if aprovado else "REPROVADO",
-            "relatorio_pdf": f"{pdf}?t={int(time.time())}" if pdf else None,
-            "modo_execucao": modo_execucao
-        }
-    except Exception as e:
-        import traceback
-        print(f"❌ ERRO FATAL NO SERVIDOR: {e}")
-        traceback.print_exc()
-        latest_results["current_stage"] = "ERROR"
+@app.post("/executar-teste-apk")
+async def upload_e_testar(request: Request):
+    """
+    Endpoint principal que realiza o ciclo completo:
+    1. Upload do APK
+    2. Análise Estática de Código (Segurança)
+    3. Testes Dinâmicos (Simulação)
+    4. Quality Gate (Aprovação/Reprovação)
+    5. Geração de PDF
+    Formulário multipart com os campos de /api/jobs, mais `aguardar` e `completo`.
+    O processamento roda na fila de jobs; com `aguardar=false` a resposta é
+    devolvida imediatamente com o ID do job (mesmo contrato de /api/jobs).
+    A resposta sai assim que o Quality Gate decide: o PDF ainda está em geração
+    (`relatorio_status="GERANDO"`) e aparece em GET /api/jobs/{job_id} (ou no
+    evento `relatorio` do stream) quando fica pronto.
+    A resposta traz o resumo do resultado; `completo=true` inclui as listas detalhadas.
+    """
+    campos, arquivos = await _receber_formulario(request)
+    aguardar = _campo_bool(campos, "aguardar", True)
+    completo = _campo_bool(campos, "completo", False)
+    return await asyncio.to_thread(
+        _submeter_do_formulario, campos, arquivos, lambda job: _responder_teste(job, aguardar, completo)
+    )
+
+def _responder_teste(job: dict, aguardar: bool, completo: bool):
+    if not aguardar:
+        return JSONResponse(status_code=202, content=_resposta_job(job))
+
+    job = fila_jobs.aguardar(job["id"])
+    if job["status"] == "ERROR":
         return JSONResponse(
             status_code=500, 
             content={
-                "message": f"Erro interno durante a análise: {str(e)}",
-                "details": traceback.format_exc()
+                "message": job["erro"],
+                "details": job.get("detalhes"),
+                "job_id": job["id"]
             }
         )
-    finally:
-        latest_results["analysis_in_progress"] = False
+    return job["resultado"] if completo else ResultViews.resumir(job["resultado"])
 
 # Rota alternativa compatível com o front-end
 @app.post("/api/upload-apk")
-async def upload_apk_api(arquivo: UploadFile = File(...)):
+async def upload_apk_api(request: Request):
     """
     Endpoint simplificado para upload de APK via front-end
-    Retorna resposta em formato JSON adequado para a interface
+    Retorna resposta em formato JSON adequado para a interface.
+    O arquivo (campo `arquivo`) é gravado conforme chega, validado e guardado
+    pelo SHA-256; o `upload_id` retornado pode ser enviado como `apk_upload_id` em /api/jobs.
     """
+    arquivos = {}
     try:
-        # Salvar o APK
-        os.makedirs("storage", exist_ok=True)
-        caminho_apk = os.path.join("storage", arquivo.filename)
-        
-        with open(caminho_apk, "wb") as buffer:
-            shutil.copyfileobj(arquivo.file, buffer)
-        
-        file_size = os.path.getsize(caminho_apk)
-        file_size_mb = round(file_size / (1024 * 1024), 2)
-        
-        return JSONResponse({
-            "success": True,
-            "message": "APK enviado com sucesso",
-            "filename": arquivo.filename,
-            "size": f"{file_size_mb} MB",
-            "path": caminho_apk
-        })
+        _, arquivos = await _receber_formulario(request, ("arquivo",))
+        if "arquivo" not in arquivos:
+            raise UploadRejected("Nenhum arquivo enviado no campo 'arquivo'.", 400)
+        recebido = arquivos["arquivo"]
+        sessao = await asyncio.to_thread(
+            sessoes_upload.registrar_concluido, recebido["nome"], recebido["caminho"], recebido["sha256"], recebido["tamanho"]
+        )
+    except UploadRejected as e:
+        return JSONResponse(status_code=e.status_code, content={"success": False, "message": str(e)})
     except Exception as e:
+        _descartar_recebidos(arquivos)
         return JSONResponse(
             status_code=500,
             content={
@@ -327,62 +611,106 @@ async def upload_apk_api(arquivo: UploadFile = File(...)):
             }
         )
 
+    sha256, tamanho = recebido["sha256"], recebido["tamanho"]
+    file_size_mb = round(tamanho / (1024 * 1024), 2)
+    return JSONResponse({
+        "success": True,
+        "message": "APK enviado com sucesso",
+        "filename": sessao["nome"],
+        "size": f"{file_size_mb} MB",
+        "sha256": sha256,
+        "upload_id": sessao["id"]
+    })
+
+# Upload retomável em partes (APKs grandes em conexões instáveis)
+@app.post("/api/uploads", status_code=201)
+async def criar_upload(nome: str = Form(...), tamanho: int = Form(...)):
+    """
+    Abre uma sessão de upload. Os bytes são enviados depois via PATCH, em um
+    ou mais blocos, cada um com o header `Upload-Offset`.
+    """
+    sessao = sessoes_upload.criar(nome, tamanho)
+    return dict(sessao, upload_url=f"/api/uploads/{sessao['id']}")
+
+@app.head("/api/uploads/{upload_id}")
+async def offset_upload(upload_id: str):
+    """Offset já gravado no servidor: o cliente retoma o envio a partir dele."""
+    sessao = sessoes_upload.obter(upload_id)
+    return Response(headers={"Upload-Offset": str(sessao["offset"]), "Upload-Length": str(sessao["tamanho_total"])})
+
+@app.get("/api/uploads/{upload_id}")
+async def obter_upload(upload_id: str):
+    return sessoes_upload.obter(upload_id)
+
+@app.patch("/api/uploads/{upload_id}")
+async def enviar_bloco(upload_id: str, request: Request, upload_offset: int = Header(...)):
+    """
+    Recebe um bloco (corpo bruto da requisição, gravado conforme chega).
+    Ao completar o tamanho declarado, a resposta traz `concluido` e o `sha256`.
+    """
+    sessao = await sessoes_upload.anexar(upload_id, upload_offset, request.stream())
+    return JSONResponse(content=sessao, headers={"Upload-Offset": str(sessao["offset"])})
+
+@app.delete("/api/uploads/{upload_id}", status_code=204)
+async def cancelar_upload(upload_id: str):
+    sessoes_upload.remover(upload_id)
+    return Response(status_code=204)
+
+def _progresso_estagios(stage: str) -> list:
+    """Traduz o estágio atual de um job no progresso de cada etapa exibida no front-end."""
+    # Define progresso baseado no estágio atual
+    sast_prog = 100 if stage in ["DAST", "QUALITY_GATE", "COMPLETED"] else 50 if stage == "SAST_RUNNING" else 0
+    dast_prog = 100 if stage in ["QUALITY_GATE", "COMPLETED"] else 50 if stage == "DAST" else 0
+    qg_prog = 100 if stage == "COMPLETED" else 50 if stage == "QUALITY_GATE" else 0
+
+    return [
+        {"name": "Análise SAST", "status": sast_prog == 100 and "completed" or sast_prog > 0 and "analyzing" or "pending", "progress": sast_prog, "service": "apk_analyzer.py"},
+        {"name": "Testes Mobile", "status": dast_prog == 100 and "completed" or dast_prog > 0 and "analyzing" or "pending", "progress": dast_prog, "service": "test_runner.py"},
+        {"name": "Quality Gate", "status": qg_prog == 100 and "completed" or qg_prog > 0 and "analyzing" or "pending", "progress": qg_prog, "service": "quality_gate.py"}
+    ]
+
 # Rota para obter status da análise em tempo real
 @app.get("/api/analysis-status/{filename}")
 async def get_analysis_status(filename: str):
     """
-    Retorna o status atual da análise de um APK específico
+    Retorna o status atual da análise de um APK específico (job mais recente com esse nome)
     """
-    stage = latest_results.get("current_stage", "IDLE")
-    
-    if latest_results["analysis_in_progress"]:
-        # Define progresso baseado no estágio atual
-        sast_prog = 100 if stage in ["DAST", "QUALITY_GATE", "COMPLETED"] else 50 if stage == "SAST_RUNNING" else 0
-        dast_prog = 100 if stage in ["QUALITY_GATE", "COMPLETED"] else 50 if stage == "DAST" else 0
-        qg_prog = 100 if stage == "COMPLETED" else 50 if stage == "QUALITY_GATE" else 0
+    job = fila_jobs.ultimo_por_arquivo(filename)
 
+    if job is None:
         return {
             "filename": filename,
-            "status": "in_progress",
-            "stage": stage,
-            "analyses": [
-                {"name": "Análise SAST", "status": sast_prog == 100 and "completed" or sast_prog > 0 and "analyzing" or "pending", "progress": sast_prog, "service": "apk_analyzer.py"},
-                {"name": "Testes Mobile", "status": dast_prog == 100 and "completed" or dast_prog > 0 and "analyzing" or "pending", "progress": dast_prog, "service": "test_runner.py"},
-                {"name": "Quality Gate", "status": qg_prog == 100 and "completed" or qg_prog > 0 and "analyzing" or "pending", "progress": qg_prog, "service": "quality_gate.py"}
-            ]
+            "status": "not_found",
+            "stage": "IDLE",
+            "analyses": _progresso_estagios("IDLE")
         }
 
-    if latest_results["last_analysis"] and latest_results["last_analysis"]["arquivo"] == filename:
+    if job["status"] in ("QUEUED", "RUNNING"):
         return {
             "filename": filename,
-            "status": "completed",
-            "stage": "COMPLETED",
-            "analyses": [
-                {"name": "Análise SAST", "status": "completed", "progress": 100, "service": "apk_analyzer.py"},
-                {"name": "Testes Mobile", "status": "completed", "progress": 100, "service": "test_runner.py"},
-                {"name": "Quality Gate", "status": "completed", "progress": 100, "service": "quality_gate.py"}
-            ]
+            "job_id": job["id"],
+            "status": "in_progress",
+            "stage": job["stage"],
+            "analyses": _progresso_estagios(job["stage"])
         }
 
     return {
         "filename": filename,
-        "status": "not_found",
-        "stage": "IDLE",
-        "analyses": [
-            {"name": "Análise SAST", "status": "pending", "progress": 0, "service": "apk_analyzer.py"},
-            {"name": "Testes Mobile", "status": "pending", "progress": 0, "service": "test_runner.py"},
-            {"name": "Quality Gate", "status": "pending", "progress": 0, "service": "quality_gate.py"}
-        ]
+        "job_id": job["id"],
+        "status": "completed" if job["status"] == "COMPLETED" else "error",
+        "stage": job["stage"],
+        "analyses": _progresso_estagios("COMPLETED" if job["status"] == "COMPLETED" else "IDLE")
     }
 
 # Rota para obter a última análise completa
 @app.get("/api/last-analysis")
-async def get_last_analysis():
-    """Retorna os detalhes da última análise realizada"""
-    if latest_results["last_analysis"]:
+async def get_last_analysis(completo: bool = False):
+    """Retorna o resumo da última análise realizada (`completo=true` inclui as listas detalhadas)"""
+    ultima = historico_execucoes.ultimo_resultado()
+    if ultima:
         return {
             "success": True,
-            "data": latest_results["last_analysis"]
+            "data": ultima if completo else ResultViews.resumir(ultima)
         }
     return {
         "success": False,
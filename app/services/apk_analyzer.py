@@ -1,17 +1,16 @@
 # Arquivo: app/services/apk_analyzer.py
-from androguard.core.apk import APK
-from androguard.core.dex import DEX
-from typing import Dict
-import re
-import zipfile
-import os
+from typing import Callable, Dict, Optional
+from app.services.apk_model import ApkModel
+from app.services.source_index import SourceIndex
+from app.services.source_scanner import SourceScanner
 
 class ApkAnalyzer:
     @staticmethod
-    def analisar_codigo(caminho_apk: str) -> Dict:
+    def analisar_codigo(caminho_apk: str, modelo: Optional[ApkModel] = None) -> Dict:
         """
         Realiza engenharia reversa no APK para validar segurança e qualidade.
         Versão Robusta: Trata erros individualmente para não quebrar a execução.
+        Reaproveita o `ApkModel` já construído para o upload, quando informado.
         """
         print(f"--- Iniciando Análise Estática (SAST) no APK: {caminho_apk} ---")
         
@@ -24,7 +23,7 @@ class ApkAnalyzer:
         }
 
         try:
-            apk = APK(caminho_apk)
+            apk = modelo or ApkModel.carregar_ou_construir(caminho_apk)
         except Exception as e:
             print(f"ERRO CRÍTICO ao ler APK: {e}")
             return {"erro": f"Arquivo APK inválido ou corrompido: {str(e)}"}
@@ -45,6 +44,7 @@ class ApkAnalyzer:
                 relatorio_tecnico["falhas_encontradas"].append({
                     "tipo": "SEGURANÇA",
                     "severidade": "S1",
+                    "regra": "APK Debuggable",
                     "mensagem": "O APK está com 'android:debuggable=true'. Permite engenharia reversa trivial."
                 })
         except Exception as e:
@@ -59,6 +59,7 @@ class ApkAnalyzer:
                     relatorio_tecnico["falhas_encontradas"].append({
                         "tipo": "PRIVACIDADE",
                         "severidade": "S2",
+                        "regra": "Permissão Perigosa",
                         "mensagem": f"Permissão perigosa detectada: {p}"
                     })
         except Exception as e:
@@ -66,12 +67,12 @@ class ApkAnalyzer:
 
         # VERIFICAÇÃO 3: Tráfego Cleartext (HTTP)
         try:
-            # Tenta pegar atributo direto, se falhar, tenta via XML
-            uses_cleartext = apk.get_element("application", "android:usesCleartextTraffic")
+            uses_cleartext = apk.get_application_attribute("usesCleartextTraffic")
             if uses_cleartext and str(uses_cleartext).lower() == "true":
                  relatorio_tecnico["falhas_encontradas"].append({
                     "tipo": "SEGURANÇA",
                     "severidade": "S2",
+                    "regra": "Tráfego Cleartext",
                     "mensagem": "O App permite tráfego HTTP não criptografado (Cleartext Traffic)."
                 })
         except Exception:
@@ -79,89 +80,94 @@ class ApkAnalyzer:
 
         # 3. Validação de Código Fonte (DEX)
         print("Escaneando código fonte extraído (DEX)...")
-        patterns = {
-            "Google API Key": r"AIza[0-9A-Za-z-_]{35}",
-            "Generic API Key": r"(?i)apikey\s*=\s*['\"][a-zA-Z0-9_]{10,}['\"]",
-            "AWS Access Key": r"AKIA[0-9A-Z]{16}"
-        }
-
         try:
-            dex_content_generator = apk.get_all_dex()
-            for dex_bytes in dex_content_generator:
+            for nome_dex in apk.get_dex_names():
                 try:
-                    d = DEX(dex_bytes)
-                    for s_obj in d.get_strings():
-                        # Converte para string com segurança
-                        try:
-                            string_val = str(s_obj)
-                        except:
-                            continue # Pula strings binárias/ilegíveis
-
-                        for nome_padrao, regex in patterns.items():
-                            if len(string_val) < 200 and re.search(regex, string_val): # Limita tamanho para performance
-                                relatorio_tecnico["falhas_encontradas"].append({
-                                    "tipo": "VAZAMENTO DE DADOS",
-                                    "severidade": "S1",
-                                    "mensagem": f"{nome_padrao} encontrada exposta no código."
-                                })
-                                break # Achou uma ocorrência nessa string, vai para a próxima
+                    # Achados da varredura feita por DEX no pool de processos; um por segredo distinto
+                    encontrados = set()
+                    for achado in apk.get_achados_dex(nome_dex):
+                        if (achado["regra"], achado["valor"]) in encontrados:
+                            continue
+                        encontrados.add((achado["regra"], achado["valor"]))
+                        relatorio_tecnico["falhas_encontradas"].append({
+                            "tipo": "VAZAMENTO DE DADOS",
+                            "severidade": achado["severidade"],
+                            "regra": achado["regra"],
+                            "mensagem": f"{achado['regra']} encontrada exposta no código.",
+                            "arquivo": nome_dex
+                        })
                 except Exception as dex_err:
-                    print(f"Aviso: Erro ao processar um arquivo DEX específico: {dex_err}")
+                    print(f"Aviso: Erro ao processar o arquivo DEX {nome_dex}: {dex_err}")
                     continue
         except Exception as e:
             print(f"Erro geral na análise DEX: {e}")
 
+        # DEX que não foram varridos: sem eles a ausência de segredos não prova nada
+        for nome_dex, motivo in apk.get_dex_falhas().items():
+            relatorio_tecnico["falhas_encontradas"].append({
+                "tipo": "ANÁLISE INCOMPLETA",
+                "severidade": "S1",
+                "regra": "DEX Não Analisado",
+                "mensagem": f"O arquivo {nome_dex} não foi analisado ({motivo}); classes e segredos dele ficaram fora do SAST.",
+                "arquivo": nome_dex
+            })
+
         return relatorio_tecnico
 
     @staticmethod
-    def analisar_source_code(caminho_zip: str) -> Dict:
+    def analisar_source_code(
+        caminho_zip: str,
+        projeto: Optional[str] = None,
+        ao_progresso: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict:
         """
-        Descompacta o código fonte e busca por vulnerabilidades (SAST).
+        Busca por vulnerabilidades (SAST) no código fonte lendo os arquivos direto do ZIP,
+        em blocos e em vários processos, sem extrair nada para o disco.
+        Com `projeto`, só os arquivos alterados desde o último upload são varridos.
+        `ao_progresso(arquivos_varridos, total)` acompanha a varredura.
         """
         print(f"--- Iniciando Análise de Código Fonte (ZIP): {caminho_zip} ---")
         resultados = {"falhas_encontradas": []}
         
-        pasta_destino = caminho_zip.replace(".zip", "_extracted")
-        
         try:
-            # 1. Descompactar
-            if os.path.exists(pasta_destino):
-                import shutil
-                shutil.rmtree(pasta_destino)
-            
-            with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
-                zip_ref.extractall(pasta_destino)
-            
-            # 2. Padrões de busca (Regex)
-            patterns = {
-                "AWS Access Key": (r"AKIA[0-9A-Z]{16}", "S1"),
-                "Google API Key": (r"AIza[0-9A-Za-z-_]{35}", "S1"),
-                "Senha Hardcoded": (r"(?i)(password|passwd|senha)\s*=\s*['\"][^'\"]+['\"]", "S1"),
-                "Token Hardcoded": (r"(?i)(token|auth)\s*=\s*['\"][a-zA-Z0-9]{10,}['\"]", "S1"),
-                "IP Hardcoded": (r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b", "S2"),
-                "TODO/FIXME": (r"(?i)(TODO|FIXME):", "S2")
-            }
+            # Arquivos selecionados pelo diretório central e varridos em paralelo (pool de processos)
+            indice = SourceIndex(projeto) if projeto else None
+            anteriores = indice.carregar() if indice else None
+            ocorrencias_por_arquivo, erros, hashes = SourceScanner.escanear_zip(
+                caminho_zip, ao_progresso=ao_progresso, anteriores=anteriores
+            )
+            if indice:
+                indice.salvar(hashes, ocorrencias_por_arquivo)
+            for arquivo, erro in erros.items():
+                print(f"Erro ao ler arquivo {arquivo}: {erro}")
+            if erros:
+                # Arquivos não varridos (tempo limite, memória, erro de leitura): a análise fica incompleta
+                nomes = ", ".join(list(erros)[:10]) + (" ..." if len(erros) > 10 else "")
+                resultados["falhas_encontradas"].append({
+                    "tipo": "ANÁLISE INCOMPLETA",
+                    "severidade": "S1",
+                    "regra": "Código Fonte Não Analisado",
+                    "mensagem": f"{len(erros)} arquivo(s) do código fonte não foram analisados ({next(iter(erros.values()))}): {nomes}",
+                    "arquivos": list(erros),
+                })
 
-            # 3. Varrer arquivos
-            for root, dirs, files in os.walk(pasta_destino):
-                for file in files:
-                    if file.endswith(('.java', '.kt', '.xml', '.js', '.py', '.json')):
-                        path = os.path.join(root, file)
-                        try:
-                            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                                content = f.read()
-                                for nome, (regex, severidade) in patterns.items():
-                                    if re.search(regex, content):
-                                        # Limita o tamanho da mensagem
-                                        rel_path = os.path.relpath(path, pasta_destino)
-                                        resultados["falhas_encontradas"].append({
-                                            "tipo": "CÓDIGO FONTE",
-                                            "severidade": severidade,
-                                            "mensagem": f"{nome} encontrado em: {rel_path}",
-                                            "arquivo": rel_path
-                                        })
-                        except Exception as e:
-                            print(f"Erro ao ler arquivo {file}: {e}")
+            # Um achado por regra e arquivo, com todas as ocorrências (linha/coluna)
+            for arquivo, ocorrencias in ocorrencias_por_arquivo.items():
+                por_regra = {}
+                for ocorrencia in ocorrencias:
+                    por_regra.setdefault(ocorrencia["regra"], []).append(ocorrencia)
+                for nome, lista in por_regra.items():
+                    linhas = ", ".join(str(o["linha"]) for o in lista[:10]) + (" ..." if len(lista) > 10 else "")
+                    resultados["falhas_encontradas"].append({
+                        "tipo": "CÓDIGO FONTE",
+                        "severidade": lista[0]["severidade"],
+                        "regra": nome,
+                        "mensagem": f"{nome} encontrado em: {arquivo} ({'linhas' if len(lista) > 1 else 'linha'} {linhas})",
+                        "arquivo": arquivo,
+                        "linha": lista[0]["linha"],
+                        "coluna": lista[0]["coluna"],
+                        "ocorrencias": [{"linha": o["linha"], "coluna": o["coluna"]} for o in lista]
+                    })
                             
         except Exception as e:
             print(f"Erro ao analisar ZIP: {e}")
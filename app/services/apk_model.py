@@ -0,0 +1,354 @@
+# Arquivo: app/services/apk_model.py
+import gzip
+import hashlib
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.core.config import APK_MODELOS_MAX_BYTES, SAST_PROCESSOS, STORAGE_DIR
+from app.services.secret_scanner import scanner_dex
+from app.services.worker_pool import WorkerPool
+
+ANDROID_NS = "{http://schemas.android.com/apk/res/android}"
+
+# Incrementar sempre que a estrutura serializada mudar (invalida o cache em disco)
+VERSAO_MODELO = 4
+
+# Modelos já lidos do disco mantidos em memória por processo (ver ApkModel.carregar)
+MODELOS_EM_MEMORIA = 2
+_modelos_carregados: "OrderedDict[tuple, ApkModel]" = OrderedDict()
+
+
+def _processar_dex(caminho_apk: str, nome_dex: str) -> Dict:
+    """
+    Tarefa executada no pool de processos (uma por DEX): decodifica a tabela
+    de strings do DEX e já a varre com o scanner de segredos.
+    """
+    from androguard.core.dex import DEX
+
+    with zipfile.ZipFile(caminho_apk) as apk_zip:
+        dex_bytes = apk_zip.read(nome_dex)
+
+    strings = []
+    for s_obj in DEX(dex_bytes).get_strings():
+        try:
+            strings.append(str(s_obj))
+        except:
+            continue # Pula strings binárias/ilegíveis
+
+    achados = [
+        {"regra": regra["nome"], "severidade": regra["severidade"], "valor": valor}
+        for _, regra, valor in scanner_dex.escanear_strings(strings)
+    ]
+    return {"strings": strings, "achados": achados}
+
+
+class ApkModel:
+    """
+    APK já analisado pelo androguard, construído uma única vez por upload e
+    compartilhado entre o ApkAnalyzer, o tests_repo e o tests_mobile.
+
+    O modelo é serializado em `storage/apk_models/<sha256>.json.gz` e expõe os
+    mesmos métodos do `androguard.core.apk.APK` usados pelos testes, além da
+    tabela de strings dos DEX (que o androguard decodificaria a cada acesso).
+    """
+
+    def __init__(self, dados: Dict):
+        self.dados = dados
+        self._manifesto = None
+
+    # ------------------------------------------------------------------
+    # Construção / Persistência
+    # ------------------------------------------------------------------
+    @staticmethod
+    def pasta_cache() -> str:
+        pasta = os.path.join(STORAGE_DIR, "apk_models")
+        os.makedirs(pasta, exist_ok=True)
+        return pasta
+
+    @staticmethod
+    def calcular_sha256(caminho_apk: str) -> str:
+        sha = hashlib.sha256()
+        with open(caminho_apk, "rb") as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(bloco)
+        return sha.hexdigest()
+
+    @staticmethod
+    def caminho_cache(sha256: str) -> str:
+        return os.path.join(ApkModel.pasta_cache(), f"{sha256}.json.gz")
+
+    @staticmethod
+    def construir(
+        caminho_apk: str,
+        sha256: Optional[str] = None,
+        ao_processar_dex: Optional[Callable[[int, int], None]] = None,
+        processos: int = SAST_PROCESSOS,
+    ) -> "ApkModel":
+        """
+        Faz o parse completo do APK (manifesto, componentes, arquivos e DEX) com o androguard.
+        Os DEX (classes.dex, classes2.dex...) são decodificados e varridos em paralelo,
+        um processo por arquivo; `ao_processar_dex(n, total)` informa o progresso.
+        Com `processos=0` (ex: dentro dos workers do pytest), tudo roda no próprio processo.
+        """
+        from androguard.core.apk import APK
+
+        print(f"--- Construindo modelo do APK: {caminho_apk} ---")
+        apk = APK(caminho_apk)
+
+        dados = {
+            "versao_modelo": VERSAO_MODELO,
+            "sha256": sha256 or ApkModel.calcular_sha256(caminho_apk),
+            "tamanho_bytes": os.path.getsize(caminho_apk),
+            "valido": apk.is_valid_APK(),
+            "package": apk.get_package(),
+            "app_name": None,
+            "version_code": apk.get_androidversion_code(),
+            "version_name": apk.get_androidversion_name(),
+            "min_sdk": apk.get_min_sdk_version(),
+            "target_sdk": apk.get_target_sdk_version(),
+            "main_activity": apk.get_main_activity(),
+            "permissoes": list(apk.get_permissions() or []),
+            "componentes": {
+                "activities": list(apk.get_activities() or []),
+                "services": list(apk.get_services() or []),
+                "receivers": list(apk.get_receivers() or []),
+                "providers": list(apk.get_providers() or []),
+            },
+            "arquivos": list(apk.get_files() or []),
+            "assinaturas": list(apk.get_signature_names() or []),
+            "certificados_sha256": [],
+            "manifesto_xml": None,
+            "dex": {},
+            "achados_dex": {},
+            # DEX que não puderam ser processados (tempo limite, memória, erro): {nome: motivo}
+            "dex_falhas": {},
+            "versao_regras": scanner_dex.versao,
+        }
+
+        try:
+            dados["app_name"] = apk.get_app_name()
+        except Exception as e:
+            print(f"Aviso: Falha ao extrair nome do app: {e}")
+
+        try:
+            dados["certificados_sha256"] = sorted(c.sha256.hex() for c in apk.get_certificates())
+        except Exception as e:
+            print(f"Aviso: Falha ao ler os certificados de assinatura: {e}")
+
+        try:
+            dados["manifesto_xml"] = apk.get_android_manifest_axml().get_xml().decode("utf-8")
+        except Exception as e:
+            print(f"Aviso: Falha ao serializar o AndroidManifest: {e}")
+
+        # Tabela de strings de cada DEX: uma tarefa por arquivo no pool de processos,
+        # resultados mesclados na ordem dos nomes (determinística)
+        nomes_dex = sorted(apk.get_dex_names(), key=ApkModel._ordem_dex)
+        tarefas = [(os.path.abspath(caminho_apk), nome_dex) for nome_dex in nomes_dex]
+        saidas = WorkerPool.mapear(_processar_dex, tarefas, max_processos=processos, ao_concluir=ao_processar_dex)
+        for nome_dex, saida in zip(nomes_dex, saidas):
+            if not saida["ok"]:
+                print(f"Aviso: Erro ao processar o arquivo DEX {nome_dex}: {saida['erro']}")
+                dados["dex_falhas"][nome_dex] = saida["erro"]
+                continue
+            dados["dex"][nome_dex] = saida["resultado"]["strings"]
+            dados["achados_dex"][nome_dex] = saida["resultado"]["achados"]
+
+        return ApkModel(dados)
+
+    @staticmethod
+    def _ordem_dex(nome_dex: str) -> int:
+        # classes.dex vem primeiro, depois classes2.dex, classes3.dex, ..., classes10.dex
+        numero = nome_dex[len("classes"):-len(".dex")]
+        return int(numero) if numero.isdigit() else 1
+
+    @staticmethod
+    def carregar_ou_construir(
+        caminho_apk: str,
+        sha256: Optional[str] = None,
+        ao_processar_dex: Optional[Callable[[int, int], None]] = None,
+        processos: int = SAST_PROCESSOS,
+    ) -> "ApkModel":
+        """
+        Reaproveita o modelo serializado do mesmo conteúdo (chave: SHA-256) ou faz o parse.
+        Um modelo com DEX que falharam é salvo (as suítes do job usam o mesmo arquivo),
+        mas não é reaproveitado: o próximo upload do APK reconstrói e tenta de novo.
+        """
+        sha256 = sha256 or ApkModel.calcular_sha256(caminho_apk)
+        caminho = ApkModel.caminho_cache(sha256)
+        if os.path.exists(caminho):
+            try:
+                modelo = ApkModel.carregar(caminho)
+                if modelo.get_dex_falhas():
+                    print(f"Aviso: Modelo em cache incompleto (DEX com falha: {', '.join(modelo.get_dex_falhas())}), reconstruindo.")
+                elif modelo.dados.get("versao_modelo") == VERSAO_MODELO:
+                    # Marca o uso no atime (o mtime identifica o modelo em memória, ver `carregar`)
+                    os.utime(caminho, (time.time(), os.path.getmtime(caminho)))
+                    return modelo
+            except Exception as e:
+                print(f"Aviso: Modelo em cache ilegível, reconstruindo: {e}")
+
+        modelo = ApkModel.construir(caminho_apk, sha256, ao_processar_dex, processos)
+        modelo.salvar(caminho)
+        ApkModel.limitar_cache(manter=caminho)
+        return modelo
+
+    @staticmethod
+    def limitar_cache(max_bytes: int = APK_MODELOS_MAX_BYTES, manter: Optional[str] = None) -> None:
+        """Acima de `max_bytes`, remove os modelos serializados usados há mais tempo (LRU)."""
+        pasta = ApkModel.pasta_cache()
+        modelos = []
+        for nome in os.listdir(pasta):
+            if not nome.endswith(".json.gz"):
+                continue
+            caminho = os.path.join(pasta, nome)
+            try:
+                modelos.append((os.stat(caminho), caminho))
+            except FileNotFoundError:
+                continue
+        total = sum(info.st_size for info, _ in modelos)
+        for info, caminho in sorted(modelos, key=lambda item: item[0].st_atime):
+            if total <= max_bytes:
+                break
+            if caminho == manter:
+                continue
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= info.st_size
+            print(f"Cache: modelo {os.path.basename(caminho)[:12]} removido (LRU).")
+
+    @staticmethod
+    def carregar(caminho: str) -> "ApkModel":
+        """
+        Lê o modelo serializado. Os últimos modelos lidos ficam em memória no processo:
+        um worker do pytest que roda várias fatias/suítes do mesmo APK lê o arquivo uma vez.
+        """
+        chave = (os.path.abspath(caminho), os.path.getmtime(caminho))
+        modelo = _modelos_carregados.get(chave)
+        if modelo is None:
+            with gzip.open(caminho, "rt", encoding="utf-8") as f:
+                modelo = ApkModel(json.load(f))
+            _modelos_carregados[chave] = modelo
+            while len(_modelos_carregados) > MODELOS_EM_MEMORIA:
+                _modelos_carregados.popitem(last=False)
+        else:
+            _modelos_carregados.move_to_end(chave)
+        return modelo
+
+    def salvar(self, caminho: Optional[str] = None) -> str:
+        caminho = caminho or ApkModel.caminho_cache(self.sha256)
+        temporario = f"{caminho}.tmp"
+        with gzip.open(temporario, "wt", encoding="utf-8", compresslevel=1) as f:
+            json.dump(self.dados, f)
+        os.replace(temporario, caminho)
+        return caminho
+
+    # ------------------------------------------------------------------
+    # Dados do modelo
+    # ------------------------------------------------------------------
+    @property
+    def sha256(self) -> str:
+        return self.dados["sha256"]
+
+    def get_dex_names(self) -> List[str]:
+        return list(self.dados["dex"].keys())
+
+    def get_dex_strings(self, nome_dex: Optional[str] = None) -> Iterator[str]:
+        """Strings de um DEX específico ou de todos, na ordem classes.dex, classes2.dex..."""
+        nomes = [nome_dex] if nome_dex else self.get_dex_names()
+        for nome in nomes:
+            yield from self.dados["dex"].get(nome, [])
+
+    def get_dex_falhas(self) -> Dict[str, str]:
+        """DEX que não entraram no modelo (tempo limite, memória ou erro): {nome: motivo}."""
+        return self.dados.get("dex_falhas", {})
+
+    def get_achados_dex(self, nome_dex: str) -> List[Dict]:
+        """
+        Segredos encontrados no DEX durante a construção do modelo. Se o ruleset
+        mudou desde então, a tabela de strings é varrida novamente.
+        """
+        if self.dados.get("versao_regras") == scanner_dex.versao:
+            return self.dados["achados_dex"].get(nome_dex, [])
+        return [
+            {"regra": regra["nome"], "severidade": regra["severidade"], "valor": valor}
+            for _, regra, valor in scanner_dex.escanear_strings(self.dados["dex"].get(nome_dex, []))
+        ]
+
+    def get_certificados_sha256(self) -> List[str]:
+        """SHA-256 dos certificados de assinatura (identifica a chave que assinou o APK)."""
+        return self.dados.get("certificados_sha256", [])
+
+    def get_application_attribute(self, atributo: str) -> Optional[str]:
+        app_node = self.get_android_manifest_xml().find("application")
+        if app_node is None:
+            return None
+        return app_node.get(f"{ANDROID_NS}{atributo}")
+
+    # ------------------------------------------------------------------
+    # Compatibilidade com androguard.core.apk.APK
+    # ------------------------------------------------------------------
+    def is_valid_APK(self) -> bool:
+        return self.dados["valido"]
+
+    def get_package(self) -> str:
+        return self.dados["package"]
+
+    def get_app_name(self) -> Optional[str]:
+        return self.dados["app_name"]
+
+    def get_androidversion_code(self) -> Optional[str]:
+        return self.dados["version_code"]
+
+    def get_androidversion_name(self) -> Optional[str]:
+        return self.dados["version_name"]
+
+    def get_min_sdk_version(self) -> Optional[str]:
+        return self.dados["min_sdk"]
+
+    def get_target_sdk_version(self) -> Optional[str]:
+        return self.dados["target_sdk"]
+
+    def get_main_activity(self) -> Optional[str]:
+        return self.dados["main_activity"]
+
+    def get_permissions(self) -> List[str]:
+        return self.dados["permissoes"]
+
+    def get_activities(self) -> List[str]:
+        return self.dados["componentes"]["activities"]
+
+    def get_services(self) -> List[str]:
+        return self.dados["componentes"]["services"]
+
+    def get_receivers(self) -> List[str]:
+        return self.dados["componentes"]["receivers"]
+
+    def get_providers(self) -> List[str]:
+        return self.dados["componentes"]["providers"]
+
+    def get_files(self) -> List[str]:
+        return self.dados["arquivos"]
+
+    def get_signature_names(self) -> List[str]:
+        return self.dados["assinaturas"]
+
+    def get_android_manifest_xml(self) -> ET.Element:
+        if self._manifesto is None:
+            xml = self.dados.get("manifesto_xml")
+            self._manifesto = ET.fromstring(xml) if xml else ET.Element("manifest")
+        return self._manifesto
+
+    def get_element(self, tag: str, atributo: str) -> Optional[str]:
+        """Valor do atributo (ex: 'android:debuggable') no primeiro elemento `tag` do manifesto."""
+        manifesto = self.get_android_manifest_xml()
+        node = manifesto if manifesto.tag == tag else manifesto.find(f".//{tag}")
+        if node is None:
+            return None
+        return node.get(atributo.replace("android:", ANDROID_NS))
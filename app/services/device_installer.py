@@ -0,0 +1,155 @@
+# Arquivo: app/services/device_installer.py
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import STORAGE_DIR
+from app.services.device_pool import executar_adb, resolver_adb
+
+# Instalação em celular físico pode levar mais de um minuto
+TIMEOUT_INSTALACAO = 300
+
+_lock_estado = threading.Lock()
+
+
+class InstallError(Exception):
+    """Falha do `adb install`; `saida` traz a mensagem do Android (ex: INSTALL_FAILED_...)."""
+
+    def __init__(self, saida: str):
+        super().__init__(saida)
+        self.saida = saida
+
+
+class DeviceInstaller:
+    """
+    Instala o APK em um dispositivo apenas quando necessário.
+
+    Guarda por serial (storage/device_installs.json) o que foi instalado por último:
+    package, versionCode, SHA-256 dos certificados e do APK, e o lastUpdateTime
+    informado pelo `dumpsys package`. Antes de instalar, compara com o estado
+    atual do aparelho:
+    - mesmo build e ninguém reinstalou desde então: nada a fazer;
+    - mesma assinatura, conteúdo diferente: `adb install --fastdeploy` (envia só a diferença);
+    - assinatura diferente: desinstala e instala do zero.
+    """
+
+    def __init__(
+        self,
+        serial: Optional[str] = None,
+        adb: Optional[str] = None,
+        executar_comando: Callable[[Sequence[str], int], Tuple[int, str]] = executar_adb,
+        arquivo_estado: Optional[str] = None,
+    ):
+        self.adb = adb or resolver_adb()
+        self._executar_comando = executar_comando
+        self.arquivo_estado = arquivo_estado or os.path.join(STORAGE_DIR, "device_installs.json")
+        self.serial = serial or self._obter_serial()
+
+    def _adb(self, *argumentos: str, timeout: int = 30) -> Tuple[int, str]:
+        prefixo = [self.adb, "-s", self.serial] if self.serial else [self.adb]
+        return self._executar_comando(prefixo + list(argumentos), timeout)
+
+    def _obter_serial(self) -> Optional[str]:
+        codigo, saida = self._executar_comando([self.adb, "get-serialno"], 30)
+        serial = saida.strip()
+        return serial if codigo == 0 and serial and serial != "unknown" else None
+
+    # ------------------------------------------------------------------
+    # Estado do aparelho
+    # ------------------------------------------------------------------
+    def estado_dispositivo(self, package: str) -> Optional[Dict]:
+        """versionCode e lastUpdateTime do pacote instalado (None se não estiver instalado)."""
+        codigo, saida = self._adb("shell", "dumpsys", "package", package)
+        if codigo != 0:
+            return None
+        # O dumpsys lista o pacote em "Packages:"; sem a linha "Package [pkg]" ele não está instalado
+        inicio = saida.find(f"Package [{package}]")
+        if inicio < 0:
+            return None
+        trecho = saida[inicio:]
+        versao = re.search(r"versionCode=(\d+)", trecho)
+        atualizado = re.search(r"lastUpdateTime=([^\r\n]+)", trecho)
+        return {
+            "version_code": versao.group(1) if versao else None,
+            "last_update_time": atualizado.group(1).strip() if atualizado else None,
+        }
+
+    def _carregar_estado(self) -> Dict:
+        try:
+            with open(self.arquivo_estado, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _registrar(self, package: str, registro: Optional[Dict]) -> None:
+        with _lock_estado:
+            estado = self._carregar_estado()
+            instalados = estado.setdefault(self.serial or "-", {})
+            if registro is None:
+                instalados.pop(package, None)
+            else:
+                instalados[package] = registro
+            os.makedirs(os.path.dirname(self.arquivo_estado) or ".", exist_ok=True)
+            temporario = f"{self.arquivo_estado}.{os.getpid()}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(estado, f, indent=2)
+            os.replace(temporario, self.arquivo_estado)
+
+    # ------------------------------------------------------------------
+    # Instalação
+    # ------------------------------------------------------------------
+    def instalar(self, caminho_apk: str, modelo) -> str:
+        """
+        Garante que o build do `modelo` (ApkModel) está instalado no aparelho.
+        Retorna a ação executada: "ignorado", "fastdeploy" ou "instalado".
+        """
+        package = modelo.get_package()
+        version_code = str(modelo.get_androidversion_code())
+        certificados = modelo.get_certificados_sha256()
+
+        anterior = self._carregar_estado().get(self.serial or "-", {}).get(package)
+        atual = self.estado_dispositivo(package)
+
+        mesma_assinatura = (
+            atual is not None and anterior is not None
+            and anterior["certificados_sha256"] == certificados
+            # lastUpdateTime diferente: alguém reinstalou o app por fora; não dá para confiar no registro
+            and anterior["last_update_time"] == atual["last_update_time"]
+        )
+        if mesma_assinatura and anterior["apk_sha256"] == modelo.sha256 and atual["version_code"] == version_code:
+            print(f"⏩ {package} (versionCode {version_code}) já está instalado em {self.serial}. Instalação ignorada.")
+            return "ignorado"
+
+        acao = "instalado"
+        if mesma_assinatura:
+            # Mesmo app e chave: envia só a diferença do APK
+            print(f"📦 Atualizando {package} via fastdeploy em {self.serial}...")
+            codigo, saida = self._adb("install", "-r", "-g", "-t", "-d", "--fastdeploy", caminho_apk, timeout=TIMEOUT_INSTALACAO)
+            acao = "fastdeploy" if codigo == 0 and "Success" in saida else "instalado"
+            if acao == "instalado":
+                print(f"⚠️ Fastdeploy indisponível ({saida.strip()[-200:]}). Instalando o APK completo.")
+
+        if acao == "instalado":
+            if atual is not None and not mesma_assinatura:
+                # Evita INSTALL_FAILED_UPDATE_INCOMPATIBLE quando a assinatura mudou (ou é desconhecida)
+                print(f"🗑️ Desinstalando versão anterior de: {package}")
+                self._adb("uninstall", package)
+            print(f"📦 Instalando APK via ADB: {caminho_apk}")
+            # flags: -r (reinstall), -g (grant permissions), -t (allow test packages), -d (allow downgrade)
+            codigo, saida = self._adb("install", "-r", "-g", "-t", "-d", caminho_apk, timeout=TIMEOUT_INSTALACAO)
+            if codigo != 0 or "Success" not in saida:
+                self._registrar(package, None)
+                raise InstallError(saida)
+
+        novo = self.estado_dispositivo(package) or {}
+        self._registrar(package, {
+            "version_code": version_code,
+            "certificados_sha256": certificados,
+            "apk_sha256": modelo.sha256,
+            "last_update_time": novo.get("last_update_time"),
+            "instalado_em": time.time(),
+        })
+        return acao
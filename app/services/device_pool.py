@@ -0,0 +1,241 @@
+# Arquivo: app/services/device_pool.py
+import os
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import (
+    ADB_CMD, APPIUM_HOST, APPIUM_INICIAR, APPIUM_PORTA_INICIAL,
+    DISPOSITIVO_ESPERA_S, DISPOSITIVO_MAX_FALHAS, DISPOSITIVO_QUARENTENA_S,
+)
+
+# Porta local do servidor UiAutomator2 de cada dispositivo (appium:systemPort);
+# precisa ser diferente por dispositivo quando um mesmo Appium atende vários
+SYSTEM_PORT_INICIAL = 8200
+
+
+class NoDeviceAvailable(Exception):
+    pass
+
+
+def resolver_adb() -> str:
+    """ADB configurado ou, se não estiver no PATH, o do ANDROID_HOME."""
+    android_home = os.getenv("ANDROID_HOME")
+    if ADB_CMD == "adb" and android_home:
+        for nome in ("adb.exe", "adb"):
+            candidato = os.path.join(android_home, "platform-tools", nome)
+            if os.path.exists(candidato):
+                return candidato
+    return ADB_CMD
+
+
+def executar_adb(argumentos: Sequence[str], timeout: int = 30) -> Tuple[int, str]:
+    """Executa um comando do adb e devolve (código de saída, stdout + stderr); falha ao iniciar vira código 1."""
+    try:
+        processo = subprocess.run(list(argumentos), capture_output=True, text=True, timeout=timeout)
+        return processo.returncode, processo.stdout + processo.stderr
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return 1, str(e)
+
+
+def _porta_aberta(host: str, porta: int) -> bool:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(2.0)
+    try:
+        return sock.connect_ex((host, porta)) == 0
+    finally:
+        sock.close()
+
+
+def _iniciar_appium(porta: int) -> None:
+    subprocess.Popen(
+        ["appium", "--port", str(porta), "--log-level", "error"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+class DevicePool:
+    """
+    Farm de dispositivos para os testes mobile.
+
+    Descobre os celulares via `adb devices` e arrenda a cada job um dispositivo e
+    uma porta de Appium exclusivos, então jobs diferentes rodam em paralelo, um por
+    aparelho. Antes de cada arrendamento o dispositivo passa por um health check
+    (adb shell + porta do Appium); falhas consecutivas colocam o aparelho em
+    quarentena por um tempo.
+
+    O comando do adb, o teste de porta e o start do Appium são injetáveis, para
+    rodar com um ADB/Appium falso.
+    """
+
+    def __init__(
+        self,
+        executar_comando: Callable[[Sequence[str]], Tuple[int, str]] = executar_adb,
+        porta_aberta: Callable[[str, int], bool] = _porta_aberta,
+        iniciar_appium: Optional[Callable[[int], None]] = _iniciar_appium if APPIUM_INICIAR else None,
+        adb: Optional[str] = None,
+        appium_host: str = APPIUM_HOST,
+        porta_inicial: int = APPIUM_PORTA_INICIAL,
+        max_falhas: int = DISPOSITIVO_MAX_FALHAS,
+        quarentena_s: int = DISPOSITIVO_QUARENTENA_S,
+    ):
+        self._executar_comando = executar_comando
+        self._porta_aberta = porta_aberta
+        self._iniciar_appium = iniciar_appium
+        self.adb = adb or resolver_adb()
+        self.appium_host = appium_host
+        self.porta_inicial = porta_inicial
+        self.max_falhas = max_falhas
+        self.quarentena_s = quarentena_s
+        self._dispositivos: Dict[str, Dict] = {}
+        self._condicao = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Descoberta / Saúde
+    # ------------------------------------------------------------------
+    def descobrir(self) -> List[str]:
+        """Atualiza a lista de dispositivos conectados (estado 'device' no adb)."""
+        codigo, saida = self._executar_comando([self.adb, "devices"])
+        conectados = []
+        if codigo == 0:
+            for linha in saida.splitlines()[1:]:
+                partes = linha.split()
+                if len(partes) >= 2 and partes[1] == "device":
+                    conectados.append(partes[0])
+
+        with self._condicao:
+            for serial in conectados:
+                if serial not in self._dispositivos:
+                    # Cada aparelho recebe uma "vaga" fixa: porta do Appium e systemPort
+                    vaga = len(self._dispositivos)
+                    self._dispositivos[serial] = {
+                        "serial": serial,
+                        "estado": "disponivel",
+                        "porta_appium": self.porta_inicial + vaga,
+                        "system_port": SYSTEM_PORT_INICIAL + vaga,
+                        "job_id": None,
+                        "falhas": 0,
+                        "quarentena_ate": None,
+                        "execucoes": 0,
+                    }
+            for serial, dispositivo in self._dispositivos.items():
+                dispositivo["conectado"] = serial in conectados
+            self._condicao.notify_all()
+        return conectados
+
+    def saudavel(self, dispositivo: Dict) -> bool:
+        """Health check: responde ao adb shell e tem um Appium escutando na porta arrendada."""
+        codigo, saida = self._executar_comando([self.adb, "-s", dispositivo["serial"], "shell", "echo", "ok"])
+        if codigo != 0 or "ok" not in saida:
+            return False
+        porta = dispositivo["porta_appium"]
+        if not self._porta_aberta(self.appium_host, porta):
+            if self._iniciar_appium is None:
+                return False
+            print(f"Iniciando Appium na porta {porta} para {dispositivo['serial']}...")
+            self._iniciar_appium(porta)
+            for _ in range(30):
+                time.sleep(1)
+                if self._porta_aberta(self.appium_host, porta):
+                    return True
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Arrendamento
+    # ------------------------------------------------------------------
+    @contextmanager
+    def arrendar(self, job_id: str, timeout: float = DISPOSITIVO_ESPERA_S) -> Iterator[Dict]:
+        """
+        Reserva um dispositivo saudável para o job (aguardando até `timeout` se todos
+        estiverem ocupados; se todos os conectados estiverem em quarentena, falha na
+        hora com NoDeviceAvailable). O bloco deve marcar `arrendamento["sucesso"] = False`
+        quando a execução falhar por causa do ambiente; o aparelho é devolvido ao sair.
+        """
+        arrendamento = self._reservar(job_id, timeout)
+        try:
+            yield arrendamento
+        except Exception:
+            arrendamento["sucesso"] = False
+            raise
+        finally:
+            self.devolver(arrendamento["serial"], arrendamento.get("sucesso", True))
+
+    def _reservar(self, job_id: str, timeout: float) -> Dict:
+        prazo = time.monotonic() + timeout
+        while True:
+            self.descobrir()
+            with self._condicao:
+                conectados = [d for d in self._dispositivos.values() if d["conectado"]]
+                if not conectados:
+                    raise NoDeviceAvailable("Nenhum dispositivo conectado ao ADB.")
+                candidato = self._proximo_disponivel()
+                if candidato is None and all(d["estado"] == "quarentena" for d in conectados):
+                    # Esperar não adianta: o job segue direto para o fallback sem aparelho
+                    liberacao = min(d["quarentena_ate"] for d in conectados) - time.time()
+                    raise NoDeviceAvailable(
+                        f"Todos os dispositivos conectados estão em quarentena (próximo liberado em {int(liberacao)}s)."
+                    )
+                if candidato is not None:
+                    candidato["estado"] = "em_uso"
+                    candidato["job_id"] = job_id
+
+            if candidato is not None:
+                if self.saudavel(candidato):
+                    print(f"📱 Job {job_id}: dispositivo {candidato['serial']} (Appium :{candidato['porta_appium']})")
+                    return {
+                        "serial": candidato["serial"],
+                        "porta_appium": candidato["porta_appium"],
+                        "system_port": candidato["system_port"],
+                        "url_appium": f"http://{self.appium_host}:{candidato['porta_appium']}",
+                    }
+                print(f"⚠️ Dispositivo {candidato['serial']} reprovado no health check.")
+                self.devolver(candidato["serial"], sucesso=False, executou=False)
+                continue
+
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                raise NoDeviceAvailable(f"Nenhum dispositivo livre em {int(timeout)}s.")
+            with self._condicao:
+                self._condicao.wait(min(restante, 15))
+
+    def _proximo_disponivel(self) -> Optional[Dict]:
+        agora = time.time()
+        livres = []
+        for dispositivo in self._dispositivos.values():
+            if dispositivo["estado"] == "quarentena" and dispositivo["quarentena_ate"] <= agora:
+                dispositivo["estado"] = "disponivel"
+                dispositivo["falhas"] = 0
+            if dispositivo["estado"] == "disponivel" and dispositivo["conectado"]:
+                livres.append(dispositivo)
+        # O aparelho menos usado primeiro (distribui o desgaste entre a farm)
+        return min(livres, key=lambda d: d["execucoes"]) if livres else None
+
+    def devolver(self, serial: str, sucesso: bool = True, executou: bool = True) -> None:
+        """Devolve o aparelho à farm; `executou=False` quando ele nem chegou a rodar o job (health check)."""
+        with self._condicao:
+            dispositivo = self._dispositivos.get(serial)
+            if dispositivo is None:
+                return
+            dispositivo["job_id"] = None
+            if executou:
+                dispositivo["execucoes"] += 1
+            dispositivo["falhas"] = 0 if sucesso else dispositivo["falhas"] + 1
+            if dispositivo["falhas"] >= self.max_falhas:
+                dispositivo["estado"] = "quarentena"
+                dispositivo["quarentena_ate"] = time.time() + self.quarentena_s
+                print(f"🚫 Dispositivo {serial} em quarentena por {self.quarentena_s}s ({dispositivo['falhas']} falhas seguidas).")
+            else:
+                dispositivo["estado"] = "disponivel"
+            self._condicao.notify_all()
+
+    def listar(self) -> List[Dict]:
+        with self._condicao:
+            return [dict(d) for d in self._dispositivos.values()]
+
+
+# Instância única usada pelo pipeline
+pool_dispositivos = DevicePool()
@@ -0,0 +1,97 @@
+# Arquivo: app/services/event_bus.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import EVENTOS_BUFFER_MAX, JOB_HISTORICO_MAX
+
+# Tipo do último evento de um job: depois dele o stream é encerrado
+EVENTO_FIM = "fim"
+
+
+class EventBus:
+    """
+    Barramento de eventos de progresso por job (estágios, progresso do SAST,
+    resultado de cada teste). Os eventos são publicados pelas threads do pipeline
+    e entregues aos assinantes assíncronos (streams SSE) no event loop de cada um.
+
+    Cada job guarda um buffer de replay com os últimos eventos numerados, então
+    quem se conecta depois (ou reconecta com Last-Event-ID) recebe o que perdeu.
+    """
+
+    def __init__(self, buffer_max: int = EVENTOS_BUFFER_MAX, historico_max: int = JOB_HISTORICO_MAX):
+        self._buffers: "OrderedDict[str, deque]" = OrderedDict()
+        self._sequencias: Dict[str, int] = {}
+        self._assinantes: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+        self._buffer_max = buffer_max
+        self._historico_max = historico_max
+
+    def publicar(self, job_id: str, tipo: str, dados: Optional[Dict] = None) -> Dict:
+        """Registra o evento no buffer do job e o entrega a todos os assinantes (thread-safe)."""
+        with self._lock:
+            if job_id not in self._buffers:
+                self._buffers[job_id] = deque(maxlen=self._buffer_max)
+                self._remover_antigos()
+            self._sequencias[job_id] = self._sequencias.get(job_id, 0) + 1
+            evento = {"id": self._sequencias[job_id], "tipo": tipo, "dados": dados or {}, "em": time.time()}
+            self._buffers[job_id].append(evento)
+            assinantes = list(self._assinantes.get(job_id, []))
+
+        for loop, fila in assinantes:
+            try:
+                loop.call_soon_threadsafe(fila.put_nowait, evento)
+            except RuntimeError:
+                pass # Loop do assinante já foi encerrado
+        return evento
+
+    async def assinar(self, job_id: str, desde: int = 0) -> AsyncIterator[Dict]:
+        """
+        Eventos do job com id maior que `desde`: primeiro o replay do buffer,
+        depois os novos, até o evento de fim.
+        """
+        fila: asyncio.Queue = asyncio.Queue()
+        inscricao = (asyncio.get_running_loop(), fila)
+        with self._lock:
+            # Replay e inscrição sob o mesmo lock: nenhum evento fica entre os dois
+            replay = [e for e in self._buffers.get(job_id, ()) if e["id"] > desde]
+            self._assinantes.setdefault(job_id, []).append(inscricao)
+
+        try:
+            ultimo = desde
+            for evento in replay:
+                ultimo = evento["id"]
+                yield evento
+                if evento["tipo"] == EVENTO_FIM:
+                    return
+            while True:
+                evento = await fila.get()
+                if evento["id"] <= ultimo:
+                    continue
+                ultimo = evento["id"]
+                yield evento
+                if evento["tipo"] == EVENTO_FIM:
+                    return
+        finally:
+            with self._lock:
+                inscritos = self._assinantes.get(job_id, [])
+                if inscricao in inscritos:
+                    inscritos.remove(inscricao)
+                if not inscritos:
+                    self._assinantes.pop(job_id, None)
+
+    def existe(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._buffers
+
+    def _remover_antigos(self) -> None:
+        # Mantém o replay apenas dos jobs mais recentes
+        while len(self._buffers) > self._historico_max:
+            job_id, _ = self._buffers.popitem(last=False)
+            self._sequencias.pop(job_id, None)
+
+
+# Instância única compartilhada pela API e pelo pipeline
+barramento_eventos = EventBus()
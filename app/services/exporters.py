@@ -0,0 +1,148 @@
+# Arquivo: app/services/exporters.py
+import json
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import ANALYZER_VERSION, STORAGE_DIR
+
+# Artefatos legíveis por máquina de cada job: nome na API -> (arquivo na pasta do job, media type)
+ARTEFATOS = {
+    "sarif": ("resultados.sarif", "application/sarif+json"),
+    "jsonl": ("resultados.jsonl", "application/x-ndjson"),
+    "junit": ("test_results.xml", "application/xml"),
+}
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+NIVEL_SARIF = {"S1": "error", "S2": "warning"}
+# Checagens do manifesto não têm arquivo próprio: o achado aponta para o AndroidManifest
+TIPOS_MANIFESTO = ("SEGURANÇA", "PRIVACIDADE")
+
+
+def _id_regra(falha: Dict) -> str:
+    """ID estável da regra (SARIF ruleId): nome da regra sem acentos, em kebab-case."""
+    nome = falha.get("regra") or falha.get("tipo") or "achado"
+    nome = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", nome.lower()).strip("-") or "achado"
+
+
+def _url_storage(caminho: str) -> str:
+    return "/storage/" + os.path.relpath(caminho, STORAGE_DIR).replace(os.sep, "/")
+
+
+class ArtifactExporter:
+    """
+    Exporta os resultados de um job em formatos para CI, gravados na pasta do job
+    à medida que os estágios terminam:
+    - resultados.sarif: achados do SAST (APK + código fonte) em SARIF 2.1.0;
+    - resultados.jsonl: um achado/teste por linha (`tipo`: achado, teste, resumo);
+    - test_results.xml: o JUnit gerado pelo pytest, sem conversão.
+    Os arquivos são escritos item a item, sem montar o documento inteiro em memória.
+    """
+
+    def __init__(self, pasta: str):
+        self.pasta = pasta
+        self.caminho_jsonl = os.path.join(pasta, ARTEFATOS["jsonl"][0])
+        self.caminho_sarif = os.path.join(pasta, ARTEFATOS["sarif"][0])
+        # Cada job começa um JSON Lines novo (a pasta pode ter sobras de uma execução anterior)
+        open(self.caminho_jsonl, "w", encoding="utf-8").close()
+
+    def _anexar_linhas(self, tipo: str, itens: Iterable[Dict], **extras) -> None:
+        with open(self.caminho_jsonl, "a", encoding="utf-8") as f:
+            for item in itens:
+                f.write(json.dumps(dict(item, tipo=tipo, **extras), ensure_ascii=False) + "\n")
+
+    def registrar_achados(self, falhas_apk: List[Dict], falhas_source: List[Dict]) -> None:
+        """Fim do SAST: grava o SARIF e os achados no JSON Lines."""
+        self._anexar_linhas("achado", falhas_apk, origem="apk")
+        self._anexar_linhas("achado", falhas_source, origem="codigo_fonte")
+        ArtifactExporter.escrever_sarif(self.caminho_sarif, falhas_apk + falhas_source)
+
+    def registrar_testes(self, resultados_testes: Dict) -> None:
+        """Fim do DAST: um teste por linha (com traceback), na ordem da suíte."""
+        self._anexar_linhas("teste", resultados_testes.get("lista_testes", []))
+
+    def registrar_resumo(self, resultado: Dict) -> None:
+        """Decisão do Quality Gate: última linha do JSON Lines."""
+        dinamica = resultado.get("analise_dinamica") or {}
+        self._anexar_linhas("resumo", [{
+            "job_id": resultado.get("job_id"),
+            "status_final": resultado.get("status_final"),
+            "s1_total": resultado.get("s1_total"),
+            "s2_total": resultado.get("s2_total"),
+            "total_testes": dinamica.get("total_testes"),
+            "aprovados": dinamica.get("aprovados"),
+            "modo_execucao": resultado.get("modo_execucao"),
+            "motivos": resultado.get("motivos", []),
+        }])
+
+    def artefatos(self) -> Dict[str, str]:
+        """URLs (/storage) dos artefatos já gravados na pasta do job."""
+        urls = {}
+        for nome in ARTEFATOS:
+            caminho = ArtifactExporter.caminho(self.pasta, nome)
+            if os.path.exists(caminho):
+                urls[nome] = _url_storage(caminho)
+        return urls
+
+    @staticmethod
+    def _resultado_sarif(falha: Dict) -> Dict:
+        resultado = {
+            "ruleId": _id_regra(falha),
+            "level": NIVEL_SARIF.get(falha.get("severidade"), "note"),
+            "message": {"text": falha.get("mensagem", "")},
+            "properties": {"severidade": falha.get("severidade"), "tipo": falha.get("tipo")},
+        }
+        arquivo = falha.get("arquivo") or ("AndroidManifest.xml" if falha.get("tipo") in TIPOS_MANIFESTO else None)
+        if arquivo:
+            ocorrencias = falha.get("ocorrencias") or [{"linha": falha.get("linha"), "coluna": falha.get("coluna")}]
+            locais = []
+            for ocorrencia in ocorrencias:
+                local = {"physicalLocation": {"artifactLocation": {"uri": arquivo.replace(os.sep, "/")}}}
+                if ocorrencia.get("linha"):
+                    regiao = {"startLine": ocorrencia["linha"]}
+                    if ocorrencia.get("coluna"):
+                        regiao["startColumn"] = ocorrencia["coluna"]
+                    local["physicalLocation"]["region"] = regiao
+                locais.append(local)
+            # A primeira ocorrência é o local do achado; as demais (mesma regra, mesmo arquivo) ficam relacionadas
+            resultado["locations"] = locais[:1]
+            if len(locais) > 1:
+                resultado["relatedLocations"] = [dict(local, id=i) for i, local in enumerate(locais[1:], start=1)]
+        return resultado
+
+    @staticmethod
+    def escrever_sarif(caminho: str, falhas: Iterable[Dict]) -> None:
+        """
+        SARIF 2.1.0 escrito resultado a resultado. As regras (tool.driver.rules) são
+        conhecidas só no final, por isso vêm depois de `results` no objeto do run.
+        """
+        regras: Dict[str, Dict] = {}
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write('{"$schema": %s, "version": "2.1.0", "runs": [{"results": [' % json.dumps(SARIF_SCHEMA))
+            for i, falha in enumerate(falhas):
+                resultado = ArtifactExporter._resultado_sarif(falha)
+                regras.setdefault(resultado["ruleId"], {
+                    "id": resultado["ruleId"],
+                    "name": falha.get("regra") or falha.get("tipo"),
+                    "shortDescription": {"text": falha.get("regra") or falha.get("tipo") or resultado["ruleId"]},
+                    "defaultConfiguration": {"level": resultado["level"]},
+                    "properties": {"tags": [falha.get("tipo")] if falha.get("tipo") else []},
+                })
+                f.write(("," if i else "") + json.dumps(resultado, ensure_ascii=False))
+            driver = {
+                "name": "SURF APP TESTER",
+                "version": ANALYZER_VERSION,
+                "rules": list(regras.values()),
+            }
+            f.write('], "tool": {"driver": %s}}]}' % json.dumps(driver, ensure_ascii=False))
+        os.replace(temporario, caminho)
+
+    @staticmethod
+    def caminho(pasta: str, nome: str) -> Optional[str]:
+        """Arquivo de um artefato na pasta do job (None se o nome não existir)."""
+        if nome not in ARTEFATOS:
+            return None
+        return os.path.join(pasta, ARTEFATOS[nome][0])
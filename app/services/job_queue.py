@@ -0,0 +1,177 @@
+# Arquivo: app/services/job_queue.py
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import JOB_MAX_WORKERS, JOB_HISTORICO_MAX
+
+
+class JobQueue:
+    """
+    Fila de execução do pipeline de análise com um pool limitado de workers.
+    Cada job possui seu próprio registro de estado, evitando que uploads
+    simultâneos sobrescrevam o estágio ou os resultados uns dos outros.
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, historico_max: int = JOB_HISTORICO_MAX):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="surf-job")
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._futures = {}
+        self._ouvintes: List[Callable[[Dict], None]] = []
+        self._ouvintes_descarte: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+        self._historico_max = historico_max
+
+    @staticmethod
+    def novo_id() -> str:
+        return uuid.uuid4().hex
+
+    def adicionar_ouvinte(self, callback: Callable[[Dict], None]) -> None:
+        """Registra uma função chamada (com uma cópia do job) a cada mudança de estado."""
+        self._ouvintes.append(callback)
+
+    def adicionar_ouvinte_descarte(self, callback: Callable[[Dict], None]) -> None:
+        """Registra uma função chamada com o registro de cada job finalizado descartado do histórico."""
+        self._ouvintes_descarte.append(callback)
+
+    def submeter(
+        self, job_id: str, arquivo: str, funcao: Callable, blobs: Optional[List[str]] = None, **parametros
+    ) -> Dict:
+        """
+        Enfileira a execução de `funcao(job_id, **parametros)` e retorna imediatamente
+        o registro inicial do job. `blobs` lista os SHA-256 dos uploads usados como
+        entrada (liberados quando o job sai do histórico).
+        """
+        job = {
+            "id": job_id,
+            "arquivo": arquivo,
+            "blobs": list(blobs or []),
+            "status": "QUEUED",
+            "stage": "QUEUED",
+            "criado_em": time.time(),
+            "iniciado_em": None,
+            "finalizado_em": None,
+            "resultado": None,
+            "erro": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            descartados = self._remover_antigos()
+            self._futures[job_id] = self._executor.submit(self._executar, job_id, funcao, parametros)
+        self._notificar_descarte(descartados)
+        self._notificar(job_id)
+        return self.obter(job_id)
+
+    def registrar_concluido(self, job_id: str, arquivo: str, resultado: Dict) -> Dict:
+        """Registra um job já concluído (ex: resultado servido pelo cache), sem passar pelo pool."""
+        agora = time.time()
+        job = {
+            "id": job_id,
+            "arquivo": arquivo,
+            "blobs": [],
+            "status": "COMPLETED",
+            "stage": "COMPLETED",
+            "criado_em": agora,
+            "iniciado_em": agora,
+            "finalizado_em": agora,
+            "resultado": resultado,
+            "erro": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            descartados = self._remover_antigos()
+        self._notificar_descarte(descartados)
+        self._notificar(job_id)
+        return self.obter(job_id)
+
+    def _executar(self, job_id: str, funcao: Callable, parametros: Dict) -> None:
+        self.atualizar(job_id, status="RUNNING", stage="STARTING", iniciado_em=time.time())
+        try:
+            resultado = funcao(job_id, **parametros)
+            self.atualizar(job_id, status="COMPLETED", stage="COMPLETED", resultado=resultado, finalizado_em=time.time())
+        except Exception as e:
+            print(f"❌ ERRO FATAL NO JOB {job_id}: {e}")
+            traceback.print_exc()
+            self.atualizar(
+                job_id, status="ERROR", stage="ERROR", finalizado_em=time.time(),
+                erro=f"Erro interno durante a análise: {str(e)}", detalhes=traceback.format_exc()
+            )
+
+    def atualizar(self, job_id: str, **campos) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(campos)
+        self._notificar(job_id)
+
+    def definir_estagio(self, job_id: str, estagio: str) -> None:
+        self.atualizar(job_id, stage=estagio)
+
+    def obter(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def aguardar(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Bloqueia até o job terminar (com sucesso ou erro) e retorna seu registro final."""
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.obter(job_id)
+
+    def listar(self, limite: int = 50) -> List[Dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())[-limite:]
+            return [{k: v for k, v in job.items() if k not in ("resultado", "detalhes")} for job in reversed(jobs)]
+
+    def ultimo_por_arquivo(self, arquivo: str) -> Optional[Dict]:
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job["arquivo"] == arquivo:
+                    return dict(job)
+        return None
+
+    def em_andamento(self) -> List[Dict]:
+        with self._lock:
+            return [dict(job) for job in self._jobs.values() if job["status"] in ("QUEUED", "RUNNING")]
+
+    def _remover_antigos(self) -> List[Dict]:
+        # Descarta os jobs finalizados mais antigos para limitar o uso de memória
+        descartados = []
+        excedente = len(self._jobs) - self._historico_max
+        for job_id in list(self._jobs.keys()):
+            if excedente <= 0:
+                break
+            if self._jobs[job_id]["status"] in ("COMPLETED", "ERROR"):
+                descartados.append(self._jobs.pop(job_id))
+                self._futures.pop(job_id, None)
+                excedente -= 1
+        return descartados
+
+    def _notificar_descarte(self, descartados: List[Dict]) -> None:
+        # Fora do lock: a limpeza (ex: remover a pasta do job) pode levar algum tempo
+        for job in descartados:
+            for callback in self._ouvintes_descarte:
+                try:
+                    callback(dict(job))
+                except Exception as e:
+                    print(f"Aviso: Falha ao descartar o job {job['id']}: {e}")
+
+    def _notificar(self, job_id: str) -> None:
+        job = self.obter(job_id)
+        if job is None:
+            return
+        for callback in self._ouvintes:
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"Aviso: Falha ao notificar ouvinte do job {job_id}: {e}")
+
+
+# Instância única usada pela API e pelo pipeline
+fila_jobs = JobQueue()
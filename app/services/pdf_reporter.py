@@ -3,42 +3,156 @@ from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak, KeepTogether
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, mm
+import json
 import os
 from datetime import datetime
+from functools import lru_cache
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from xml.sax.saxutils import escape
 
+from app.core.config import ANALYZER_VERSION, STORAGE_DIR
+
+# Linhas de falha por tabela (cada tabela cabe em uma página), quantidade de falhas
+# a partir da qual as células usam um único parágrafo (layout mais barato) e
+# quantidade de falhas com log no apêndice (as demais ficam no JSON Lines do relatório)
+LINHAS_POR_TABELA = 20
+FALHAS_DETALHADAS = 200
+APENDICE_MAX = 50
+
+
+class ReportTemplate:
+    """
+    Partes fixas do relatório: paleta, ParagraphStyles, estilos das tabelas e as
+    linhas fixas da capa. Construído uma vez por processo (`obter_template`); cada
+    relatório monta só o conteúdo dinâmico.
+    """
+
+    def __init__(self):
+        # --- Paleta de Cores Corporativa (Audit Style) ---
+        self.cores = {
+            "primaria": colors.HexColor("#1e293b"),        # Slate 800 (Titulos)
+            "destaque": colors.HexColor("#3b82f6"),        # Blue 500 (Destaques)
+            "fundo_cabecalho": colors.HexColor("#f1f5f9"), # Slate 100 (Fundo tabelas)
+            "texto": colors.HexColor("#334155"),           # Slate 700 (Texto corpo)
+            "s1": colors.HexColor("#dc2626"),              # Red 600
+            "s2": colors.HexColor("#f59e0b"),              # Amber 500
+            "borda": colors.HexColor("#cbd5e1"),           # Slate 300
+            "linha_alternada": colors.HexColor("#f8fafc"),
+        }
+        cor = self.cores
+
+        # --- Estilos Personalizados ---
+        styles = getSampleStyleSheet()
+        self.estilos = {
+            "cover_title": ParagraphStyle('CoverTitle', parent=styles['Title'], fontSize=28, textColor=cor["primaria"], spaceAfter=10, alignment=TA_CENTER),
+            "cover_sub": ParagraphStyle('CoverSub', parent=styles['Normal'], fontSize=14, textColor=colors.gray, alignment=TA_CENTER),
+            "h1": ParagraphStyle('H1Corp', parent=styles['Heading1'], fontSize=18, textColor=cor["primaria"], spaceBefore=20, spaceAfter=10, borderPadding=5),
+            "h2": ParagraphStyle('H2Corp', parent=styles['Heading2'], fontSize=14, textColor=cor["destaque"], spaceBefore=15, spaceAfter=8),
+            "normal": ParagraphStyle('BodyCorp', parent=styles['Normal'], fontSize=10, textColor=cor["texto"], leading=14),
+            "small": ParagraphStyle('SmallCorp', parent=styles['Normal'], fontSize=8, textColor=cor["texto"]),
+            "code": ParagraphStyle('CodeCorp', parent=styles['Normal'], fontName='Courier', fontSize=8, backColor=colors.whitesmoke, borderPadding=6, leading=10),
+        }
+
+        # --- Capa: selo de status (um estilo por decisão) e linhas fixas da tabela de informações ---
+        self.estilo_status = {
+            aprovado: TableStyle([
+                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+                ('TEXTCOLOR', (0,0), (-1,-1), cor_status),
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0,0), (-1,-1), 32),
+                ('BOX', (0,0), (-1,-1), 2, cor_status),
+                ('TOPPADDING', (0,0), (-1,-1), 20),
+                ('BOTTOMPADDING', (0,0), (-1,-1), 20),
+            ])
+            for aprovado, cor_status in ((True, colors.green), (False, cor["s1"]))
+        }
+        self.info_fixa = [
+            ["Ambiente:", "Android / Appium Automation"],
+            ["Versão da Plataforma:", f"v{ANALYZER_VERSION}"],
+        ]
+        self.estilo_info = TableStyle([
+            ('TEXTCOLOR', (0,0), (-1,-1), cor["texto"]),
+            ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'),
+            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 8),
+        ])
+
+        # --- Tabelas do corpo (comandos fixos; cada relatório acrescenta os dinâmicos) ---
+        self.comandos_metricas = [
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,0), 18),
+            ('TEXTCOLOR', (0,0), (-1,0), cor["primaria"]),
+            ('FONTSIZE', (0,1), (-1,1), 9),
+            ('TEXTCOLOR', (0,1), (-1,1), colors.gray),
+            ('TOPPADDING', (0,0), (-1,-1), 10),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 10),
+            ('GRID', (0,0), (-1,-1), 0.5, cor["borda"]),
+            ('BACKGROUND', (0,0), (-1,-1), colors.white),
+        ]
+        self.rotulos_metricas = ["Índice de Aprovação", "Total de Testes", "Falhas Críticas (S1)", "Falhas Médias (S2)"]
+        self.comandos_falhas = [
+            ('BACKGROUND', (0, 0), (-1, 0), cor["primaria"]),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('GRID', (0, 0), (-1, -1), 0.5, cor["borda"]),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, cor["linha_alternada"]]),
+            ('ALIGN', (1, 1), (1, -1), 'CENTER'),
+            ('FONTNAME', (1, 1), (1, -1), 'Helvetica-Bold'),
+        ]
+        self.cabecalho_falhas = ["ID / Cat.", "Severidade", "Descrição & Impacto", "Recomendação"]
+        self.estilo_imagem = TableStyle([
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('BOX', (0,0), (-1,-1), 1, cor["borda"]),
+            ('BACKGROUND', (0,0), (-1,-1), colors.whitesmoke),
+            ('TOPPADDING', (0,0), (-1,-1), 10),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 10),
+        ])
+
+
+@lru_cache(maxsize=1)
+def obter_template():
+    """Template do processo (criado no primeiro relatório ou no aquecimento)."""
+    return ReportTemplate()
+
+
+def aquecer_template():
+    """
+    Initializer dos processos de relatório: monta o template e carrega as métricas
+    das fontes usadas (Helvetica/Courier) antes do primeiro PDF.
+    """
+    template = obter_template()
+    for estilo in template.estilos.values():
+        Paragraph("<b>Aquecimento</b> <i>SURF</i>", estilo).wrap(400, 100)
+
+
 class PDFReporter:
     @staticmethod
-    def gerar(resultados, aprovado, motivos, fase="E2E"):
-        os.makedirs("storage", exist_ok=True)
-        filename = f"storage/relatorio_teste_{fase}.pdf"
+    def gerar(resultados, aprovado, motivos, fase="E2E", destino=None, screenshot=None):
+        """
+        Gera o PDF em `destino` (por padrão storage/relatorio_teste_{fase}.pdf) e
+        retorna sua URL em /storage. `screenshot` é a evidência final anexada, se existir.
+        """
+        filename = destino or os.path.join(STORAGE_DIR, f"relatorio_teste_{fase}.pdf")
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
         
         # Margens mais largas para aspecto profissional
         doc = SimpleDocTemplate(filename, pagesize=A4, rightMargin=20*mm, leftMargin=20*mm, topMargin=20*mm, bottomMargin=20*mm)
         
-        styles = getSampleStyleSheet()
         story = []
         
-        # --- Paleta de Cores Corporativa (Audit Style) ---
-        COLOR_PRIMARY = colors.HexColor("#1e293b")   # Slate 800 (Titulos)
-        COLOR_ACCENT = colors.HexColor("#3b82f6")    # Blue 500 (Destaques)
-        COLOR_BG_HEADER = colors.HexColor("#f1f5f9") # Slate 100 (Fundo tabelas)
-        COLOR_TEXT = colors.HexColor("#334155")      # Slate 700 (Texto corpo)
-        COLOR_S1 = colors.HexColor("#dc2626")        # Red 600
-        COLOR_S2 = colors.HexColor("#f59e0b")        # Amber 500
-        COLOR_BORDER = colors.HexColor("#cbd5e1")    # Slate 300
-        
-        # --- Estilos Personalizados ---
-        style_cover_title = ParagraphStyle('CoverTitle', parent=styles['Title'], fontSize=28, textColor=COLOR_PRIMARY, spaceAfter=10, alignment=TA_CENTER)
-        style_cover_sub = ParagraphStyle('CoverSub', parent=styles['Normal'], fontSize=14, textColor=colors.gray, alignment=TA_CENTER)
-        
-        style_h1 = ParagraphStyle('H1Corp', parent=styles['Heading1'], fontSize=18, textColor=COLOR_PRIMARY, spaceBefore=20, spaceAfter=10, borderPadding=5)
-        style_h2 = ParagraphStyle('H2Corp', parent=styles['Heading2'], fontSize=14, textColor=COLOR_ACCENT, spaceBefore=15, spaceAfter=8)
-        
-        style_normal = ParagraphStyle('BodyCorp', parent=styles['Normal'], fontSize=10, textColor=COLOR_TEXT, leading=14)
-        style_small = ParagraphStyle('SmallCorp', parent=styles['Normal'], fontSize=8, textColor=COLOR_TEXT)
-        style_code = ParagraphStyle('CodeCorp', parent=styles['Normal'], fontName='Courier', fontSize=8, backColor=colors.whitesmoke, borderPadding=6, leading=10)
+        # Paleta, estilos e tabelas fixas vêm do template do processo
+        template = obter_template()
+        estilos = template.estilos
+        style_cover_title = estilos["cover_title"]
+        style_cover_sub = estilos["cover_sub"]
+        style_h1 = estilos["h1"]
+        style_h2 = estilos["h2"]
+        style_normal = estilos["normal"]
+        style_small = estilos["small"]
+        style_code = estilos["code"]
         
         # =================================================================================
         # 1. CAPA
@@ -50,36 +164,19 @@ class PDFReporter:
         
         # Status Grande na Capa
         status_text = "APROVADO" if aprovado else "REPROVADO"
-        status_color = colors.green if aprovado else COLOR_S1
-        
         t_status_cover = Table([[status_text]], colWidths=[4*inch])
-        t_status_cover.setStyle(TableStyle([
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('TEXTCOLOR', (0,0), (-1,-1), status_color),
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,-1), 32),
-            ('BOX', (0,0), (-1,-1), 2, status_color),
-            ('TOPPADDING', (0,0), (-1,-1), 20),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 20),
-        ]))
+        t_status_cover.setStyle(template.estilo_status[bool(aprovado)])
         story.append(t_status_cover)
         
         story.append(Spacer(1, 2*inch))
         
-        # Info do Projeto na Capa
+        # Info do Projeto na Capa (data e fase; o restante é fixo)
         data_capa = [
             ["Data da Execução:", datetime.now().strftime('%d/%m/%Y às %H:%M')],
             ["Fase do Teste:", fase],
-            ["Ambiente:", "Android / Appium Automation"],
-            ["Versão da Plataforma:", "v2.4.0 (Enterprise)"]
-        ]
+        ] + template.info_fixa
         t_info = Table(data_capa, colWidths=[2*inch, 3*inch])
-        t_info.setStyle(TableStyle([
-            ('TEXTCOLOR', (0,0), (-1,-1), COLOR_TEXT),
-            ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 8),
-        ]))
+        t_info.setStyle(template.estilo_info)
         story.append(t_info)
         story.append(PageBreak())
 
@@ -99,23 +196,15 @@ class PDFReporter:
         # Grid de Métricas (2x2)
         data_metrics = [
             [f"{coverage:.1f}%", f"{total}", f"{s1_count}", f"{s2_count}"],
-            ["Índice de Aprovação", "Total de Testes", "Falhas Críticas (S1)", "Falhas Médias (S2)"]
+            template.rotulos_metricas
         ]
         
         t_metrics = Table(data_metrics, colWidths=[1.8*inch]*4)
-        t_metrics.setStyle(TableStyle([
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 18),
-            ('TEXTCOLOR', (0,0), (-1,0), COLOR_PRIMARY),
-            ('TEXTCOLOR', (2,0), (2,0), COLOR_S1 if s1_count > 0 else COLOR_PRIMARY), # Vermelho se tiver S1
-            ('FONTSIZE', (0,1), (-1,1), 9),
-            ('TEXTCOLOR', (0,1), (-1,1), colors.gray),
-            ('TOPPADDING', (0,0), (-1,-1), 10),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 10),
-            ('GRID', (0,0), (-1,-1), 0.5, COLOR_BORDER),
-            ('BACKGROUND', (0,0), (-1,-1), colors.white),
-        ]))
+        if s1_count > 0:
+            # Vermelho se tiver S1
+            t_metrics.setStyle(TableStyle(template.comandos_metricas + [('TEXTCOLOR', (2,0), (2,0), template.cores["s1"])]))
+        else:
+            t_metrics.setStyle(TableStyle(template.comandos_metricas))
         story.append(t_metrics)
         story.append(Spacer(1, 20))
         
@@ -145,90 +234,12 @@ class PDFReporter:
             story.append(Paragraph("A tabela abaixo lista as falhas identificadas, categorizadas por impacto no negócio e com recomendações de correção.", style_normal))
             story.append(Spacer(1, 10))
             
-            # Cabeçalho
-            data_exec = [["ID / Cat.", "Severidade", "Descrição & Impacto", "Recomendação"]]
-            
-            for falha in lista_falhas:
-                sev = falha['severidade']
-                msg = falha['mensagem']
-                teste_nome = falha['teste']
-                desc_teste = falha.get('descricao', 'Verificação de segurança e qualidade.')
-                
-                # Truncate message to prevent PDF overflow (Cell too large error)
-                if len(msg) > 1000:
-                    msg = msg[:1000] + " [...]"
-                
-                # --- Lógica de Inferência de Categoria e Ação ---
-                categoria = "Funcional"
-                acao = "Investigar logs técnicos."
-                impacto = "Possível instabilidade no uso do aplicativo."
-
-                msg_lower = msg.lower()
-                if "debug" in msg_lower: 
-                    categoria = "Segurança"
-                    acao = "Definir android:debuggable='false' no Manifesto."
-                    impacto = "Permite engenharia reversa e acesso total aos dados internos."
-                elif "backup" in msg_lower:
-                    categoria = "Privacidade"
-                    acao = "Definir android:allowBackup='false'."
-                    impacto = "Dados do usuário podem ser extraídos via ADB."
-                elif "assinatura" in msg_lower:
-                    categoria = "Release"
-                    acao = "Assinar APK com Keystore de produção."
-                    impacto = "Impede a publicação na Google Play Store."
-                elif "export" in msg_lower:
-                    categoria = "Segurança"
-                    acao = "Adicionar android:exported='false' ou permissões."
-                    impacto = "Outros apps podem lançar telas internas indevidamente."
-                elif "performance" in msg_lower or "frames" in msg_lower:
-                    categoria = "Performance"
-                    acao = "Otimizar layouts e reduzir operações na Main Thread."
-                    impacto = "Lentidão perceptível (Jank) afeta a experiência do usuário."
-                
-                # Formatação da Célula de Descrição
-                cell_desc = [
-                    Paragraph(f"<b>{teste_nome}</b>", style_small),
-                    Paragraph(f"<i>{desc_teste}</i>", style_small),
-                    Spacer(1, 4),
-                    Paragraph(f"<b>Erro:</b> {escape(msg)}", style_normal),
-                    Spacer(1, 4),
-                    Paragraph(f"<b>Impacto:</b> {impacto}", style_small)
-                ]
-                
-                data_exec.append([
-                    Paragraph(f"{categoria}", style_small),
-                    Paragraph(f"<b>{sev}</b>", style_normal),
-                    cell_desc,
-                    Paragraph(acao, style_small)
-                ])
-
-            # Larguras: ID/Cat (1.2), Sev (0.6), Desc (3.5), Rec (2.0)
-            t_exec = Table(data_exec, colWidths=[1.0*inch, 0.6*inch, 3.7*inch, 2.0*inch], splitByRow=1)
-            t_exec.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), COLOR_PRIMARY),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
-                
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('GRID', (0, 0), (-1, -1), 0.5, COLOR_BORDER),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f8fafc")]),
-            ]))
-            
-            # Colore a coluna de severidade condicionalmente
-            for i, row in enumerate(lista_falhas):
-                row_idx = i + 1
-                sev = row['severidade']
-                bg_color = COLOR_S1 if sev == "S1" else (COLOR_S2 if sev == "S2" else colors.white)
-                text_color = colors.white if sev in ["S1", "S2"] else colors.black
-                t_exec.setStyle(TableStyle([
-                    ('BACKGROUND', (1, row_idx), (1, row_idx), bg_color),
-                    ('TEXTCOLOR', (1, row_idx), (1, row_idx), text_color),
-                    ('ALIGN', (1, row_idx), (1, row_idx), 'CENTER'),
-                    ('FONTNAME', (1, row_idx), (1, row_idx), 'Helvetica-Bold'),
-                ]))
-
-            story.append(t_exec)
+            # Tabelas do tamanho de uma página: o ReportLab não re-divide uma tabela
+            # gigante a cada quebra de página (custo quadrático com milhares de linhas)
+            compacto = len(lista_falhas) > FALHAS_DETALHADAS
+            for inicio in range(0, len(lista_falhas), LINHAS_POR_TABELA):
+                bloco = lista_falhas[inicio:inicio + LINHAS_POR_TABELA]
+                story.append(PDFReporter._tabela_falhas(bloco, template, compacto))
         else:
             story.append(Paragraph("Nenhuma falha impeditiva encontrada.", style_normal))
 
@@ -241,12 +252,12 @@ class PDFReporter:
             story.append(Paragraph("Esta seção contém os stack traces originais para depuração pela equipe de desenvolvimento.", style_normal))
             story.append(Spacer(1, 10))
             
-            for falha in lista_falhas:
+            for falha in lista_falhas[:APENDICE_MAX]:
                 # Bloco KeepTogether para não quebrar título e log em páginas diferentes
                 content = []
-                content.append(Paragraph(f"🔴 {falha['teste']} ({falha['severidade']})", style_h2))
+                content.append(Paragraph(f"🔴 {escape(falha['teste'])} ({falha['severidade']})", style_h2))
                 
-                detalhes = falha.get('detalhes', 'Sem logs disponíveis.')
+                detalhes = falha.get('detalhes') or 'Sem logs disponíveis.'
                 # Limita tamanho para não explodir o PDF
                 if len(detalhes) > 2000: detalhes = detalhes[:2000] + "\n[... LOG TRUNCADO ...]"
                 
@@ -254,27 +265,118 @@ class PDFReporter:
                 content.append(Spacer(1, 15))
                 story.append(KeepTogether(content))
 
+            # Acima do limite, os logs ficam só no arquivo JSON Lines ao lado do PDF
+            url_log = PDFReporter._gravar_log_falhas(lista_falhas, filename)
+            omitidas = len(lista_falhas) - APENDICE_MAX
+            if omitidas > 0:
+                story.append(Paragraph(
+                    f"<b>{omitidas} falha(s) adicional(is) omitida(s) neste apêndice.</b> "
+                    f"Logs completos de todas as falhas (JSON Lines): {escape(url_log)}",
+                    style_normal
+                ))
+
         # =================================================================================
         # 5. EVIDÊNCIAS VISUAIS
         # =================================================================================
-        screenshot_path = "storage/screenshot_final.png"
-        if os.path.exists(screenshot_path):
+        screenshot_path = screenshot
+        if screenshot_path and os.path.exists(screenshot_path):
             story.append(PageBreak())
             story.append(Paragraph("4. Evidências Visuais", style_h1))
             try:
                 img = Image(screenshot_path, width=4*inch, height=7*inch, kind='proportional')
                 t_img = Table([[img]], colWidths=[6*inch])
-                t_img.setStyle(TableStyle([
-                    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                    ('BOX', (0,0), (-1,-1), 1, COLOR_BORDER),
-                    ('BACKGROUND', (0,0), (-1,-1), colors.whitesmoke),
-                    ('TOPPADDING', (0,0), (-1,-1), 10),
-                    ('BOTTOMPADDING', (0,0), (-1,-1), 10),
-                ]))
+                t_img.setStyle(template.estilo_imagem)
                 story.append(t_img)
                 story.append(Paragraph("Figura 1: Estado final da interface durante o teste.", style_small))
             except:
                 pass
 
         doc.build(story)
-        return f"/storage/relatorio_teste_{fase}.pdf"
\ No newline at end of file
+        return "/storage/" + os.path.relpath(filename, STORAGE_DIR).replace(os.sep, "/")
+
+    @staticmethod
+    def _categorizar(msg):
+        """Inferência de categoria, ação recomendada e impacto a partir da mensagem da falha."""
+        msg_lower = msg.lower()
+        if "debug" in msg_lower:
+            return ("Segurança", "Definir android:debuggable='false' no Manifesto.",
+                    "Permite engenharia reversa e acesso total aos dados internos.")
+        if "backup" in msg_lower:
+            return ("Privacidade", "Definir android:allowBackup='false'.",
+                    "Dados do usuário podem ser extraídos via ADB.")
+        if "assinatura" in msg_lower:
+            return ("Release", "Assinar APK com Keystore de produção.",
+                    "Impede a publicação na Google Play Store.")
+        if "export" in msg_lower:
+            return ("Segurança", "Adicionar android:exported='false' ou permissões.",
+                    "Outros apps podem lançar telas internas indevidamente.")
+        if "performance" in msg_lower or "frames" in msg_lower:
+            return ("Performance", "Otimizar layouts e reduzir operações na Main Thread.",
+                    "Lentidão perceptível (Jank) afeta a experiência do usuário.")
+        return ("Funcional", "Investigar logs técnicos.", "Possível instabilidade no uso do aplicativo.")
+
+    @staticmethod
+    def _tabela_falhas(falhas, template, compacto):
+        """
+        Uma tabela (cabeçalho + até LINHAS_POR_TABELA falhas) com todo o estilo montado
+        em uma única lista, incluindo as cores da coluna de severidade.
+        No modo `compacto` a célula de descrição é um só parágrafo (sem flowables aninhados).
+        """
+        style_small, style_normal = template.estilos["small"], template.estilos["normal"]
+        cores = template.cores
+        data_exec = [template.cabecalho_falhas]
+        comandos = list(template.comandos_falhas)
+
+        for linha, falha in enumerate(falhas, start=1):
+            sev = falha['severidade']
+            msg = falha['mensagem']
+            teste_nome = escape(falha['teste'])
+            desc_teste = falha.get('descricao') or 'Verificação de segurança e qualidade.'
+
+            # Trunca a mensagem para não estourar a célula (Cell too large error)
+            if len(msg) > 1000:
+                msg = msg[:1000] + " [...]"
+            categoria, acao, impacto = PDFReporter._categorizar(msg)
+
+            if compacto:
+                cell_desc = Paragraph(
+                    f"<b>{teste_nome}</b><br/><b>Erro:</b> {escape(msg)}<br/><i>Impacto:</i> {impacto}", style_small
+                )
+            else:
+                cell_desc = [
+                    Paragraph(f"<b>{teste_nome}</b>", style_small),
+                    Paragraph(f"<i>{desc_teste}</i>", style_small),
+                    Spacer(1, 4),
+                    Paragraph(f"<b>Erro:</b> {escape(msg)}", style_normal),
+                    Spacer(1, 4),
+                    Paragraph(f"<b>Impacto:</b> {impacto}", style_small)
+                ]
+
+            data_exec.append([
+                Paragraph(categoria, style_small),
+                Paragraph(f"<b>{sev}</b>", style_normal),
+                cell_desc,
+                Paragraph(acao, style_small)
+            ])
+            # Colore a coluna de severidade (S1/S2)
+            if sev in ("S1", "S2"):
+                comandos.append(('BACKGROUND', (1, linha), (1, linha), cores["s1"] if sev == "S1" else cores["s2"]))
+                comandos.append(('TEXTCOLOR', (1, linha), (1, linha), colors.white))
+
+        # Larguras: ID/Cat (1.0), Sev (0.6), Desc (3.7), Rec (2.0)
+        t_exec = Table(data_exec, colWidths=[1.0*inch, 0.6*inch, 3.7*inch, 2.0*inch], repeatRows=1, splitByRow=1)
+        t_exec.setStyle(TableStyle(comandos))
+        return t_exec
+
+    @staticmethod
+    def caminho_log_falhas(caminho_pdf):
+        """Arquivo JSON Lines com todas as falhas (e logs completos) ao lado do PDF."""
+        return os.path.splitext(caminho_pdf)[0] + "_falhas.jsonl"
+
+    @staticmethod
+    def _gravar_log_falhas(lista_falhas, caminho_pdf):
+        caminho = PDFReporter.caminho_log_falhas(caminho_pdf)
+        with open(caminho, "w", encoding="utf-8") as f:
+            for falha in lista_falhas:
+                f.write(json.dumps(falha, ensure_ascii=False) + "\n")
+        return "/storage/" + os.path.relpath(caminho, STORAGE_DIR).replace(os.sep, "/")
@@ -0,0 +1,317 @@
+# Arquivo: app/services/pipeline.py
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+from app.core.config import METRICAS_RUNTIME, PYTEST_FATIAS, SESSAO_REUSO, STORAGE_DIR, TESTES_SIMULADOS
+from app.core.quality_gate import QualityGateEvaluator
+from app.services.apk_analyzer import ApkAnalyzer
+from app.services.apk_model import ApkModel
+from app.services.device_pool import pool_dispositivos
+from app.services.event_bus import barramento_eventos
+from app.services.exporters import ArtifactExporter
+from app.services.job_queue import fila_jobs
+from app.services.pytest_pool import pool_pytest
+from app.services.report_queue import fila_relatorios
+from app.services.result_cache import ResultCache, cache_resultados
+from app.services.runtime_metrics import MetricsSampler
+from app.services.test_runner import TestRunner
+
+
+class AnalysisPipeline:
+    @staticmethod
+    def pasta_job(job_id: str) -> str:
+        """Pasta exclusiva do job dentro do storage (uploads e artefatos)."""
+        pasta = os.path.join(STORAGE_DIR, "jobs", job_id)
+        os.makedirs(pasta, exist_ok=True)
+        return pasta
+
+    @staticmethod
+    def remover_pasta_job(job_id: str) -> None:
+        """Apaga a pasta do job (entradas, relatório e artefatos)."""
+        shutil.rmtree(os.path.join(STORAGE_DIR, "jobs", job_id), ignore_errors=True)
+
+    @staticmethod
+    def limpar_pastas_antigas(manter: int) -> int:
+        """
+        Retenção no disco: mantém só as `manter` pastas de job mais recentes. Usado na
+        subida do servidor, quando as pastas de execuções anteriores não estão mais
+        no histórico em memória da fila (que as removeria ao descartar o job).
+        """
+        raiz = os.path.join(STORAGE_DIR, "jobs")
+        if not os.path.isdir(raiz):
+            return 0
+        pastas = sorted(
+            (entrada for entrada in os.scandir(raiz) if entrada.is_dir()),
+            key=lambda entrada: entrada.stat().st_mtime, reverse=True,
+        )
+        for entrada in pastas[manter:]:
+            shutil.rmtree(entrada.path, ignore_errors=True)
+        return max(len(pastas) - manter, 0)
+
+    @staticmethod
+    def _progresso(job_id: str, tipo: str, etapa: str):
+        """Callback (concluidos, total) que publica o progresso no barramento de eventos."""
+        def publicar(concluidos: int, total: int) -> None:
+            barramento_eventos.publicar(job_id, tipo, {"etapa": etapa, "concluidos": concluidos, "total": total})
+        return publicar
+
+    @staticmethod
+    def _finalizar_metricas(amostrador: MetricsSampler, modelo: ApkModel, arquivo_metricas: str) -> None:
+        """Encerra a amostragem, mede a inicialização do app e grava o resumo das métricas."""
+        try:
+            amostrador.parar()
+            activity = modelo.get_main_activity()
+            if activity:
+                amostrador.medir_inicializacao(activity)
+            amostrador.salvar(arquivo_metricas)
+        except Exception as e:
+            print(f"⚠️ Falha ao coletar métricas de runtime: {e}")
+
+    @staticmethod
+    def executar(
+        job_id: str,
+        caminho_apk: Optional[str] = None,
+        caminho_codigo: Optional[str] = None,
+        fase: str = "E2E",
+        nome_apk: Optional[str] = None,
+        nome_codigo: Optional[str] = None,
+        sha256_apk: Optional[str] = None,
+        chave_cache: Optional[str] = None,
+        projeto: Optional[str] = None,
+    ) -> Dict:
+        """
+        Ciclo completo de um job:
+        1. Análise Estática de Código (Segurança)
+        2. Testes Dinâmicos (Simulação)
+        3. Quality Gate (Aprovação/Reprovação)
+        4. Geração de PDF (em segundo plano: o resultado é retornado com a decisão do
+           Quality Gate e `relatorio_status="GERANDO"`; o job é atualizado quando o PDF fica pronto)
+        Com `chave_cache`, o resultado final (com o PDF e os artefatos) é gravado no cache depois do relatório.
+        Com `projeto` (padrão: pacote do APK), o código fonte é varrido de forma incremental
+        em relação ao último upload do mesmo projeto.
+        """
+        pasta = AnalysisPipeline.pasta_job(job_id)
+        # Artefatos para CI (SARIF, JSON Lines, JUnit), gravados ao fim de cada estágio
+        exportador = ArtifactExporter(pasta)
+        fila_jobs.definir_estagio(job_id, "SAST")
+
+        # 1. PARSE ÚNICO DO APK (reaproveitado pelo SAST e pelas suítes de teste)
+        modelo = None
+        if caminho_apk:
+            try:
+                modelo = ApkModel.carregar_ou_construir(
+                    caminho_apk, sha256_apk,
+                    ao_processar_dex=AnalysisPipeline._progresso(job_id, "sast_progresso", "dex")
+                )
+            except Exception as e:
+                print(f"ERRO CRÍTICO ao ler APK: {e}")
+
+        # 1.1 ANÁLISE DO CÓDIGO FONTE (SE HOUVER)
+        resultado_source = {"falhas_encontradas": []}
+        if caminho_codigo:
+            print("Iniciando varredura do Código Fonte...")
+            # Sem projeto informado, o índice incremental é o do pacote do app (se houver APK)
+            projeto = projeto or (modelo.get_package() if modelo else None)
+            resultado_source = ApkAnalyzer.analisar_source_code(
+                caminho_codigo, projeto,
+                ao_progresso=AnalysisPipeline._progresso(job_id, "sast_progresso", "codigo_fonte")
+            )
+
+        # --- ANÁLISE ESTÁTICA DO CÓDIGO (SAST) ---
+        print("Iniciando Análise de Código e Segurança...")
+        fila_jobs.definir_estagio(job_id, "SAST_RUNNING")
+
+        resultado_codigo = {"falhas_encontradas": []}
+        if caminho_apk:
+            resultado_codigo = ApkAnalyzer.analisar_codigo(caminho_apk, modelo)
+        else:
+            print("Nenhum APK enviado. Pulando análise de binário.")
+
+        # Extrai falhas do código para somar no Quality Gate
+        # Junta falhas do APK (Engenharia Reversa) + Falhas do ZIP (Código Fonte)
+        falhas_apk = resultado_codigo.get("falhas_encontradas", [])
+        falhas_source = resultado_source.get("falhas_encontradas", [])
+        falhas_codigo = falhas_apk + falhas_source
+
+        s1_codigo = sum(1 for f in falhas_codigo if f['severidade'] == 'S1')
+        s2_codigo = sum(1 for f in falhas_codigo if f['severidade'] == 'S2')
+
+        print(f"Análise de Código concluída. S1: {s1_codigo}, S2: {s2_codigo}")
+        exportador.registrar_achados(falhas_apk, falhas_source)
+
+        # 2. CONFIGURAR AMBIENTE E RODAR TESTES DINÂMICOS (DAST)
+        fila_jobs.definir_estagio(job_id, "DAST")
+
+        resultados_testes = None
+        modo_execucao = "APENAS_CODIGO_FONTE"
+
+        arquivo_screenshot = os.path.join(pasta, "screenshot_final.png")
+        if caminho_apk:
+            ambiente = {
+                "TARGET_APK_PATH": os.path.abspath(caminho_apk),
+                # Semente das checagens simuladas (quando habilitadas): o mesmo APK, o mesmo resultado
+                "TARGET_APK_SHA256": sha256_apk or (modelo.sha256 if modelo else ""),
+                "SURF_TESTES_SIMULADOS": "1" if TESTES_SIMULADOS else "0",
+            }
+            if modelo:
+                ambiente["TARGET_APK_MODEL"] = os.path.abspath(ApkModel.caminho_cache(modelo.sha256))
+            arquivo_xml = os.path.join(pasta, "test_results.xml")
+            arquivo_metricas = os.path.join(pasta, "runtime_metrics.json")
+            # Evidência final dos testes mobile, anexada ao PDF deste job
+            ambiente["TARGET_SCREENSHOT_PATH"] = os.path.abspath(arquivo_screenshot)
+            # O stream leva só o essencial de cada teste (o traceback fica no resultado final)
+            ao_resultado = lambda teste: barramento_eventos.publicar(job_id, "teste", {
+                chave: teste.get(chave) for chave in ("nome", "classname", "status", "fase", "duracao", "severidade")
+            })
+
+            # Tenta rodar testes mobile reais (Appium) primeiro
+            caminho_testes = "tests_mobile"
+            modo_execucao = "REAL_DEVICE"
+
+            print(f"Tentando executar testes em: {caminho_testes}")
+            try:
+                # Arrenda um celular livre da farm (e a porta do Appium dedicada a ele)
+                with pool_dispositivos.arrendar(job_id) as dispositivo:
+                    ambiente_mobile = dict(
+                        ambiente,
+                        TARGET_DEVICE_SERIAL=dispositivo["serial"],
+                        APPIUM_SERVER_URL=dispositivo["url_appium"],
+                        APPIUM_SYSTEM_PORT=str(dispositivo["system_port"]),
+                        # Sessão quente por aparelho: só faz sentido nos workers persistentes do pytest
+                        APPIUM_REUSAR_SESSAO="1" if SESSAO_REUSO and pool_pytest.processos > 0 else "0",
+                    )
+
+                    # Métricas reais de runtime (memória, CPU, frames) amostradas durante os testes
+                    amostrador = None
+                    if METRICAS_RUNTIME and modelo is not None:
+                        amostrador = MetricsSampler(modelo.get_package(), dispositivo["serial"]).iniciar()
+
+                    try:
+                        # Rodamos o TestRunner (no worker que já tem a sessão deste aparelho, se houver)
+                        resultados_testes = TestRunner.executar_testes(
+                            caminho_testes, arquivo_xml, ambiente_mobile, ao_resultado, afinidade=dispositivo["serial"]
+                        )
+                    finally:
+                        if amostrador is not None:
+                            AnalysisPipeline._finalizar_metricas(amostrador, modelo, arquivo_metricas)
+
+                    # Se não retornou nada ou zero testes, assume falha de conexão com Appium
+                    if not resultados_testes or resultados_testes.get('total_testes', 0) == 0:
+                        raise Exception("Falha de conexão com Appium ou nenhum teste encontrado.")
+
+                    # Se rodou mas TUDO falhou (0 aprovados), assume erro de ambiente (ex: Appium travado)
+                    # e força o fallback para Simulação para o usuário ver o fluxo funcionar.
+                    if resultados_testes.get('aprovados', 0) == 0:
+                        raise Exception("Todos os testes mobile falharam (provável erro de conexão).")
+
+            except Exception as e:
+                print(f"⚠️ Ambiente mobile indisponível: {e}")
+                print("ℹ️ Executando Análise Estática Avançada (Verificação estrutural e de segurança).")
+                caminho_testes = "tests_repo"
+                modo_execucao = "ANALISE_ESTATICA"
+                if os.path.exists(arquivo_metricas):
+                    # Os testes de performance usam as métricas medidas antes da falha
+                    ambiente["TARGET_RUNTIME_METRICS"] = os.path.abspath(arquivo_metricas)
+                # Checagens independentes: divididas entre os workers, compartilhando o modelo do APK
+                resultados_testes = TestRunner.executar_testes(
+                    caminho_testes, arquivo_xml, ambiente, ao_resultado, fatias=PYTEST_FATIAS
+                )
+
+        if not resultados_testes:
+            # Fallback se o teste falhar em gerar XML
+            resultados_testes = {
+                "total_testes": 0, "executados": 0, "aprovados": 0,
+                "defeitos_s1": 0, "defeitos_s2": 0, "falhas_por_area": {},
+                "lista_testes": []
+            }
+
+        exportador.registrar_testes(resultados_testes)
+
+        metricas_runtime = MetricsSampler.carregar(arquivo_metricas) if caminho_apk else None
+        if metricas_runtime:
+            resultados_testes["metricas_runtime"] = metricas_runtime
+
+        # 3. UNIFICAR OS RESULTADOS (CÓDIGO + TESTES)
+        total_s1 = resultados_testes['defeitos_s1'] + s1_codigo
+        total_s2 = resultados_testes['defeitos_s2'] + s2_codigo
+
+        # Adiciona as falhas de código na lista de "motivos" do Quality Gate
+        motivos_codigo = [f"[CÓDIGO] {f['mensagem']}" for f in falhas_codigo]
+
+        # 4. QUALITY GATE & RELATÓRIO
+        fila_jobs.definir_estagio(job_id, "QUALITY_GATE")
+        aprovado, motivos_gate = QualityGateEvaluator.avaliar_e2e_para_uat(
+            resultados_testes['total_testes'],
+            resultados_testes['executados'],
+            resultados_testes['aprovados'],
+            total_s1, # Soma total de defeitos críticos
+            total_s2,
+            resultados_testes['falhas_por_area']
+        )
+
+        metricas_ok, motivos_runtime = QualityGateEvaluator.avaliar_metricas_runtime(metricas_runtime)
+        if not metricas_ok:
+            aprovado = False
+
+        # Junta todos os motivos
+        todos_motivos = motivos_codigo + motivos_gate + motivos_runtime
+
+        # Garante reprovação se houver falha de código crítica
+        if s1_codigo > 0:
+            aprovado = False
+
+        resultado = {
+            "job_id": job_id,
+            "fase": fase,
+            "sha256_apk": sha256_apk,
+            "arquivo": nome_apk or "Não fornecido",
+            "codigo_fonte": nome_codigo or "Não fornecido",
+            "app_name": resultado_codigo.get("app_name"),
+            "package": resultado_codigo.get("package"),
+            "version_code": resultado_codigo.get("version_code"),
+            "analise_estatica": {
+                "debuggable": "Sim (FALHA)" if s1_codigo > 0 else "Não (OK)",
+                # DEX ou arquivos do código fonte que o pool não conseguiu varrer
+                "completa": not any(f.get("tipo") == "ANÁLISE INCOMPLETA" for f in falhas_codigo),
+                "falhas_identificadas": falhas_codigo
+            },
+            "analise_dinamica": resultados_testes,
+            "status_final": "APROVADO" if aprovado else "REPROVADO",
+            "s1_total": total_s1,
+            "s2_total": total_s2,
+            "motivos": todos_motivos,
+            "relatorio_pdf": None,
+            "relatorio_status": "GERANDO",
+            "modo_execucao": modo_execucao
+        }
+        exportador.registrar_resumo(resultado)
+        resultado["artefatos"] = exportador.artefatos()
+
+        # 5. RELATÓRIO PDF (em segundo plano, arquivo exclusivo do job)
+        caminho_pdf = os.path.join(pasta, f"relatorio_{fase}.pdf")
+        fila_relatorios.submeter(
+            resultados_testes, aprovado, todos_motivos, fase, caminho_pdf, arquivo_screenshot,
+            ao_concluir=lambda url, erro: AnalysisPipeline._relatorio_concluido(
+                job_id, resultado, caminho_pdf, url, erro, chave_cache
+            )
+        )
+        return resultado
+
+    @staticmethod
+    def _relatorio_concluido(
+        job_id: str, resultado: Dict, caminho_pdf: str, url: Optional[str], erro: Optional[str],
+        chave_cache: Optional[str],
+    ) -> None:
+        """Anexa o PDF ao resultado do job (e grava no cache) quando a geração termina."""
+        # O PDF pode ficar pronto antes de a fila registrar o job como concluído
+        fila_jobs.aguardar(job_id)
+        if erro or not url:
+            resultado = dict(resultado, relatorio_status="ERRO", relatorio_erro=erro)
+        else:
+            resultado = dict(resultado, relatorio_pdf=f"{url}?t={int(time.time())}", relatorio_status="PRONTO")
+            if chave_cache and ResultCache.cacheavel(resultado):
+                # Só resultados com relatório (e reproduzíveis, ver ResultCache.cacheavel) entram no cache
+                resultado = cache_resultados.salvar(chave_cache, resultado, caminho_pdf)
+        fila_jobs.atualizar(job_id, resultado=resultado)
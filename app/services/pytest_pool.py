@@ -0,0 +1,216 @@
+# Arquivo: app/services/pytest_pool.py
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import PYTEST_MAX_EXECUCOES, PYTEST_PROCESSOS, PYTEST_TIMEOUT
+
+# Módulos carregados uma única vez por worker, antes da primeira execução
+PRE_IMPORTS = (
+    "pytest",
+    "androguard.core.apk",
+    "appium.webdriver",
+    "selenium.webdriver",
+    "app.services.apk_model",
+    "app.services.test_runner",
+)
+
+
+def _remover_modulos_de_teste(caminho_testes: str) -> None:
+    """Descarta do sys.modules os módulos da suíte (a próxima execução os coleta de novo)."""
+    raiz = os.path.abspath(caminho_testes) + os.sep
+    for nome, modulo in list(sys.modules.items()):
+        arquivo = getattr(modulo, "__file__", None)
+        if arquivo and os.path.abspath(arquivo).startswith(raiz):
+            del sys.modules[nome]
+
+
+def _worker_pytest(conexao) -> None:
+    """
+    Loop de um processo worker: pré-importa as dependências pesadas e executa
+    uma suíte por mensagem recebida, enviando cada resultado de teste pelo Pipe.
+    """
+    for modulo in PRE_IMPORTS:
+        try:
+            importlib.import_module(modulo)
+        except Exception:
+            pass # Dependência opcional (ex: appium ausente no ambiente)
+
+    import pytest
+    from app.services.test_runner import ResultCollector, ShardPlugin
+
+    conexao.send(("pronto", os.getpid()))
+    while True:
+        try:
+            tarefa = conexao.recv()
+        except EOFError:
+            return
+        if tarefa is None:
+            # Encerramento normal: fecha as sessões do Appium mantidas entre execuções
+            from app.services.session_broker import sessoes_appium
+            sessoes_appium.encerrar_todas()
+            return
+
+        ambiente_anterior = {chave: os.environ.get(chave) for chave in tarefa["ambiente"]}
+        os.environ.update(tarefa["ambiente"])
+        try:
+            plugins = [ResultCollector(lambda teste: conexao.send(("teste", teste)))]
+            if tarefa.get("fatia"):
+                plugins.append(ShardPlugin(*tarefa["fatia"]))
+            codigo = pytest.main(tarefa["argumentos"], plugins=plugins)
+            conexao.send(("fim", int(codigo)))
+        except Exception as e:
+            conexao.send(("erro", str(e)))
+        finally:
+            for chave, valor in ambiente_anterior.items():
+                if valor is None:
+                    os.environ.pop(chave, None)
+                else:
+                    os.environ[chave] = valor
+            _remover_modulos_de_teste(tarefa["caminho_testes"])
+
+
+class PytestTimeout(Exception):
+    pass
+
+
+class _Worker:
+    def __init__(self, contexto):
+        self.conexao, conexao_filho = contexto.Pipe()
+        self.processo = contexto.Process(target=_worker_pytest, args=(conexao_filho,), daemon=True)
+        self.processo.start()
+        conexao_filho.close()
+        self.execucoes = 0
+        self.afinidades = set()
+
+    def encerrar(self, forcar: bool = False) -> None:
+        if not forcar:
+            try:
+                self.conexao.send(None)
+            except (OSError, EOFError):
+                pass
+            self.processo.join(5)
+        if self.processo.is_alive():
+            self.processo.terminate()
+            self.processo.join(5)
+            if self.processo.is_alive():
+                self.processo.kill()
+                self.processo.join()
+        self.conexao.close()
+
+
+class PytestWorkerPool:
+    """
+    Pool de processos pré-aquecidos para executar o pytest fora do servidor.
+
+    Cada worker já tem pytest, androguard e appium importados; recebe o caminho da
+    suíte, os argumentos e as variáveis de ambiente do job, e devolve os resultados
+    pelo Pipe conforme os testes terminam. Uma execução que passa do tempo limite
+    tem o processo morto (a API não trava junto) e o worker é substituído; cada
+    worker também é reciclado após `max_execucoes` suítes.
+    """
+
+    def __init__(self, processos: int = PYTEST_PROCESSOS, max_execucoes: int = PYTEST_MAX_EXECUCOES):
+        self.processos = processos
+        self.max_execucoes = max_execucoes
+        self._contexto = multiprocessing.get_context("spawn")
+        self._livres: List[_Worker] = []
+        self._criados = 0
+        self._condicao = threading.Condition()
+
+    def aquecer(self) -> None:
+        """Sobe todos os workers de uma vez (chamado na inicialização da API)."""
+        with self._condicao:
+            while self._criados < self.processos:
+                self._livres.append(_Worker(self._contexto))
+                self._criados += 1
+            self._condicao.notify_all()
+
+    def executar(
+        self,
+        caminho_testes: str,
+        argumentos: List[str],
+        ambiente: Optional[Dict[str, str]] = None,
+        ao_resultado: Optional[Callable[[Dict], None]] = None,
+        timeout: int = PYTEST_TIMEOUT,
+        fatia: Optional[Tuple[int, int]] = None,
+        afinidade: Optional[str] = None,
+    ) -> int:
+        """
+        Executa a suíte em um worker livre (aguardando um, se necessário) e retorna
+        o código de saída do pytest. Lança PytestTimeout se o prazo estourar.
+        `fatia=(indice, total)` restringe a execução a uma parte da suíte.
+        `afinidade` (ex: serial do dispositivo) prefere o worker que já executou
+        com a mesma chave, onde a sessão do Appium continua aberta.
+        """
+        worker = self._obter_worker(afinidade)
+        if afinidade:
+            worker.afinidades.add(afinidade)
+        concluido = False
+        try:
+            worker.conexao.send({
+                "caminho_testes": caminho_testes,
+                "argumentos": argumentos,
+                "ambiente": ambiente or {},
+                "fatia": fatia,
+            })
+            prazo = time.monotonic() + timeout
+            while True:
+                restante = prazo - time.monotonic()
+                if restante <= 0 or not worker.conexao.poll(restante):
+                    raise PytestTimeout(f"Suíte {caminho_testes} excedeu o tempo limite de {timeout}s")
+                tipo, dados = worker.conexao.recv()
+                if tipo == "pronto":
+                    continue
+                if tipo == "teste":
+                    if ao_resultado:
+                        ao_resultado(dados)
+                    continue
+                if tipo == "erro":
+                    raise RuntimeError(f"Falha ao executar o pytest no worker: {dados}")
+                worker.execucoes += 1
+                concluido = True
+                return dados
+        except EOFError:
+            raise RuntimeError("Worker do pytest encerrado durante a execução")
+        finally:
+            self._devolver_worker(worker, concluido)
+
+    def encerrar(self) -> None:
+        with self._condicao:
+            for worker in self._livres:
+                worker.encerrar()
+            self._livres = []
+            self._criados = 0
+
+    def _obter_worker(self, afinidade: Optional[str] = None) -> _Worker:
+        with self._condicao:
+            while True:
+                if self._livres:
+                    # Prefere o worker com afinidade; senão o que não tem afinidade com ninguém
+                    escolhido = next((w for w in self._livres if afinidade and afinidade in w.afinidades), None)
+                    escolhido = escolhido or min(self._livres, key=lambda w: len(w.afinidades))
+                    self._livres.remove(escolhido)
+                    return escolhido
+                if self._criados < self.processos:
+                    self._criados += 1
+                    return _Worker(self._contexto)
+                self._condicao.wait()
+
+    def _devolver_worker(self, worker: _Worker, concluido: bool) -> None:
+        if not (concluido and worker.execucoes < self.max_execucoes and worker.processo.is_alive()):
+            # Execução interrompida (o processo é morto) ou limite de execuções atingido
+            # (encerramento normal, que fecha as sessões do Appium): substitui por um novo
+            worker.encerrar(forcar=not concluido)
+            worker = _Worker(self._contexto)
+        with self._condicao:
+            self._livres.append(worker)
+            self._condicao.notify()
+
+
+# Instância única usada pelo TestRunner
+pool_pytest = PytestWorkerPool()
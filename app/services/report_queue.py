@@ -0,0 +1,115 @@
+# Arquivo: app/services/report_queue.py
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import RELATORIO_PROCESSOS, RELATORIO_TIMEOUT
+from app.services.pdf_reporter import PDFReporter, aquecer_template
+
+
+class ReportQueue:
+    """
+    Geração dos relatórios PDF fora do ciclo do job. O pipeline entrega a decisão
+    do Quality Gate e segue em frente; o PDF é montado em um pool de processos
+    próprio ("spawn", como os demais pools) e, ao terminar, `ao_concluir(url, erro)`
+    é chamado em uma thread da fila (nunca na thread do job que o submeteu).
+    Um relatório que estoura o tempo limite tem o processo encerrado (o pool é
+    recriado; os relatórios que estavam no mesmo pool são reenviados uma vez).
+    Com `processos=0` o PDF é gerado direto nessa thread.
+    """
+
+    def __init__(
+        self,
+        processos: int = RELATORIO_PROCESSOS,
+        timeout: int = RELATORIO_TIMEOUT,
+        gerar: Callable[..., str] = PDFReporter.gerar,
+    ):
+        self.processos = processos
+        self.timeout = timeout
+        # Função que monta o PDF (precisa ser importável pelos processos "spawn")
+        self._gerar_pdf = gerar
+        self._executor = ThreadPoolExecutor(max_workers=max(processos, 1), thread_name_prefix="surf-relatorio")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool_processos(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Cada processo monta o template do relatório (estilos, fontes) uma única vez
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processos, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=aquecer_template,
+                )
+            return self._pool
+
+    def _descartar_pool(self, pool: ProcessPoolExecutor, encerrar_processos: bool = False) -> None:
+        # Um processo que morre (ex: falta de memória) quebra o executor inteiro: recria no próximo uso
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        if encerrar_processos:
+            # O executor não cancela uma tarefa em andamento: o processo travado é encerrado à força
+            for processo in list((pool._processes or {}).values()):
+                processo.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def submeter(
+        self,
+        resultados: Dict,
+        aprovado: bool,
+        motivos: List[str],
+        fase: str,
+        destino: str,
+        screenshot: Optional[str],
+        ao_concluir: Callable[[Optional[str], Optional[str]], None],
+    ) -> Future:
+        """Agenda o PDF do job; `ao_concluir` recebe a URL gerada ou a mensagem de erro."""
+        argumentos = (resultados, aprovado, motivos, fase, destino, screenshot)
+        return self._executor.submit(self._gerar, argumentos, ao_concluir)
+
+    def _gerar(self, argumentos: tuple, ao_concluir: Callable[[Optional[str], Optional[str]], None]) -> None:
+        url, erro = None, None
+        try:
+            if self.processos <= 0:
+                url = self._gerar_pdf(*argumentos)
+            else:
+                url = self._gerar_no_pool(argumentos)
+        except TimeoutError:
+            erro = f"Tempo limite de {self.timeout}s excedido na geração do relatório"
+        except Exception as e:
+            erro = f"Falha ao gerar o relatório: {e}"
+
+        if erro:
+            print(f"⚠️ {erro}")
+        try:
+            ao_concluir(url, erro)
+        except Exception as e:
+            print(f"Aviso: Falha ao finalizar o relatório: {e}")
+
+    def _gerar_no_pool(self, argumentos: tuple) -> str:
+        for tentativa in range(2):
+            pool = self._pool_processos()
+            try:
+                return pool.submit(self._gerar_pdf, *argumentos).result(timeout=self.timeout)
+            except TimeoutError:
+                # O worker seguiria preso neste PDF ocupando a vaga: encerra os processos e recria o pool
+                self._descartar_pool(pool, encerrar_processos=True)
+                raise
+            except BrokenProcessPool:
+                self._descartar_pool(pool)
+                # O pool pode ter sido encerrado pelo tempo limite de outro relatório: tenta uma vez num pool novo
+                if tentativa:
+                    raise
+
+    def encerrar(self) -> None:
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# Instância única usada pelo pipeline
+fila_relatorios = ReportQueue()
@@ -0,0 +1,135 @@
+# Arquivo: app/services/result_cache.py
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config import ANALYZER_VERSION, CACHE_MAX_BYTES, STORAGE_DIR, TESTES_SIMULADOS
+from app.services.secret_scanner import VERSAO_REGRAS
+
+
+class ResultCache:
+    """
+    Cache persistente de resultados endereçado pelo conteúdo do upload.
+    A chave combina o SHA-256 do APK/código fonte, a fase e as versões do
+    analisador e do ruleset de segredos; cada entrada guarda o resultado JSON
+    e cópias do PDF e dos artefatos para CI (SARIF, JSON Lines, JUnit).
+    Quando o tamanho total passa de CACHE_MAX_BYTES, as entradas usadas há
+    mais tempo são removidas (LRU).
+    """
+
+    def __init__(self, pasta: Optional[str] = None, max_bytes: int = CACHE_MAX_BYTES):
+        self.pasta = pasta or os.path.join(STORAGE_DIR, "cache")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._arquivo_indice = os.path.join(self.pasta, "index.json")
+        os.makedirs(self.pasta, exist_ok=True)
+        self._indice = self._carregar_indice()
+
+    @staticmethod
+    def chave(sha256_apk: Optional[str], sha256_codigo: Optional[str], fase: str) -> str:
+        base = f"{ANALYZER_VERSION}|{VERSAO_REGRAS}|{sha256_apk or '-'}|{sha256_codigo or '-'}|{fase}"
+        if TESTES_SIMULADOS:
+            base += "|simulados"
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def cacheavel(resultado: Dict) -> bool:
+        """
+        Só resultados que o mesmo conteúdo reproduziria entram no cache: testes no
+        dispositivo real (ou só código fonte), com o SAST e a suíte completos. A análise
+        estática de fallback (nenhum aparelho disponível) e execuções interrompidas
+        dependem do ambiente, e a próxima tentativa precisa rodar de novo.
+        """
+        if resultado.get("modo_execucao") not in ("REAL_DEVICE", "APENAS_CODIGO_FONTE"):
+            return False
+        if (resultado.get("analise_estatica") or {}).get("completa") is False:
+            return False
+        return not (resultado.get("analise_dinamica") or {}).get("interrompidos")
+
+    def obter(self, chave: str) -> Optional[Dict]:
+        """Retorna o resultado armazenado (marcando o acesso) ou None."""
+        with self._lock:
+            entrada = self._indice.get(chave)
+            caminho = os.path.join(self.pasta, chave, "resultado.json")
+            if entrada is None or not os.path.exists(caminho):
+                self._indice.pop(chave, None)
+                return None
+            entrada["ultimo_acesso"] = time.time()
+            self._salvar_indice()
+
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Aviso: Entrada de cache ilegível ({chave}): {e}")
+            return None
+
+    def salvar(self, chave: str, resultado: Dict, caminho_pdf: Optional[str] = None) -> Dict:
+        """
+        Armazena o resultado (e cópias do PDF, apontada em `relatorio_pdf`, e dos
+        arquivos de `artefatos`). Retorna o resultado como ficou gravado.
+        """
+        pasta_entrada = os.path.join(self.pasta, chave)
+        os.makedirs(pasta_entrada, exist_ok=True)
+        resultado = dict(resultado)
+
+        if caminho_pdf and os.path.exists(caminho_pdf):
+            destino_pdf = os.path.join(pasta_entrada, "relatorio.pdf")
+            shutil.copyfile(caminho_pdf, destino_pdf)
+            resultado["relatorio_pdf"] = "/storage/" + os.path.relpath(destino_pdf, STORAGE_DIR).replace(os.sep, "/")
+
+        artefatos = {}
+        for nome, url in (resultado.get("artefatos") or {}).items():
+            origem = os.path.join(STORAGE_DIR, url[len("/storage/"):])
+            if not os.path.exists(origem):
+                continue
+            destino = os.path.join(pasta_entrada, os.path.basename(origem))
+            if os.path.abspath(origem) != os.path.abspath(destino):
+                shutil.copyfile(origem, destino)
+            artefatos[nome] = "/storage/" + os.path.relpath(destino, STORAGE_DIR).replace(os.sep, "/")
+        if "artefatos" in resultado:
+            resultado["artefatos"] = artefatos
+
+        caminho = os.path.join(pasta_entrada, "resultado.json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False)
+
+        tamanho = sum(
+            os.path.getsize(os.path.join(pasta_entrada, nome)) for nome in os.listdir(pasta_entrada)
+        )
+        with self._lock:
+            self._indice[chave] = {"tamanho": tamanho, "ultimo_acesso": time.time()}
+            self._remover_excedente()
+            self._salvar_indice()
+        return resultado
+
+    def _remover_excedente(self) -> None:
+        total = sum(entrada["tamanho"] for entrada in self._indice.values())
+        for chave, entrada in sorted(self._indice.items(), key=lambda item: item[1]["ultimo_acesso"]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.join(self.pasta, chave), ignore_errors=True)
+            del self._indice[chave]
+            total -= entrada["tamanho"]
+            print(f"Cache: entrada {chave[:12]} removida (LRU).")
+
+    def _carregar_indice(self) -> Dict:
+        try:
+            with open(self._arquivo_indice, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _salvar_indice(self) -> None:
+        temporario = f"{self._arquivo_indice}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self._indice, f)
+        os.replace(temporario, self._arquivo_indice)
+
+
+# Instância única compartilhada pela API e pelo pipeline
+cache_resultados = ResultCache()
@@ -0,0 +1,119 @@
+# Arquivo: app/services/result_views.py
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+# Itens por página nas listas de testes/falhas (e o máximo aceito por requisição)
+TAMANHO_PAGINA = 50
+TAMANHO_PAGINA_MAX = 500
+# Motivos do Quality Gate mantidos no resumo (cada achado de código vira um motivo)
+MOTIVOS_NO_RESUMO = 50
+
+
+class ResultViews:
+    """
+    Visões do resultado de uma análise para a API: um resumo de tamanho limitado
+    (contagens, sem tracebacks nem listas completas) e páginas filtráveis das
+    listas de testes e de falhas do SAST.
+    """
+
+    @staticmethod
+    def resumir(resultado: Dict) -> Dict:
+        """Resultado sem as listas detalhadas; elas ficam nas rotas paginadas do job."""
+        resumo = dict(resultado)
+        job_id = resultado.get("job_id")
+        base = f"/api/jobs/{job_id}" if job_id else None
+
+        dinamica = resultado.get("analise_dinamica")
+        if dinamica:
+            testes = dinamica.get("lista_testes", [])
+            dinamica = {k: v for k, v in dinamica.items() if k not in ("lista_testes", "lista_falhas")}
+            dinamica["status_testes"] = dict(Counter(t["status"] for t in testes))
+            if "metricas_runtime" in dinamica:
+                dinamica["metricas_runtime"] = ResultViews._metricas_sem_series(dinamica["metricas_runtime"])
+            if base:
+                dinamica["testes_url"] = f"{base}/testes"
+            resumo["analise_dinamica"] = dinamica
+
+        estatica = resultado.get("analise_estatica")
+        if estatica:
+            falhas = estatica.get("falhas_identificadas", [])
+            estatica = {k: v for k, v in estatica.items() if k != "falhas_identificadas"}
+            estatica["resumo_falhas"] = {
+                "total": len(falhas),
+                "por_severidade": dict(Counter(f.get("severidade") for f in falhas)),
+                "por_tipo": dict(Counter(f.get("tipo") for f in falhas)),
+            }
+            if base:
+                estatica["falhas_url"] = f"{base}/falhas"
+            resumo["analise_estatica"] = estatica
+
+        motivos = resultado.get("motivos") or []
+        if len(motivos) > MOTIVOS_NO_RESUMO:
+            resumo["motivos"] = motivos[:MOTIVOS_NO_RESUMO]
+            resumo["motivos_total"] = len(motivos)
+        return resumo
+
+    @staticmethod
+    def _metricas_sem_series(metricas: Dict) -> Dict:
+        # Só os percentis; as séries temporais ficam no runtime_metrics.json do job
+        return {
+            chave: ({k: v for k, v in valor.items() if k != "serie"} if isinstance(valor, dict) else valor)
+            for chave, valor in metricas.items()
+        }
+
+    @staticmethod
+    def paginar(itens: List[Dict], pagina: int = 1, tamanho: int = TAMANHO_PAGINA) -> Dict:
+        tamanho = max(1, min(tamanho, TAMANHO_PAGINA_MAX))
+        pagina = max(1, pagina)
+        inicio = (pagina - 1) * tamanho
+        return {
+            "total": len(itens),
+            "pagina": pagina,
+            "tamanho": tamanho,
+            "paginas": math.ceil(len(itens) / tamanho),
+            "itens": itens[inicio:inicio + tamanho],
+        }
+
+    @staticmethod
+    def _filtrar(itens: Iterable[Dict], campos: Dict[str, Optional[str]], contem: Dict[str, Optional[str]]) -> List[Dict]:
+        """Igualdade (sem diferenciar maiúsculas) para `campos`, trecho do texto para `contem`."""
+        exatos = {campo: valor.upper() for campo, valor in campos.items() if valor}
+        trechos = {campo: valor.lower() for campo, valor in contem.items() if valor}
+        return [
+            item for item in itens
+            if all(str(item.get(campo) or "").upper() == valor for campo, valor in exatos.items())
+            and all(valor in str(item.get(campo) or "").lower() for campo, valor in trechos.items())
+        ]
+
+    @staticmethod
+    def testes(
+        resultado: Dict,
+        status: Optional[str] = None,
+        severidade: Optional[str] = None,
+        classname: Optional[str] = None,
+        pagina: int = 1,
+        tamanho: int = TAMANHO_PAGINA,
+        detalhes: bool = False,
+    ) -> Dict:
+        """Página da lista de testes; o traceback (`details`) só vem com `detalhes=True`."""
+        lista = (resultado.get("analise_dinamica") or {}).get("lista_testes", [])
+        filtrados = ResultViews._filtrar(lista, {"status": status, "severity": severidade}, {"classname": classname})
+        pagina_atual = ResultViews.paginar(filtrados, pagina, tamanho)
+        if not detalhes:
+            pagina_atual["itens"] = [{k: v for k, v in t.items() if k != "details"} for t in pagina_atual["itens"]]
+        return pagina_atual
+
+    @staticmethod
+    def falhas(
+        resultado: Dict,
+        severidade: Optional[str] = None,
+        tipo: Optional[str] = None,
+        arquivo: Optional[str] = None,
+        pagina: int = 1,
+        tamanho: int = TAMANHO_PAGINA,
+    ) -> Dict:
+        """Página das falhas do SAST (APK + código fonte)."""
+        lista = (resultado.get("analise_estatica") or {}).get("falhas_identificadas", [])
+        filtrados = ResultViews._filtrar(lista, {"severidade": severidade, "tipo": tipo}, {"arquivo": arquivo})
+        return ResultViews.paginar(filtrados, pagina, tamanho)
@@ -0,0 +1,293 @@
+# Arquivo: app/services/run_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from app.core.config import RUNS_DB
+from app.services.result_views import TAMANHO_PAGINA, TAMANHO_PAGINA_MAX
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL UNIQUE,
+    criado_em REAL NOT NULL,
+    arquivo TEXT,
+    package TEXT,
+    version_code TEXT,
+    app_name TEXT,
+    sha256_apk TEXT,
+    fase TEXT,
+    status_final TEXT,
+    modo_execucao TEXT,
+    do_cache INTEGER NOT NULL DEFAULT 0,
+    total_testes INTEGER,
+    aprovados INTEGER,
+    s1_total INTEGER,
+    s2_total INTEGER,
+    relatorio_pdf TEXT,
+    resultado BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_execucoes_criado_em ON execucoes (criado_em);
+CREATE INDEX IF NOT EXISTS idx_execucoes_package ON execucoes (package, criado_em);
+CREATE INDEX IF NOT EXISTS idx_execucoes_version ON execucoes (package, version_code);
+CREATE INDEX IF NOT EXISTS idx_execucoes_sha256 ON execucoes (sha256_apk);
+CREATE INDEX IF NOT EXISTS idx_execucoes_status ON execucoes (status_final, criado_em);
+
+CREATE TABLE IF NOT EXISTS achados (
+    execucao_id INTEGER NOT NULL REFERENCES execucoes (id) ON DELETE CASCADE,
+    tipo TEXT,
+    severidade TEXT,
+    regra TEXT,
+    mensagem TEXT,
+    arquivo TEXT,
+    linha INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_achados_execucao ON achados (execucao_id);
+CREATE INDEX IF NOT EXISTS idx_achados_regra ON achados (regra, severidade);
+
+CREATE TABLE IF NOT EXISTS testes (
+    execucao_id INTEGER NOT NULL REFERENCES execucoes (id) ON DELETE CASCADE,
+    classname TEXT,
+    nome TEXT,
+    status TEXT,
+    severidade TEXT,
+    duracao REAL,
+    mensagem TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_testes_execucao ON testes (execucao_id);
+CREATE INDEX IF NOT EXISTS idx_testes_nome ON testes (classname, nome, execucao_id);
+"""
+
+# Colunas devolvidas nas listagens (o resultado completo só é lido por execução)
+COLUNAS_LISTAGEM = (
+    "job_id, criado_em, arquivo, package, version_code, app_name, sha256_apk, fase, status_final, "
+    "modo_execucao, do_cache, total_testes, aprovados, s1_total, s2_total, relatorio_pdf"
+)
+
+
+class RunStore:
+    """
+    Histórico persistente das análises (SQLite embutido): uma linha por execução,
+    com os achados do SAST e o resultado de cada teste em tabelas próprias,
+    indexadas por pacote, versão, hash do APK, status e data. O resultado completo
+    fica compactado na própria linha da execução e só é lido quando pedido.
+    """
+
+    def __init__(self, caminho: str = RUNS_DB):
+        self.caminho = caminho
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # Uma conexão compartilhada (os ouvintes da fila rodam nas threads dos jobs)
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        with self._lock:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute("PRAGMA foreign_keys=ON")
+            self._conexao.executescript(ESQUEMA)
+
+    def registrar(self, resultado: Dict, arquivo: Optional[str] = None) -> None:
+        """
+        Grava a execução de um job concluído. Chamadas repetidas para o mesmo job
+        (ex: quando o PDF fica pronto) só atualizam o relatório e o resultado guardado.
+        """
+        dinamica = resultado.get("analise_dinamica") or {}
+        estatica = resultado.get("analise_estatica") or {}
+        compactado = zlib.compress(json.dumps(resultado, ensure_ascii=False).encode("utf-8"))
+
+        with self._lock, self._conexao:
+            existente = self._conexao.execute(
+                "SELECT id FROM execucoes WHERE job_id = ?", (resultado["job_id"],)
+            ).fetchone()
+            if existente is not None:
+                self._conexao.execute(
+                    "UPDATE execucoes SET relatorio_pdf = ?, resultado = ? WHERE id = ?",
+                    (resultado.get("relatorio_pdf"), compactado, existente["id"])
+                )
+                return
+
+            cursor = self._conexao.execute(
+                "INSERT INTO execucoes (job_id, criado_em, arquivo, package, version_code, app_name, sha256_apk, "
+                "fase, status_final, modo_execucao, do_cache, total_testes, aprovados, s1_total, s2_total, "
+                "relatorio_pdf, resultado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    resultado["job_id"], time.time(), arquivo or resultado.get("arquivo"),
+                    resultado.get("package"), str(resultado["version_code"]) if resultado.get("version_code") else None,
+                    resultado.get("app_name"), resultado.get("sha256_apk"), resultado.get("fase"),
+                    resultado.get("status_final"), resultado.get("modo_execucao"), int(bool(resultado.get("cache"))),
+                    dinamica.get("total_testes"), dinamica.get("aprovados"),
+                    resultado.get("s1_total"), resultado.get("s2_total"), resultado.get("relatorio_pdf"), compactado,
+                )
+            )
+            execucao_id = cursor.lastrowid
+            self._conexao.executemany(
+                "INSERT INTO achados (execucao_id, tipo, severidade, regra, mensagem, arquivo, linha) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (execucao_id, f.get("tipo"), f.get("severidade"), f.get("regra"), f.get("mensagem"),
+                     f.get("arquivo"), f.get("linha"))
+                    for f in estatica.get("falhas_identificadas", [])
+                )
+            )
+            self._conexao.executemany(
+                "INSERT INTO testes (execucao_id, classname, nome, status, severidade, duracao, mensagem) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (execucao_id, t.get("classname"), t.get("name"), t.get("status"), t.get("severity"),
+                     t.get("duration"), t.get("message"))
+                    for t in dinamica.get("lista_testes", [])
+                )
+            )
+
+    def _consultar(self, sql: str, parametros: tuple = ()) -> List[Dict]:
+        with self._lock:
+            return [dict(linha) for linha in self._conexao.execute(sql, parametros).fetchall()]
+
+    @staticmethod
+    def _descompactar(blob: Optional[bytes]) -> Optional[Dict]:
+        return json.loads(zlib.decompress(blob).decode("utf-8")) if blob else None
+
+    def resultado(self, job_id: str) -> Optional[Dict]:
+        """Resultado completo guardado de um job."""
+        linhas = self._consultar("SELECT resultado FROM execucoes WHERE job_id = ?", (job_id,))
+        return self._descompactar(linhas[0]["resultado"]) if linhas else None
+
+    def ultimo_resultado(self) -> Optional[Dict]:
+        """Resultado completo (com o nome do arquivo enviado) da execução mais recente."""
+        linhas = self._consultar("SELECT arquivo, resultado FROM execucoes ORDER BY criado_em DESC, id DESC LIMIT 1")
+        if not linhas:
+            return None
+        return dict(self._descompactar(linhas[0]["resultado"]), arquivo=linhas[0]["arquivo"])
+
+    def estatisticas(self) -> Dict:
+        """
+        Números do dashboard: os da última execução (testsRun, passed, failed, coverage)
+        e os totais do histórico.
+        """
+        ultima = self._consultar(
+            "SELECT total_testes, aprovados FROM execucoes ORDER BY criado_em DESC, id DESC LIMIT 1"
+        )
+        total_testes = (ultima[0]["total_testes"] or 0) if ultima else 0
+        total_aprovados = (ultima[0]["aprovados"] or 0) if ultima else 0
+        historico = self._consultar(
+            "SELECT COUNT(*) AS execucoes, "
+            "COALESCE(SUM(status_final = 'APROVADO'), 0) AS aprovadas, "
+            "COALESCE(SUM(status_final = 'REPROVADO'), 0) AS reprovadas, "
+            "COUNT(DISTINCT package) AS aplicativos, "
+            "COALESCE(SUM(total_testes), 0) AS testes_executados "
+            "FROM execucoes"
+        )[0]
+        historico["taxa_aprovacao"] = round(historico["aprovadas"] / historico["execucoes"] * 100, 1) if historico["execucoes"] else 0
+        return {
+            "testsRun": total_testes,
+            "passed": total_aprovados,
+            "failed": total_testes - total_aprovados,
+            "coverage": round((total_aprovados / total_testes * 100) if total_testes > 0 else 0),
+            "historico": historico,
+        }
+
+    @staticmethod
+    def _filtros(
+        package: Optional[str] = None,
+        version_code: Optional[str] = None,
+        sha256_apk: Optional[str] = None,
+        status: Optional[str] = None,
+        desde: Optional[float] = None,
+        ate: Optional[float] = None,
+    ):
+        condicoes, parametros = [], []
+        for coluna, valor in (("package", package), ("version_code", version_code), ("sha256_apk", sha256_apk)):
+            if valor:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(valor)
+        if status:
+            condicoes.append("status_final = ?")
+            parametros.append(status.upper())
+        if desde is not None:
+            condicoes.append("criado_em >= ?")
+            parametros.append(desde)
+        if ate is not None:
+            condicoes.append("criado_em < ?")
+            parametros.append(ate)
+        return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", tuple(parametros)
+
+    def listar(
+        self,
+        package: Optional[str] = None,
+        version_code: Optional[str] = None,
+        sha256_apk: Optional[str] = None,
+        status: Optional[str] = None,
+        desde: Optional[float] = None,
+        ate: Optional[float] = None,
+        pagina: int = 1,
+        tamanho: int = TAMANHO_PAGINA,
+    ) -> Dict:
+        """Execuções mais recentes primeiro, paginadas (mesmo formato das listas do job)."""
+        tamanho = max(1, min(tamanho, TAMANHO_PAGINA_MAX))
+        pagina = max(1, pagina)
+        where, parametros = RunStore._filtros(package, version_code, sha256_apk, status, desde, ate)
+        total = self._consultar(f"SELECT COUNT(*) AS total FROM execucoes{where}", parametros)[0]["total"]
+        itens = self._consultar(
+            f"SELECT {COLUNAS_LISTAGEM} FROM execucoes{where} ORDER BY criado_em DESC, id DESC LIMIT ? OFFSET ?",
+            parametros + (tamanho, (pagina - 1) * tamanho)
+        )
+        return {"total": total, "pagina": pagina, "tamanho": tamanho, "paginas": -(-total // tamanho), "itens": itens}
+
+    def tendencias(self, package: Optional[str] = None, dias: int = 30) -> List[Dict]:
+        """Série diária (UTC) de execuções, aprovação no Quality Gate, aprovação dos testes e defeitos."""
+        where, parametros = RunStore._filtros(package=package, desde=time.time() - dias * 86400)
+        return self._consultar(
+            "SELECT date(criado_em, 'unixepoch') AS dia, COUNT(*) AS execucoes, "
+            "SUM(status_final = 'APROVADO') AS aprovadas, "
+            "ROUND(100.0 * SUM(status_final = 'APROVADO') / COUNT(*), 1) AS taxa_aprovacao, "
+            "ROUND(100.0 * SUM(aprovados) / NULLIF(SUM(total_testes), 0), 1) AS taxa_aprovacao_testes, "
+            "ROUND(AVG(s1_total), 2) AS media_s1, ROUND(AVG(s2_total), 2) AS media_s2 "
+            f"FROM execucoes{where} GROUP BY dia ORDER BY dia",
+            parametros
+        )
+
+    def testes_instaveis(
+        self,
+        package: Optional[str] = None,
+        janela: int = 50,
+        minimo_execucoes: int = 3,
+        limite: int = 50,
+        por_apk: bool = False,
+    ) -> List[Dict]:
+        """
+        Testes que ora passam, ora falham nas últimas `janela` execuções reais (resultados
+        vindos do cache não contam). Cada teste é identificado pelo pacote do app mais
+        classname e nome (com `por_apk`, também pelo SHA-256 do APK: só conta como
+        instável o teste que muda de status no mesmo binário). `taxa_falha` é a fração
+        de execuções reprovadas e `taxa_alternancia` a fração de execuções consecutivas
+        em que o status mudou.
+        """
+        identidade = "r.package, r.sha256_apk, t.classname, t.nome" if por_apk else "r.package, t.classname, t.nome"
+        colunas = "package, sha256_apk, classname, nome" if por_apk else "package, classname, nome"
+        filtro_package = "AND package = ?" if package else ""
+        parametros = ((package,) if package else ()) + (janela, minimo_execucoes, limite)
+        return self._consultar(
+            "WITH recentes AS ("
+            f"  SELECT id, criado_em, package, sha256_apk FROM execucoes WHERE do_cache = 0 {filtro_package} "
+            "  ORDER BY criado_em DESC, id DESC LIMIT ?"
+            "), historico AS ("
+            f"  SELECT {identidade}, t.status, t.execucao_id, r.criado_em, "
+            f"         LAG(t.status) OVER (PARTITION BY {identidade} ORDER BY t.execucao_id) AS anterior "
+            "  FROM testes t JOIN recentes r ON r.id = t.execucao_id "
+            "  WHERE t.status IN ('APROVADO', 'REPROVADO')"
+            ") "
+            f"SELECT {colunas}, COUNT(*) AS execucoes, "
+            "SUM(status = 'REPROVADO') AS falhas, "
+            "ROUND(1.0 * SUM(status = 'REPROVADO') / COUNT(*), 3) AS taxa_falha, "
+            "ROUND(1.0 * SUM(anterior IS NOT NULL AND anterior != status) / MAX(COUNT(*) - 1, 1), 3) AS taxa_alternancia, "
+            "MAX(CASE WHEN status = 'REPROVADO' THEN criado_em END) AS ultima_falha_em "
+            f"FROM historico GROUP BY {colunas} "
+            "HAVING COUNT(*) >= ? AND SUM(status = 'REPROVADO') > 0 AND SUM(status = 'APROVADO') > 0 "
+            "ORDER BY taxa_alternancia DESC, taxa_falha DESC LIMIT ?",
+            parametros
+        )
+
+
+# Instância única usada pela API
+historico_execucoes = RunStore()
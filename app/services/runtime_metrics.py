@@ -0,0 +1,322 @@
+# Arquivo: app/services/runtime_metrics.py
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import METRICAS_INTERVALO_S, METRICAS_REPETICOES_INICIALIZACAO
+from app.services.device_pool import executar_adb, resolver_adb
+
+# Ticks por segundo do /proc/<pid>/stat (USER_HZ; 100 em praticamente todo Android)
+TICKS_POR_SEGUNDO = 100
+# Frame acima de 1/60s perde o vsync (jank)
+FRAME_LIMITE_MS = 1000 / 60
+
+PERCENTIS = (50, 90, 95, 99)
+# Avisos de coleta guardados no resumo (os seguintes só são contados)
+MAX_AVISOS = 20
+
+
+def percentil(valores: Sequence[float], p: float) -> Optional[float]:
+    """Percentil com interpolação linear (None para série vazia)."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior, superior = math.floor(posicao), math.ceil(posicao)
+    if inferior == superior:
+        return float(ordenados[inferior])
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def resumir_serie(valores: Sequence[float]) -> Dict:
+    """Amostras, média, máximo e percentis de uma série."""
+    if not valores:
+        return {"amostras": 0}
+    resumo = {
+        "amostras": len(valores),
+        "media": round(sum(valores) / len(valores), 2),
+        "max": round(max(valores), 2),
+    }
+    for p in PERCENTIS:
+        resumo[f"p{p}"] = round(percentil(valores, p), 2)
+    return resumo
+
+
+class RuntimeParsers:
+    """Interpretação das saídas dos comandos do Android (sem dispositivo: recebem o texto)."""
+
+    @staticmethod
+    def am_start(saida: str) -> Optional[Dict]:
+        """`am start -W`: LaunchState (COLD/WARM/HOT), TotalTime e WaitTime em ms."""
+        total = re.search(r"^TotalTime:\s*(\d+)", saida, re.MULTILINE)
+        if total is None:
+            return None
+        estado = re.search(r"^LaunchState:\s*(\w+)", saida, re.MULTILINE)
+        espera = re.search(r"^WaitTime:\s*(\d+)", saida, re.MULTILINE)
+        return {
+            "estado": estado.group(1).upper() if estado else None,
+            "total_ms": int(total.group(1)),
+            "espera_ms": int(espera.group(1)) if espera else None,
+        }
+
+    @staticmethod
+    def meminfo_pss_kb(saida: str) -> Optional[int]:
+        """PSS total do processo em KB (`dumpsys meminfo <package>`)."""
+        # Android 10+: "TOTAL PSS:   123456    TOTAL RSS: ..."
+        total = re.search(r"TOTAL PSS:\s*(\d+)", saida)
+        if total is None:
+            # Versões antigas: primeira coluna da linha "TOTAL" da tabela
+            total = re.search(r"^\s*TOTAL\s+(\d+)", saida, re.MULTILINE)
+        return int(total.group(1)) if total else None
+
+    @staticmethod
+    def proc_stat_ticks(saida: str) -> Optional[int]:
+        """utime + stime (em ticks) de `/proc/<pid>/stat`."""
+        fim_nome = saida.rfind(")")
+        if fim_nome < 0:
+            return None
+        # Após "(comm)" vêm os campos a partir do 3º (state); utime e stime são o 14º e o 15º
+        campos = saida[fim_nome + 1:].split()
+        if len(campos) < 13:
+            return None
+        try:
+            return int(campos[11]) + int(campos[12])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def gfxinfo_frames(saida: str) -> Dict:
+        """
+        `dumpsys gfxinfo <package> framestats`: duração (ms) de cada frame da seção
+        PROFILEDATA (IntendedVsync até FrameCompleted, só frames com Flags=0) e os
+        totais do resumo ("Total frames rendered", "Janky frames").
+        """
+        duracoes = []
+        for secao in saida.split("---PROFILEDATA---")[1::2]:
+            linhas = [l.strip() for l in secao.strip().splitlines() if l.strip()]
+            if not linhas:
+                continue
+            cabecalho = linhas[0].rstrip(",").split(",")
+            try:
+                i_flags = cabecalho.index("Flags")
+                i_inicio = cabecalho.index("IntendedVsync")
+                i_fim = cabecalho.index("FrameCompleted")
+            except ValueError:
+                continue
+            for linha in linhas[1:]:
+                valores = linha.rstrip(",").split(",")
+                try:
+                    if int(valores[i_flags]) != 0:
+                        continue # Frame marcado (ex: primeiro frame após resize), fora da estatística
+                    inicio, fim = int(valores[i_inicio]), int(valores[i_fim])
+                except (ValueError, IndexError):
+                    continue
+                if fim > inicio > 0:
+                    duracoes.append((fim - inicio) / 1_000_000)
+
+        total = re.search(r"Total frames rendered:\s*(\d+)", saida)
+        janky = re.search(r"Janky frames:\s*(\d+)", saida)
+        return {
+            "duracoes_ms": duracoes,
+            "total": int(total.group(1)) if total else len(duracoes),
+            "janky": int(janky.group(1)) if janky else sum(1 for d in duracoes if d > FRAME_LIMITE_MS),
+        }
+
+
+class MetricsSampler:
+    """
+    Coleta métricas reais do app no dispositivo enquanto os testes mobile rodam.
+
+    Uma thread amostra a cada `intervalo` segundos a memória (PSS), o uso de CPU
+    (delta de utime+stime do processo) e os frames renderizados (gfxinfo, zerado
+    a cada leitura para acumular todos os frames da execução). Ao final,
+    `medir_inicializacao` mede a inicialização a frio e a quente via `am start -W`.
+    `resumo()` traz as séries temporais e os percentis consumidos pelo Quality Gate,
+    além dos avisos de coleta (amostras ou medidas que falharam).
+
+    O comando do adb é injetável, para rodar com saídas gravadas.
+    """
+
+    def __init__(
+        self,
+        package: str,
+        serial: Optional[str] = None,
+        adb: Optional[str] = None,
+        intervalo: float = METRICAS_INTERVALO_S,
+        executar_comando: Callable[[Sequence[str], int], Tuple[int, str]] = executar_adb,
+    ):
+        self.package = package
+        self.serial = serial
+        self.adb = adb or resolver_adb()
+        self.intervalo = intervalo
+        self._executar_comando = executar_comando
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inicio = time.monotonic()
+        self._memoria: List[Tuple[float, int]] = []
+        self._cpu: List[Tuple[float, float]] = []
+        self._frames_ms: List[float] = []
+        self._frames_total = 0
+        self._frames_janky = 0
+        self._cpu_anterior: Optional[Tuple[str, int, float]] = None # (pid, ticks, instante)
+        self._inicializacoes: List[Dict] = []
+        self._avisos: List[str] = []
+        self._avisos_descartados = 0
+
+    def _avisar(self, mensagem: str) -> None:
+        # Vai para o resumo (e para o resultado do job) em vez do console do servidor
+        if len(self._avisos) < MAX_AVISOS:
+            self._avisos.append(mensagem)
+        else:
+            self._avisos_descartados += 1
+
+    def _shell(self, *argumentos: str, timeout: int = 30) -> Tuple[int, str]:
+        prefixo = [self.adb, "-s", self.serial] if self.serial else [self.adb]
+        return self._executar_comando(prefixo + ["shell"] + list(argumentos), timeout)
+
+    # ------------------------------------------------------------------
+    # Amostragem
+    # ------------------------------------------------------------------
+    def iniciar(self) -> "MetricsSampler":
+        self._inicio = time.monotonic()
+        self._shell("dumpsys", "gfxinfo", self.package, "reset")
+        self._thread = threading.Thread(target=self._loop, name=f"metricas-{self.serial or 'device'}", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.intervalo + 30)
+            self._thread = None
+        self.amostrar() # Frames renderizados desde a última amostra
+
+    def __enter__(self) -> "MetricsSampler":
+        return self.iniciar()
+
+    def __exit__(self, *_) -> None:
+        self.parar()
+
+    def _loop(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.amostrar()
+            except Exception as e:
+                self._avisar(f"Falha ao amostrar métricas: {e}")
+
+    def _pid(self) -> Optional[str]:
+        codigo, saida = self._shell("pidof", self.package)
+        pids = saida.split() if codigo == 0 else []
+        return pids[0] if pids and pids[0].isdigit() else None
+
+    def amostrar(self) -> None:
+        """Uma amostra de memória, CPU e frames (só enquanto o app está em execução)."""
+        pid = self._pid()
+        if pid is None:
+            self._cpu_anterior = None
+            return
+        instante = time.monotonic()
+        t = round(instante - self._inicio, 2)
+
+        codigo, saida = self._shell("dumpsys", "meminfo", self.package)
+        pss = RuntimeParsers.meminfo_pss_kb(saida) if codigo == 0 else None
+        if pss is not None:
+            self._memoria.append((t, pss))
+
+        codigo, saida = self._shell("cat", f"/proc/{pid}/stat")
+        ticks = RuntimeParsers.proc_stat_ticks(saida) if codigo == 0 else None
+        if ticks is not None:
+            anterior = self._cpu_anterior
+            if anterior is not None and anterior[0] == pid and instante > anterior[2]:
+                # Percentual de um núcleo: ticks consumidos / ticks disponíveis no intervalo
+                uso = (ticks - anterior[1]) / ((instante - anterior[2]) * TICKS_POR_SEGUNDO) * 100
+                self._cpu.append((t, round(max(uso, 0.0), 2)))
+            self._cpu_anterior = (pid, ticks, instante)
+
+        codigo, saida = self._shell("dumpsys", "gfxinfo", self.package, "framestats")
+        if codigo == 0:
+            frames = RuntimeParsers.gfxinfo_frames(saida)
+            self._frames_ms.extend(frames["duracoes_ms"])
+            self._frames_total += frames["total"]
+            self._frames_janky += frames["janky"]
+            self._shell("dumpsys", "gfxinfo", self.package, "reset")
+
+    # ------------------------------------------------------------------
+    # Inicialização
+    # ------------------------------------------------------------------
+    def medir_inicializacao(self, activity: str, repeticoes: int = METRICAS_REPETICOES_INICIALIZACAO) -> None:
+        """Inicializações a frio (após force-stop) e a quente (após voltar para a Home)."""
+        componente = activity if "/" in activity else f"{self.package}/{activity}"
+        for _ in range(repeticoes):
+            self._shell("am", "force-stop", self.package)
+            self._registrar_inicializacao("frio", componente)
+        for _ in range(repeticoes):
+            self._shell("input", "keyevent", "KEYCODE_HOME")
+            self._registrar_inicializacao("quente", componente)
+
+    def _registrar_inicializacao(self, tipo: str, componente: str) -> None:
+        codigo, saida = self._shell("am", "start", "-W", "-n", componente, timeout=60)
+        medida = RuntimeParsers.am_start(saida) if codigo == 0 else None
+        if medida is None:
+            self._avisar(f"`am start -W` sem TotalTime ({tipo}) para {componente}: {saida.strip()[-200:]}")
+            return
+        medida["tipo"] = tipo
+        self._inicializacoes.append(medida)
+
+    # ------------------------------------------------------------------
+    # Resultado
+    # ------------------------------------------------------------------
+    def resumo(self) -> Dict:
+        frio = [m["total_ms"] for m in self._inicializacoes if m["tipo"] == "frio"]
+        quente = [m["total_ms"] for m in self._inicializacoes if m["tipo"] == "quente"]
+        memoria_mb = [kb / 1024 for _, kb in self._memoria]
+        total_frames = max(self._frames_total, len(self._frames_ms))
+        return {
+            "package": self.package,
+            "serial": self.serial,
+            "intervalo_s": self.intervalo,
+            "inicializacao": {
+                "medidas": self._inicializacoes,
+                "frio_ms": resumir_serie(frio),
+                "quente_ms": resumir_serie(quente),
+            },
+            "memoria_pss_mb": {
+                "serie": [[t, round(kb / 1024, 2)] for t, kb in self._memoria],
+                "resumo": resumir_serie(memoria_mb),
+            },
+            "cpu_percentual": {
+                "serie": [[t, uso] for t, uso in self._cpu],
+                "resumo": resumir_serie([uso for _, uso in self._cpu]),
+            },
+            "frames": {
+                "total": total_frames,
+                "janky": self._frames_janky,
+                "percentual_janky": round(self._frames_janky / total_frames * 100, 2) if total_frames else None,
+                "duracao_ms": resumir_serie(self._frames_ms),
+            },
+            "avisos": self._avisos + (
+                [f"... e mais {self._avisos_descartados} aviso(s)"] if self._avisos_descartados else []
+            ),
+        }
+
+    def salvar(self, caminho: str) -> Dict:
+        resumo = self.resumo()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, indent=2)
+        return resumo
+
+    @staticmethod
+    def carregar(caminho: Optional[str]) -> Optional[Dict]:
+        """Métricas salvas por `salvar` (None se o arquivo não existir ou for inválido)."""
+        if not caminho or not os.path.exists(caminho):
+            return None
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
@@ -0,0 +1,133 @@
+# Arquivo: app/services/secret_scanner.py
+import bisect
+import hashlib
+import heapq
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Cada regra: nome, regex, severidade, se ignora maiúsculas/minúsculas e as âncoras
+# literais (trechos que obrigatoriamente aparecem em qualquer ocorrência).
+# Regras sem âncora desativam o pré-filtro e são avaliadas em todo o texto.
+# As regras do código fonte são varridas em blocos: todo quantificador tem limite,
+# para que a sobreposição entre blocos cubra a maior ocorrência possível.
+REGRAS_DEX = [
+    {"nome": "Google API Key", "regex": r"AIza[0-9A-Za-z\-_]{35}", "severidade": "S1", "ignorar_caixa": False, "ancoras": ["AIza"]},
+    {"nome": "Generic API Key", "regex": r"apikey\s*=\s*['\"][a-zA-Z0-9_]{10,}['\"]", "severidade": "S1", "ignorar_caixa": True, "ancoras": ["apikey"]},
+    {"nome": "AWS Access Key", "regex": r"AKIA[0-9A-Z]{16}", "severidade": "S1", "ignorar_caixa": False, "ancoras": ["AKIA"]},
+]
+
+REGRAS_FONTE = [
+    {"nome": "AWS Access Key", "regex": r"AKIA[0-9A-Z]{16}", "severidade": "S1", "ignorar_caixa": False, "ancoras": ["AKIA"]},
+    {"nome": "Google API Key", "regex": r"AIza[0-9A-Za-z\-_]{35}", "severidade": "S1", "ignorar_caixa": False, "ancoras": ["AIza"]},
+    {"nome": "Senha Hardcoded", "regex": r"(password|passwd|senha)\s{0,16}=\s{0,16}['\"][^'\"\n]{1,512}['\"]", "severidade": "S1", "ignorar_caixa": True, "ancoras": ["password", "passwd", "senha"]},
+    {"nome": "Token Hardcoded", "regex": r"(token|auth)\s{0,16}=\s{0,16}['\"][a-zA-Z0-9]{10,512}['\"]", "severidade": "S1", "ignorar_caixa": True, "ancoras": ["token", "auth"]},
+    {"nome": "IP Hardcoded", "regex": r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b", "severidade": "S2", "ignorar_caixa": False, "ancoras": [f"{d}." for d in range(10)]},
+    {"nome": "TODO/FIXME", "regex": r"(TODO|FIXME):", "severidade": "S2", "ignorar_caixa": True, "ancoras": ["todo:", "fixme:"]},
+]
+
+# Separador usado ao concatenar strings do DEX: nenhuma âncora contém \x00,
+# então o pré-filtro nunca encontra uma âncora atravessando duas strings.
+_SEPARADOR = "\x00"
+
+
+def _ocorrencias(indice: int, padrao: re.Pattern, texto: str) -> Iterator[Tuple[int, int, re.Match]]:
+    for match in padrao.finditer(texto):
+        yield match.start(), indice, match
+
+
+class SecretScanner:
+    """
+    Motor de busca de segredos.
+
+    1. Pré-filtro: um regex de alternância com as âncoras literais de todas as
+       regras (ex: 'AIza', 'AKIA') descarta, em uma única passada em C, os textos
+       que não podem conter nenhum segredo.
+    2. Confirmação: cada candidato passa pelo regex de cada regra. As regras não
+       são combinadas em uma alternância porque ocorrências sobrepostas de regras
+       diferentes (ex: `password = "AKIA..."`) seriam consumidas pela primeira.
+    """
+
+    def __init__(self, regras: List[Dict]):
+        self.regras = regras
+        self._padroes = [
+            re.compile(regra["regex"], re.IGNORECASE if regra.get("ignorar_caixa") else 0) for regra in regras
+        ]
+
+        # O pré-filtro só é seguro se TODAS as regras tiverem âncora
+        self._prefiltro = None
+        if regras and all(regra.get("ancoras") for regra in regras):
+            ancoras = sorted({a.lower() for regra in regras for a in regra["ancoras"]}, key=len, reverse=True)
+            self._prefiltro = re.compile("|".join(re.escape(a) for a in ancoras), re.IGNORECASE)
+
+    @property
+    def tamanho_maximo(self) -> Optional[int]:
+        """Maior ocorrência possível entre as regras (None se algum quantificador não tem limite)."""
+        maximo = 0
+        for regra in self.regras:
+            _, largura = sre_parse.parse(regra["regex"]).getwidth()
+            if largura >= sre_parse.MAXREPEAT:
+                return None
+            maximo = max(maximo, largura)
+        return maximo
+
+    @property
+    def versao(self) -> str:
+        """Hash das regras; muda sempre que o ruleset é alterado (usado na chave do cache)."""
+        return hashlib.sha256(json.dumps(self.regras, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    def escanear(self, texto: str) -> Iterator[Tuple[Dict, re.Match]]:
+        """Todas as ocorrências (regra, match) no texto, em ordem crescente de posição."""
+        if self._prefiltro is not None and not self._prefiltro.search(texto):
+            return
+        yield from self._confirmar(texto)
+
+    def _confirmar(self, texto: str) -> Iterator[Tuple[Dict, re.Match]]:
+        # Intercala as ocorrências de todas as regras pela posição (empate: ordem das regras)
+        por_regra = [_ocorrencias(i, padrao, texto) for i, padrao in enumerate(self._padroes)]
+        for _, i, match in heapq.merge(*por_regra):
+            yield self.regras[i], match
+
+    def escanear_strings(self, strings: Iterable[str]) -> Iterator[Tuple[int, Dict, str]]:
+        """
+        Varre uma tabela de strings (ex: strings do DEX) em uma única passada.
+        Retorna (índice da string, regra, valor encontrado).
+        """
+        if not isinstance(strings, list):
+            strings = list(strings)
+
+        if self._prefiltro is None:
+            for indice, texto in enumerate(strings):
+                for regra, match in self.escanear(texto):
+                    yield indice, regra, match.group(0)
+            return
+
+        # Concatena a tabela e localiza as âncoras de uma vez; só as strings
+        # candidatas passam pelo regex de confirmação.
+        inicios = []
+        posicao = 0
+        for texto in strings:
+            inicios.append(posicao)
+            posicao += len(texto) + 1
+        blob = _SEPARADOR.join(strings)
+
+        ultimo = -1
+        for ancora in self._prefiltro.finditer(blob):
+            indice = bisect.bisect_right(inicios, ancora.start()) - 1
+            if indice == ultimo:
+                continue
+            ultimo = indice
+            for regra, match in self._confirmar(strings[indice]):
+                yield indice, regra, match.group(0)
+
+
+scanner_dex = SecretScanner(REGRAS_DEX)
+scanner_fonte = SecretScanner(REGRAS_FONTE)
+
+# Versão combinada dos rulesets (entra na chave do cache de resultados)
+VERSAO_REGRAS = hashlib.sha256((scanner_dex.versao + scanner_fonte.versao).encode("utf-8")).hexdigest()[:12]
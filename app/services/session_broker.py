@@ -0,0 +1,105 @@
+# Arquivo: app/services/session_broker.py
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import SESSAO_LIMPAR_DADOS, SESSAO_MAX_USOS
+
+
+class SessionBroker:
+    """
+    Mantém sessões do Appium abertas entre execuções, uma por (servidor, dispositivo).
+
+    Vive no processo worker do pytest (que sobrevive entre jobs): em vez de criar
+    um novo `webdriver.Remote` a cada suíte (instalação do servidor UiAutomator2 e
+    bootstrap da sessão), a sessão quente é reaproveitada e apenas o estado do app
+    é reiniciado (terminate_app/activate_app e, opcionalmente, `pm clear`).
+    Sessões são recicladas após `max_usos` execuções ou quando deixam de responder.
+    """
+
+    def __init__(self, max_usos: int = SESSAO_MAX_USOS, limpar_dados: bool = SESSAO_LIMPAR_DADOS):
+        self.max_usos = max_usos
+        self.limpar_dados = limpar_dados
+        self._sessoes: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave: Tuple[str, str], criar: Callable[[], object], package: Optional[str] = None):
+        """
+        Retorna a sessão quente de `chave` (com o app reiniciado) ou cria uma nova
+        com `criar()`. Sessões esgotadas ou sem resposta são encerradas antes.
+        """
+        with self._lock:
+            sessao = self._sessoes.pop(chave, None)
+
+        if sessao is not None:
+            if sessao["usos"] >= self.max_usos:
+                print(f"♻️ Sessão Appium de {chave[1]} atingiu {self.max_usos} usos. Reciclando.")
+                self._fechar(sessao)
+            elif not self._reiniciar_app(sessao["driver"], package):
+                print(f"♻️ Sessão Appium de {chave[1]} não respondeu. Criando uma nova.")
+                self._fechar(sessao)
+            else:
+                sessao["usos"] += 1
+                print(f"⚡ Reutilizando sessão Appium de {chave[1]} (uso {sessao['usos']}/{self.max_usos}).")
+                with self._lock:
+                    self._sessoes[chave] = sessao
+                return sessao["driver"]
+
+        driver = criar()
+        with self._lock:
+            self._sessoes[chave] = {"driver": driver, "usos": 1, "criada_em": time.time()}
+        return driver
+
+    def devolver(self, chave: Tuple[str, str], erro: bool = False) -> None:
+        """Fim da suíte: mantém a sessão para o próximo job, ou a encerra se houve erro de sessão."""
+        with self._lock:
+            sessao = self._sessoes.get(chave)
+            if sessao is None:
+                return
+            if not erro and self._viva(sessao["driver"]):
+                return
+            del self._sessoes[chave]
+        print(f"♻️ Encerrando sessão Appium de {chave[1]} após erro.")
+        self._fechar(sessao)
+
+    def encerrar_todas(self) -> None:
+        with self._lock:
+            sessoes = list(self._sessoes.values())
+            self._sessoes.clear()
+        for sessao in sessoes:
+            self._fechar(sessao)
+
+    def _reiniciar_app(self, driver, package: Optional[str]) -> bool:
+        """Volta o app ao estado inicial sem recriar a sessão. False se a sessão não responde."""
+        if not self._viva(driver):
+            return False
+        if not package:
+            return True
+        try:
+            driver.terminate_app(package)
+            if self.limpar_dados:
+                driver.execute_script("mobile: shell", {"command": "pm", "args": ["clear", package]})
+            driver.activate_app(package)
+            return True
+        except Exception as e:
+            print(f"⚠️ Falha ao reiniciar o app na sessão existente: {e}")
+            return False
+
+    @staticmethod
+    def _viva(driver) -> bool:
+        try:
+            driver.current_package # Qualquer comando leve: falha se a sessão caiu
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _fechar(sessao: Dict) -> None:
+        try:
+            sessao["driver"].quit()
+        except Exception:
+            pass
+
+
+# Instância única por processo (worker do pytest)
+sessoes_appium = SessionBroker()
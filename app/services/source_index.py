@@ -0,0 +1,88 @@
+# Arquivo: app/services/source_index.py
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zipfile
+from typing import Dict, List, Optional
+
+from app.core.config import STORAGE_DIR
+from app.services.secret_scanner import scanner_fonte
+
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+
+class SourceIndex:
+    """
+    Índice incremental do código fonte de um projeto (ou pacote do app),
+    endereçado pelo conteúdo: SHA-256 do arquivo descompactado -> ocorrências.
+    Num novo upload do mesmo projeto, só arquivos com conteúdo inédito são
+    varridos novamente; os demais (mesmo renomeados) reaproveitam os achados.
+    """
+
+    # Incrementar sempre que a estrutura gravada mudar (índices antigos são ignorados)
+    VERSAO_INDICE = 2
+
+    def __init__(self, projeto: str):
+        self.projeto = SourceIndex.normalizar_projeto(projeto)
+        pasta = os.path.join(STORAGE_DIR, "source_index")
+        os.makedirs(pasta, exist_ok=True)
+        self.caminho = os.path.join(pasta, f"{self.projeto}.json.gz")
+
+    @staticmethod
+    def normalizar_projeto(projeto: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", projeto).strip("._") or "projeto"
+
+    @staticmethod
+    def hash_membro(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+        """
+        SHA-256 do conteúdo descompactado, calculado em blocos durante a leitura.
+        O CRC e o tamanho do diretório central vêm de quem montou o ZIP e não
+        servem para provar que o arquivo não mudou.
+        """
+        sha = hashlib.sha256()
+        with zip_ref.open(info) as membro:
+            for bloco in iter(lambda: membro.read(TAMANHO_BLOCO_HASH), b""):
+                sha.update(bloco)
+        return sha.hexdigest()
+
+    def carregar(self) -> Dict[str, List[Dict]]:
+        """Ocorrências por conteúdo {sha256: ocorrências} (vazio se o ruleset ou o formato mudou)."""
+        if not os.path.exists(self.caminho):
+            return {}
+        try:
+            with gzip.open(self.caminho, "rt", encoding="utf-8") as f:
+                dados = json.load(f)
+        except Exception as e:
+            print(f"Aviso: Índice de código fonte ilegível ({self.projeto}): {e}")
+            return {}
+        if dados.get("versao_indice") != SourceIndex.VERSAO_INDICE:
+            return {}
+        if dados.get("versao_regras") != scanner_fonte.versao:
+            print(f"Ruleset alterado desde o último upload de '{self.projeto}'. Varredura completa.")
+            return {}
+        return dados.get("conteudos", {})
+
+    def salvar(self, hashes: Dict[str, str], ocorrencias: Dict[str, List[Dict]]) -> None:
+        """Grava o índice do upload atual (arquivos com erro de leitura ficam de fora)."""
+        dados = {
+            "versao_indice": SourceIndex.VERSAO_INDICE,
+            "versao_regras": scanner_fonte.versao,
+            "conteudos": {
+                hashes[nome]: achados for nome, achados in ocorrencias.items() if nome in hashes
+            },
+        }
+        # Temporário exclusivo: jobs simultâneos do mesmo projeto não gravam no mesmo arquivo
+        descritor, temporario = tempfile.mkstemp(
+            dir=os.path.dirname(self.caminho), prefix=f"{self.projeto}.", suffix=".tmp"
+        )
+        os.close(descritor)
+        try:
+            with gzip.open(temporario, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(dados, f)
+            os.replace(temporario, self.caminho)
+        except Exception:
+            os.remove(temporario)
+            raise
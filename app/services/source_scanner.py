@@ -0,0 +1,270 @@
+# Arquivo: app/services/source_scanner.py
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from typing import Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from app.services.secret_scanner import SecretScanner, scanner_fonte
+from app.services.source_index import SourceIndex
+from app.services.worker_pool import WorkerPool
+
+EXTENSOES_FONTE = ('.java', '.kt', '.xml', '.js', '.py', '.json')
+
+# Leitura em blocos (em caracteres) com sobreposição: uma ocorrência que
+# atravessa a fronteira entre dois blocos é encontrada na janela seguinte.
+# A sobreposição nunca é menor que a maior ocorrência possível das regras.
+TAMANHO_BLOCO = 1024 * 1024
+SOBREPOSICAO = 4096
+# Caracteres anteriores ao corte mantidos apenas como contexto (ex: para \b)
+CONTEXTO = 64
+
+# Arquivos são agrupados em lotes (uma tarefa do pool cada) para amortizar o
+# custo de envio; arquivos grandes ficam sozinhos no próprio lote.
+LOTE_MAX_ARQUIVOS = 64
+LOTE_MAX_BYTES = 8 * 1024 * 1024
+
+# ZIP aberto por processo worker: o diretório central é lido uma vez só
+_zip_aberto: Dict[str, zipfile.ZipFile] = {}
+# Hashes já indexados do projeto, carregados uma vez por processo worker
+_conhecidos_abertos: Dict[str, frozenset] = {}
+
+
+def _abrir_zip(caminho_zip: str) -> zipfile.ZipFile:
+    zip_ref = _zip_aberto.get(caminho_zip)
+    if zip_ref is None:
+        for antigo in _zip_aberto.values():
+            antigo.close()
+        _zip_aberto.clear()
+        zip_ref = _zip_aberto[caminho_zip] = zipfile.ZipFile(caminho_zip, "r")
+    return zip_ref
+
+
+def _carregar_conhecidos(caminho_conhecidos: Optional[str]) -> frozenset:
+    if not caminho_conhecidos:
+        return frozenset()
+    conhecidos = _conhecidos_abertos.get(caminho_conhecidos)
+    if conhecidos is None:
+        _conhecidos_abertos.clear()
+        with open(caminho_conhecidos, "r", encoding="ascii") as f:
+            conhecidos = _conhecidos_abertos[caminho_conhecidos] = frozenset(f.read().split())
+    return conhecidos
+
+
+def _ocorrencias(achados) -> List[Dict]:
+    return [
+        {"regra": regra["nome"], "severidade": regra["severidade"], "linha": linha, "coluna": coluna}
+        for regra, _, _, linha, coluna in achados
+    ]
+
+
+def _escanear_lote(
+    caminho_zip: str, nomes: List[str], caminho_conhecidos: Optional[str] = None
+) -> List[Tuple[str, Optional[List[Dict]], Optional[str], Optional[str]]]:
+    """
+    Tarefa do pool: varre um lote de arquivos do ZIP e devolve (arquivo, ocorrências,
+    erro, sha256) - cada arquivo é descompactado uma única vez e o SHA-256 sai da
+    mesma leitura. Com `caminho_conhecidos` (hashes do índice do projeto, um por
+    linha), o conteúdo descompactado fica numa cópia temporária até o hash ficar
+    pronto: se já é conhecido, a varredura é dispensada e as ocorrências vêm None.
+    """
+    zip_ref = _abrir_zip(caminho_zip)
+    conhecidos = _carregar_conhecidos(caminho_conhecidos)
+    saida = []
+    for nome in nomes:
+        sha = hashlib.sha256()
+        try:
+            info = zip_ref.getinfo(nome)
+            if not conhecidos:
+                ocorrencias = _ocorrencias(SourceScanner.escanear_membro(zip_ref, info, hash_conteudo=sha))
+            else:
+                with zip_ref.open(info) as membro, tempfile.SpooledTemporaryFile(max_size=LOTE_MAX_BYTES) as copia:
+                    for bloco in iter(lambda: membro.read(TAMANHO_BLOCO), b""):
+                        sha.update(bloco)
+                        copia.write(bloco)
+                    if sha.hexdigest() in conhecidos:
+                        ocorrencias = None
+                    else:
+                        copia.seek(0)
+                        texto = io.TextIOWrapper(copia, encoding="utf-8", errors="ignore")
+                        ocorrencias = _ocorrencias(SourceScanner.escanear_fluxo(texto))
+                        texto.detach()
+            saida.append((nome, ocorrencias, None, sha.hexdigest()))
+        except Exception as e:
+            saida.append((nome, None, str(e), None))
+    return saida
+
+
+class _LeituraComHash(io.RawIOBase):
+    """Repassa os bytes descompactados de um membro do ZIP atualizando um hash."""
+
+    def __init__(self, bruto: IO[bytes], hash_conteudo):
+        self.bruto = bruto
+        self.hash_conteudo = hash_conteudo
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, destino) -> int:
+        dados = self.bruto.read(len(destino))
+        self.hash_conteudo.update(dados)
+        destino[:len(dados)] = dados
+        return len(dados)
+
+
+class SourceScanner:
+    @staticmethod
+    def listar_membros(zip_ref: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+        """Arquivos de código do ZIP, filtrados pelo diretório central (nada é descompactado)."""
+        return [
+            info for info in zip_ref.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(EXTENSOES_FONTE)
+        ]
+
+    @staticmethod
+    def montar_lotes(membros: List[zipfile.ZipInfo]) -> List[List[str]]:
+        """Lotes de nomes em ordem decrescente de tamanho (os maiores saem primeiro, evitando retardatários)."""
+        lotes, atual, bytes_atual = [], [], 0
+        for info in sorted(membros, key=lambda i: i.file_size, reverse=True):
+            if atual and (len(atual) >= LOTE_MAX_ARQUIVOS or bytes_atual + info.file_size > LOTE_MAX_BYTES):
+                lotes.append(atual)
+                atual, bytes_atual = [], 0
+            atual.append(info.filename)
+            bytes_atual += info.file_size
+        if atual:
+            lotes.append(atual)
+        return lotes
+
+    @staticmethod
+    def escanear_zip(
+        caminho_zip: str,
+        ao_progresso: Optional[Callable[[int, int], None]] = None,
+        anteriores: Optional[Dict[str, List[Dict]]] = None,
+    ) -> Tuple[Dict[str, List[Dict]], Dict[str, str], Dict[str, str]]:
+        """
+        Varre todos os arquivos de código do ZIP distribuindo os lotes entre processos.
+        Com `anteriores` (índice do projeto: {sha256 do conteúdo: ocorrências}), os
+        conteúdos já conhecidos reaproveitam as ocorrências sem varredura; o SHA-256
+        de cada arquivo sai da mesma descompactação que a varredura usaria.
+        Retorna ({arquivo: ocorrências}, {arquivo: erro}, {arquivo: hash}), ordenados pelo nome.
+        `ao_progresso(arquivos_varridos, total)` é chamado a cada lote varrido.
+        """
+        caminho_zip = os.path.abspath(caminho_zip)
+        with zipfile.ZipFile(caminho_zip, "r") as zip_ref:
+            membros = SourceScanner.listar_membros(zip_ref)
+
+        ocorrencias, erros, hashes = {}, {}, {}
+        anteriores = anteriores or {}
+        caminho_conhecidos = None
+        if anteriores:
+            # Os hashes vão para os workers por arquivo (lido uma vez por processo), não em cada tarefa
+            descritor, caminho_conhecidos = tempfile.mkstemp(prefix="surf_conhecidos_", suffix=".txt")
+            with os.fdopen(descritor, "w", encoding="ascii") as f:
+                f.write("\n".join(anteriores))
+
+        lotes = SourceScanner.montar_lotes(membros)
+        tarefas = [(caminho_zip, lote, caminho_conhecidos) for lote in lotes]
+        reaproveitados = 0
+
+        try:
+            # Progresso em arquivos: cada lote concluído soma o próprio tamanho, em qualquer ordem
+            saidas = WorkerPool.mapear(
+                _escanear_lote, tarefas, ao_concluir=ao_progresso, pesos=[len(lote) for lote in lotes]
+            )
+        finally:
+            if caminho_conhecidos:
+                os.remove(caminho_conhecidos)
+
+        for lote, saida in zip(lotes, saidas):
+            if not saida["ok"]:
+                for nome in lote:
+                    erros[nome] = saida["erro"]
+                continue
+            for nome, achados, erro, sha256 in saida["resultado"]:
+                if erro:
+                    erros[nome] = erro
+                    continue
+                if achados is None:
+                    achados = anteriores[sha256]
+                    reaproveitados += 1
+                ocorrencias[nome] = achados
+                hashes[nome] = sha256
+        print(f"{len(membros)} arquivos de código selecionados no ZIP ({len(membros) - reaproveitados} novos/alterados).")
+
+        return dict(sorted(ocorrencias.items())), dict(sorted(erros.items())), hashes
+
+    @staticmethod
+    def escanear_membro(
+        zip_ref: zipfile.ZipFile,
+        info: zipfile.ZipInfo,
+        scanner: SecretScanner = scanner_fonte,
+        hash_conteudo=None,
+    ) -> Iterator[Tuple[dict, int, str, int, int]]:
+        """
+        Varre um membro do ZIP direto do arquivo, descompactando em blocos.
+        Com `hash_conteudo` (ex: hashlib.sha256()), os bytes lidos também atualizam o hash.
+        """
+        with zip_ref.open(info) as bruto:
+            if hash_conteudo is not None:
+                bruto = io.BufferedReader(_LeituraComHash(bruto, hash_conteudo))
+            texto = io.TextIOWrapper(bruto, encoding="utf-8", errors="ignore")
+            yield from SourceScanner.escanear_fluxo(texto, scanner)
+
+    @staticmethod
+    def escanear_fluxo(
+        fluxo: IO[str],
+        scanner: SecretScanner = scanner_fonte,
+        bloco: int = TAMANHO_BLOCO,
+        sobreposicao: int = SOBREPOSICAO,
+    ) -> Iterator[Tuple[dict, int, str, int, int]]:
+        """
+        Varre um fluxo de texto em blocos, retornando (regra, posição absoluta, valor,
+        linha, coluna) - linha e coluna começam em 1.
+        Ocorrências que terminam dentro da sobreposição são adiadas para a próxima
+        janela, que recomeça no início delas; assim nada é perdido nem duplicado.
+        A sobreposição é ampliada até o tamanho máximo de uma ocorrência do
+        `scanner`: menor que isso, uma ocorrência cortada no fim do bloco não
+        casaria com a regra e seria perdida.
+        """
+        tamanho_maximo = scanner.tamanho_maximo
+        if tamanho_maximo is None:
+            raise ValueError("Regras com quantificador sem limite não podem ser varridas em blocos")
+        sobreposicao = max(sobreposicao, tamanho_maximo)
+        buffer = ""
+        base = 0 # posição absoluta de buffer[0]
+        minimo = 0 # posições anteriores a esta já foram analisadas
+        linhas_base = 0 # quebras de linha antes de buffer[0]
+        ultima_quebra = -1 # posição absoluta da última quebra de linha antes de buffer[0]
+        while True:
+            novo = fluxo.read(bloco)
+            fim = not novo
+            buffer += novo
+            limite = len(buffer) if fim else max(len(buffer) - sobreposicao, 0)
+            corte = limite
+
+            # Contagem incremental de linhas: as ocorrências vêm em ordem crescente
+            contado_ate, linhas, quebra = 0, linhas_base, -1
+            for regra, match in scanner.escanear(buffer):
+                if base + match.start() < minimo:
+                    continue
+                if not fim and match.end() > limite:
+                    # Pode continuar no próximo bloco: as seguintes também começam depois do limite
+                    corte = min(corte, match.start())
+                    break
+                linhas += buffer.count("\n", contado_ate, match.start())
+                quebra = max(quebra, buffer.rfind("\n", contado_ate, match.start()))
+                contado_ate = match.start()
+                coluna = match.start() - quebra if quebra >= 0 else base + match.start() - ultima_quebra
+                yield regra, base + match.start(), match.group(0), linhas + 1, coluna
+
+            if fim:
+                return
+            minimo = base + corte
+            inicio = max(corte - CONTEXTO, 0)
+            quebra = buffer.rfind("\n", 0, inicio)
+            if quebra >= 0:
+                ultima_quebra = base + quebra
+            linhas_base += buffer.count("\n", 0, inicio)
+            buffer = buffer[inicio:]
+            base += inicio
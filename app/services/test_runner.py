@@ -1,17 +1,168 @@
 import os
+import re
+import threading
 import pytest
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.services.pytest_pool import PytestTimeout, pool_pytest
+
+# Sem o pool de workers, pytest.main roda no próprio processo e lê os.environ:
+# execuções simultâneas de jobs diferentes precisam ser serializadas.
+_pytest_lock = threading.Lock()
+
+# Tamanho máximo (caracteres) do traceback guardado por teste: o final, onde está a asserção
+LIMITE_DETALHES = 4000
+
+
+def _extrair_descricao(texto: Optional[str]) -> str:
+    """Junta as linhas "DESC: ..." da saída do teste sem quebrar o texto inteiro em linhas."""
+    if not texto:
+        return ""
+    partes, inicio = [], texto.find("DESC:")
+    while inicio >= 0:
+        fim = texto.find("\n", inicio)
+        partes.append(texto[inicio + 5:fim if fim >= 0 else len(texto)].strip())
+        inicio = texto.find("DESC:", fim) if fim >= 0 else -1
+    return " ".join(partes)
+
+
+def _truncar_detalhes(texto: str) -> str:
+    texto = (texto or "").strip()
+    if len(texto) <= LIMITE_DETALHES:
+        return texto
+    return "... (truncado)\n" + texto[-LIMITE_DETALHES:]
+
+
+def _severidade(nome: str, mensagem: str) -> str:
+    return "S1" if "[S1]" in mensagem or "S1" in nome else ("S2" if "[S2]" in mensagem else "S3")
+
+
+def _caso_interrompido(caminho_testes: str, motivo: str) -> Dict:
+    """
+    Resultado sintético de uma execução interrompida (tempo limite ou queda do worker):
+    o teste travado e os que nem começaram não têm resultado, então a execução conta
+    como incompleta e reprovada (S1), em vez de parecer uma suíte completa.
+    """
+    return {
+        "nome": "execucao_interrompida",
+        "classname": caminho_testes.replace("/", ".").replace("\\", "."),
+        "status": "REPROVADO",
+        "fase": "call",
+        "duracao": None,
+        "mensagem": f"[S1] Execução interrompida: {motivo}. Os testes restantes não foram executados.",
+        "detalhes": "",
+        "descricao": "A suíte não terminou: o resultado dos testes não executados é desconhecido.",
+        "severidade": "S1",
+        "interrompido": True,
+    }
+
+
+class ResultCollector:
+    """
+    Plugin do pytest: repassa o resultado de cada teste assim que ele termina,
+    já na forma compacta usada pela plataforma (mensagem, traceback truncado e
+    descrição das linhas DESC:), sem depender do relatório JUnit.
+    """
+
+    def __init__(self, ao_resultado: Callable[[Dict], None]):
+        self.ao_resultado = ao_resultado
+
+    def pytest_runtest_logreport(self, report):
+        # Um teste termina na fase "call", ou antes dela se o setup falhar/pular
+        if report.when != "call" and report.passed:
+            return
+        if report.when == "teardown" and not report.failed:
+            return
+        try:
+            self.ao_resultado(ResultCollector.compactar(report))
+        except Exception as e:
+            print(f"Aviso: Falha ao publicar resultado do teste: {e}")
+
+    @staticmethod
+    def compactar(report) -> Dict:
+        partes = report.nodeid.split("::")
+        # Mesmo classname do JUnit: módulo com pontos (+ classe, se houver)
+        modulo = partes[0][:-3] if partes[0].endswith(".py") else partes[0]
+        classname = ".".join([modulo.replace("/", ".").replace("\\", ".")] + partes[1:-1])
+        nome = partes[-1]
+
+        mensagem, detalhes = "", ""
+        if report.skipped:
+            status = "PULADO"
+            if isinstance(report.longrepr, tuple) and len(report.longrepr) == 3:
+                mensagem = str(report.longrepr[2]).replace("Skipped: ", "", 1)
+        elif report.failed:
+            status = "REPROVADO"
+            crash = getattr(report.longrepr, "reprcrash", None)
+            detalhes = report.longreprtext or ""
+            mensagem = crash.message if crash is not None else (detalhes.strip().splitlines() or ["Erro sem mensagem"])[-1]
+        else:
+            status = "APROVADO"
+
+        return {
+            "nome": nome,
+            "classname": classname,
+            "status": status,
+            "fase": report.when,
+            "duracao": round(report.duration, 3),
+            "mensagem": mensagem,
+            "detalhes": _truncar_detalhes(detalhes),
+            "descricao": _extrair_descricao(report.capstdout),
+            "severidade": _severidade(nome, mensagem) if status == "REPROVADO" else None,
+        }
+
+
+class ShardPlugin:
+    """Plugin do pytest: mantém só os testes da fatia `indice` de `total` (pela posição na coleta)."""
+
+    def __init__(self, indice: int, total: int):
+        self.indice = indice
+        self.total = total
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        selecionados = [item for i, item in enumerate(items) if i % self.total == self.indice]
+        removidos = [item for i, item in enumerate(items) if i % self.total != self.indice]
+        if removidos:
+            config.hook.pytest_deselected(items=removidos)
+        items[:] = selecionados
+
+
+def _chave_natural(texto: str) -> list:
+    # test_2 antes de test_10
+    return [int(parte) if parte.isdigit() else parte for parte in re.split(r"(\d+)", texto)]
+
 
 class TestRunner:
     @staticmethod
-    def executar_testes(caminho_testes: str) -> dict:
+    def executar_testes(
+        caminho_testes: str,
+        arquivo_xml: Optional[str] = None,
+        ambiente: Optional[Dict[str, str]] = None,
+        ao_resultado: Optional[Callable[[Dict], None]] = None,
+        fatias: int = 1,
+        afinidade: Optional[str] = None,
+    ) -> dict:
         """
         Executa os testes com Pytest e analisa o XML de resultados.
         Retorna um dicionário com métricas e detalhes das falhas.
+        `arquivo_xml` permite que cada job grave seu próprio relatório JUnit e
+        `ambiente` define variáveis (ex: TARGET_APK_PATH) apenas durante a execução.
+        `ao_resultado(teste)` é chamado ao fim de cada teste, durante a execução.
+        Com `fatias` > 1, a suíte é dividida entre vários workers do pool e os
+        relatórios são mesclados na ordem dos IDs dos testes.
+        `afinidade` (serial do dispositivo) direciona a suíte ao worker que já tem
+        a sessão do Appium daquele aparelho aberta.
+        Se o worker estourar o tempo limite ou cair, a execução entra como um
+        resultado REPROVADO (S1) "execucao_interrompida" e `executados` fica abaixo
+        de `total_testes`.
         """
         # Define onde salvar o XML
-        os.makedirs("storage", exist_ok=True)
-        arquivo_xml = os.path.join("storage", "test_results.xml")
+        if arquivo_xml is None:
+            os.makedirs("storage", exist_ok=True)
+            arquivo_xml = os.path.join("storage", "test_results.xml")
         
         # Remove XML antigo se existir para evitar leitura de cache
         if os.path.exists(arquivo_xml):
@@ -22,118 +173,260 @@ class TestRunner:
             
         print(f"--- Executando testes em: {caminho_testes} ---")
         
-        # Executa o Pytest gerando o relatório XML
-        pytest.main([
+        argumentos = [
             caminho_testes,
             "-v",
             f"--junitxml={arquivo_xml}",
             "-p", "no:warnings"
-        ])
-        
+        ]
+
+        # Resultados coletados pelo plugin, teste a teste (o XML fica como artefato)
+        coletados: List[Dict] = []
+
+        def receber(teste: Dict) -> None:
+            coletados.append(teste)
+            if ao_resultado:
+                ao_resultado(teste)
+
+        if pool_pytest.processos > 0 and fatias > 1:
+            TestRunner._executar_em_fatias(caminho_testes, arquivo_xml, ambiente, receber, fatias)
+            # As fatias terminam intercaladas: mesma ordem do XML mesclado
+            coletados.sort(key=lambda t: _chave_natural(f"{t['classname']}::{t['nome']}"))
+        elif pool_pytest.processos > 0:
+            # Executa em um worker pré-aquecido: imports e os.environ ficam fora do servidor
+            try:
+                pool_pytest.executar(caminho_testes, argumentos, ambiente, receber, afinidade=afinidade)
+            except PytestTimeout as e:
+                print(f"⚠️ {e}. Worker finalizado.")
+                receber(_caso_interrompido(caminho_testes, str(e)))
+            except RuntimeError as e:
+                print(f"⚠️ {e}")
+                receber(_caso_interrompido(caminho_testes, str(e)))
+        else:
+            TestRunner._executar_no_processo(argumentos, ambiente, receber)
+
+        if coletados:
+            return TestRunner.montar_resultados(coletados)
+        # Nada coletado (ex: worker caiu antes do primeiro teste): usa o JUnit, se existir
         return TestRunner._analisar_xml(arquivo_xml)
 
     @staticmethod
-    def _analisar_xml(caminho_xml: str) -> dict:
+    def _executar_em_fatias(caminho_testes: str, arquivo_xml: str, ambiente, ao_resultado, fatias: int) -> None:
+        """
+        Executa cada fatia da suíte em um worker (em paralelo) e mescla os XMLs.
+        Cada fatia interrompida vira um resultado "execucao_interrompida_fatia_<n>".
+        """
+        arquivos_fatia = [f"{arquivo_xml}.fatia{i}.xml" for i in range(fatias)]
+
+        def executar_fatia(indice: int) -> None:
+            argumentos = [caminho_testes, "-v", f"--junitxml={arquivos_fatia[indice]}", "-p", "no:warnings"]
+            try:
+                pool_pytest.executar(caminho_testes, argumentos, ambiente, ao_resultado, fatia=(indice, fatias))
+            except (PytestTimeout, RuntimeError) as e:
+                print(f"⚠️ {e} (fatia {indice + 1}/{fatias})")
+                # Os testes que a fatia não rodou se perdem: a execução mesclada fica incompleta
+                caso = _caso_interrompido(caminho_testes, f"{e} (fatia {indice + 1}/{fatias})")
+                ao_resultado(dict(caso, nome=f"execucao_interrompida_fatia_{indice + 1}"))
+
+        with ThreadPoolExecutor(max_workers=fatias, thread_name_prefix="surf-fatia") as executor:
+            list(executor.map(executar_fatia, range(fatias)))
+
+        TestRunner._mesclar_xml(arquivos_fatia, arquivo_xml)
+        for arquivo in arquivos_fatia:
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+
+    @staticmethod
+    def _mesclar_xml(arquivos: List[str], destino: str) -> None:
+        """Junta os relatórios JUnit das fatias em uma única suíte, ordenada pelo ID do teste."""
+        casos = []
+        for arquivo in arquivos:
+            if not os.path.exists(arquivo):
+                continue
+            try:
+                casos.extend(ET.parse(arquivo).getroot().iter("testcase"))
+            except ET.ParseError as e:
+                print(f"Aviso: Relatório de fatia ilegível ({arquivo}): {e}")
+        casos.sort(key=lambda caso: _chave_natural(f"{caso.get('classname', '')}::{caso.get('name', '')}"))
+
+        suite = ET.Element("testsuite", {
+            "name": "pytest",
+            "tests": str(len(casos)),
+            "failures": str(sum(1 for caso in casos if caso.find("failure") is not None)),
+            "errors": str(sum(1 for caso in casos if caso.find("error") is not None)),
+            "skipped": str(sum(1 for caso in casos if caso.find("skipped") is not None)),
+            "time": f"{sum(float(caso.get('time', 0) or 0) for caso in casos):.3f}",
+        })
+        suite.extend(casos)
+        raiz = ET.Element("testsuites")
+        raiz.append(suite)
+        ET.ElementTree(raiz).write(destino, encoding="utf-8", xml_declaration=True)
+
+    @staticmethod
+    def _executar_no_processo(argumentos: List[str], ambiente: Optional[Dict[str, str]], ao_resultado) -> None:
+        """Pool desativado: roda o pytest no processo do servidor (serializado pelo lock)."""
+        with _pytest_lock:
+            ambiente_anterior = {chave: os.environ.get(chave) for chave in (ambiente or {})}
+            os.environ.update(ambiente or {})
+            try:
+                pytest.main(argumentos, plugins=[ResultCollector(ao_resultado)] if ao_resultado else None)
+            finally:
+                for chave, valor in ambiente_anterior.items():
+                    if valor is None:
+                        os.environ.pop(chave, None)
+                    else:
+                        os.environ[chave] = valor
+
+    @staticmethod
+    def _consolidar(casos: List[Dict]) -> List[Dict]:
+        """Um resultado por teste: falha no teardown após o call conta como reprovação do mesmo teste."""
+        prioridade = {"APROVADO": 0, "PULADO": 1, "REPROVADO": 2}
+        por_teste: Dict[tuple, Dict] = {}
+        for caso in casos:
+            chave = (caso["classname"], caso["nome"])
+            atual = por_teste.get(chave)
+            if atual is None or prioridade[caso["status"]] > prioridade[atual["status"]]:
+                if atual is not None and not caso.get("descricao"):
+                    caso = dict(caso, descricao=atual.get("descricao", ""))
+                por_teste[chave] = caso
+        return list(por_teste.values())
+
+    @staticmethod
+    def montar_resultados(casos: List[Dict]) -> dict:
+        """Métricas e listas (PDF/frontend) a partir dos resultados compactos dos testes."""
         resultados = {
-            "total_testes": 0, "executados": 0, "aprovados": 0, "falhas": 0,
-            "defeitos_s1": 0, "defeitos_s2": 0, "falhas_por_area": {},
+            "total_testes": 0, "executados": 0, "aprovados": 0, "falhas": 0, "pulados": 0,
+            "interrompidos": 0, "defeitos_s1": 0, "defeitos_s2": 0, "falhas_por_area": {},
             "lista_falhas": [], # Lista detalhada para o PDF
             "lista_testes": [],  # Lista completa para o Frontend
             "sugestao_ia": None # Campo para IA preencher
         }
-        
+
+        for caso in TestRunner._consolidar(casos):
+            descricao = caso.get("descricao") or "Sem descrição disponível."
+            severidade = None
+            resultados["total_testes"] += 1
+            if caso.get("interrompido"):
+                resultados["interrompidos"] += 1
+            if caso["status"] == "PULADO":
+                resultados["pulados"] += 1
+            elif caso["status"] == "REPROVADO":
+                resultados["falhas"] += 1
+                severidade = caso.get("severidade") or _severidade(caso["nome"], caso["mensagem"])
+                if severidade == "S1": resultados["defeitos_s1"] += 1
+                elif severidade == "S2": resultados["defeitos_s2"] += 1
+
+                resultados["lista_falhas"].append({
+                    "teste": caso["nome"], "classe": caso["classname"], "mensagem": caso["mensagem"],
+                    "severidade": severidade, "detalhes": caso["detalhes"],
+                    "descricao": descricao, # Adicionado para o relatório executivo
+                    "analise_ia": "Aguardando integração com LLM..." # Placeholder
+                })
+
+            # Adiciona à lista completa de testes para o front
+            resultados["lista_testes"].append({
+                "name": caso["nome"],
+                "classname": caso["classname"],
+                "status": caso["status"],
+                "message": caso["mensagem"],
+                "details": caso["detalhes"],
+                "description": descricao,
+                "duration": caso.get("duracao"),
+                "severity": severidade,
+            })
+
+        # Execução interrompida: o Quality Gate vê a execução abaixo de 100%
+        resultados["executados"] = resultados["total_testes"] - resultados["interrompidos"]
+        # Teste pulado não comprovou nada: não entra na taxa de aprovação
+        resultados["aprovados"] = resultados["total_testes"] - resultados["falhas"] - resultados["pulados"]
+
+        # Simulação de uma IA analisando o contexto geral (Futuro: Chamar API OpenAI/Gemini aqui)
+        if resultados["falhas"] > 0:
+            # Lógica Dinâmica: Gera o texto baseado nas falhas REAIS encontradas
+            topicos = []
+            for f in resultados["lista_falhas"]:
+                m = f['mensagem'].lower()
+                if "debug" in m: topicos.append("Segurança Crítica (Debug Ativo)")
+                elif "assinatura" in m: topicos.append("Integridade do APK (Não assinado)")
+                elif "backup" in m: topicos.append("Proteção de Dados (Backup Aberto)")
+                elif "export" in m: topicos.append("Superfície de Ataque (Activities Expostas)")
+                elif "performance" in m or "frames" in m: topicos.append("Performance (Jank/Lentidão)")
+
+            # Remove duplicatas e pega os top 3
+            topicos = list(set(topicos))[:3]
+            resumo_falhas = ", ".join(topicos)
+
+            resultados["sugestao_ia"] = (
+                f"<b>Analise Inteligente:</b> O Quality Gate reprovou o build principalmente devido a: <b>{resumo_falhas}</b>. "
+                "Recomendamos priorizar as falhas marcadas como [S1] pois bloqueiam o lançamento na loja. "
+                "Verifique o Manifesto Android para fechar as brechas de segurança identificadas."
+            )
+        elif resultados["total_testes"] > 0:
+            resultados["sugestao_ia"] = "<b>Analise Inteligente:</b> Parabens! O build passou em todos os criterios de qualidade e seguranca. Pronto para UAT."
+
+        return resultados
+
+    @staticmethod
+    def ler_junit(caminho_xml: str) -> Iterator[Dict]:
+        """
+        Lê um relatório JUnit em fluxo (iterparse), um testcase por vez, removendo cada
+        testcase e cada testsuite da árvore após o uso: relatórios externos grandes não
+        ficam inteiros em memória.
+        """
+        pilha = [] # Elementos abertos: o pai de cada um é o anterior na pilha
+        for evento, elem in ET.iterparse(caminho_xml, events=("start", "end")):
+            if evento == "start":
+                pilha.append(elem)
+                continue
+            pilha.pop()
+            if elem.tag == "testsuite":
+                # Os testcases já foram lidos: tira a suíte (e os atributos) da raiz
+                elem.clear()
+                if pilha:
+                    pilha[-1].remove(elem)
+                continue
+            if elem.tag != "testcase":
+                continue
+            nome = elem.get("name", "unnamed")
+            falha, pulado, saida = None, None, None
+            for filho in elem:
+                if filho.tag in ("failure", "error") and falha is None:
+                    falha = filho
+                elif filho.tag == "skipped":
+                    pulado = filho
+                elif filho.tag == "system-out":
+                    saida = filho.text
+
+            mensagem, detalhes, status = "", "", "APROVADO"
+            if falha is not None:
+                status = "REPROVADO"
+                mensagem = falha.get("message", "Erro sem mensagem")
+                detalhes = falha.text or ""
+            elif pulado is not None:
+                status = "PULADO"
+                mensagem = pulado.get("message", "")
+
+            yield {
+                "nome": nome,
+                "classname": elem.get("classname", "unknown"),
+                "status": status,
+                "duracao": round(float(elem.get("time", 0) or 0), 3),
+                "mensagem": mensagem,
+                "detalhes": _truncar_detalhes(detalhes),
+                "descricao": _extrair_descricao(saida),
+                "severidade": _severidade(nome, mensagem) if status == "REPROVADO" else None,
+            }
+            elem.clear()
+            if pilha:
+                pilha[-1].remove(elem)
+
+    @staticmethod
+    def _analisar_xml(caminho_xml: str) -> dict:
+        """Resultados a partir de um relatório JUnit (fallback e arquivos externos)."""
         if not os.path.exists(caminho_xml):
-            return resultados
-            
+            return TestRunner.montar_resultados([])
         try:
-            tree = ET.parse(caminho_xml)
-            root = tree.getroot()
-            
-            # Busca todas as suítes de teste
-            testsuites = root.findall(".//testsuite") or [root]
-            
-            for suite in testsuites:
-                resultados["total_testes"] += int(suite.attrib.get("tests", 0))
-                resultados["falhas"] += int(suite.attrib.get("failures", 0)) + int(suite.attrib.get("errors", 0))
-                
-                for case in suite.findall("testcase"):
-                    nome = case.attrib.get("name", "unnamed")
-                    classe = case.attrib.get("classname", "unknown")
-                    
-                    # Verifica se houve falha ou erro
-                    failure = case.find("failure")
-                    error = case.find("error")
-                    elem = failure if failure is not None else error
-                    
-                    status = "APROVADO"
-                    msg = ""
-                    detalhes = ""
-
-                    # Captura a descrição do teste (stdout)
-                    system_out = case.find("system-out")
-                    descricao = "Sem descrição disponível."
-                    
-                    if system_out is not None and system_out.text:
-                        # Procura por linhas que começam com DESC:
-                        lines = system_out.text.split('\n')
-                        desc_lines = [line.replace("DESC:", "").strip() for line in lines if "DESC:" in line]
-                        if desc_lines:
-                            descricao = " ".join(desc_lines)
-
-                    if elem is not None:
-                        status = "REPROVADO"
-                        msg = elem.attrib.get("message", "Erro sem mensagem")
-                        detalhes = elem.text or ""
-                        severidade = "S1" if "[S1]" in msg or "S1" in nome else ("S2" if "[S2]" in msg else "S3")
-                        
-                        if severidade == "S1": resultados["defeitos_s1"] += 1
-                        elif severidade == "S2": resultados["defeitos_s2"] += 1
-                        
-                        resultados["lista_falhas"].append({
-                            "teste": nome, "classe": classe, "mensagem": msg,
-                            "severidade": severidade, "detalhes": detalhes.strip(),
-                            "descricao": descricao, # Adicionado para o relatório executivo
-                            "analise_ia": "Aguardando integração com LLM..." # Placeholder
-                        })
-                    
-                    # Adiciona à lista completa de testes para o front
-                    resultados["lista_testes"].append({
-                        "name": nome,
-                        "classname": classe,
-                        "status": status,
-                        "message": msg,
-                        "details": detalhes,
-                        "description": descricao
-                    })
-            
-            resultados["executados"] = resultados["total_testes"]
-            resultados["aprovados"] = resultados["total_testes"] - resultados["falhas"]
-
-            # Simulação de uma IA analisando o contexto geral (Futuro: Chamar API OpenAI/Gemini aqui)
-            if resultados["falhas"] > 0:
-                # Lógica Dinâmica: Gera o texto baseado nas falhas REAIS encontradas
-                topicos = []
-                for f in resultados["lista_falhas"]:
-                    m = f['mensagem'].lower()
-                    if "debug" in m: topicos.append("Segurança Crítica (Debug Ativo)")
-                    elif "assinatura" in m: topicos.append("Integridade do APK (Não assinado)")
-                    elif "backup" in m: topicos.append("Proteção de Dados (Backup Aberto)")
-                    elif "export" in m: topicos.append("Superfície de Ataque (Activities Expostas)")
-                    elif "performance" in m or "frames" in m: topicos.append("Performance (Jank/Lentidão)")
-                
-                # Remove duplicatas e pega os top 3
-                topicos = list(set(topicos))[:3]
-                resumo_falhas = ", ".join(topicos)
-                
-                resultados["sugestao_ia"] = (
-                    f"<b>Analise Inteligente:</b> O Quality Gate reprovou o build principalmente devido a: <b>{resumo_falhas}</b>. "
-                    "Recomendamos priorizar as falhas marcadas como [S1] pois bloqueiam o lançamento na loja. "
-                    "Verifique o Manifesto Android para fechar as brechas de segurança identificadas."
-                )
-            else:
-                resultados["sugestao_ia"] = "<b>Analise Inteligente:</b> Parabens! O build passou em todos os criterios de qualidade e seguranca. Pronto para UAT."
-
+            return TestRunner.montar_resultados(list(TestRunner.ler_junit(caminho_xml)))
         except Exception as e:
             print(f"Erro ao analisar XML: {e}")
-            
-        return resultados
\ No newline at end of file
+            return TestRunner.montar_resultados([])
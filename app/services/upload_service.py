@@ -0,0 +1,293 @@
+# Arquivo: app/services/upload_service.py
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from urllib.parse import parse_qsl
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import BLOBS_MAX_BYTES, STORAGE_DIR, UPLOAD_MAX_BYTES
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    try:
+        # Versões antigas do python-multipart expõem o módulo como "multipart"
+        from multipart.multipart import MultipartParser, parse_options_header
+    except ImportError:
+        MultipartParser = parse_options_header = None
+
+TAMANHO_BLOCO = 1024 * 1024
+
+# Campos de texto do formulário (fase, projeto, upload_id...) ficam em memória
+TAMANHO_CAMPO = 64 * 1024
+
+# APKs e ZIPs de código fonte começam com o cabeçalho de arquivo local do ZIP
+ASSINATURA_ZIP = b"PK\x03\x04"
+
+
+class UploadRejected(Exception):
+    """Upload recusado; `status_code` é o código HTTP devolvido ao cliente."""
+
+    def __init__(self, mensagem: str, status_code: int = 400):
+        super().__init__(mensagem)
+        self.status_code = status_code
+
+
+class UploadReceiver:
+    """
+    Recebe um upload bloco a bloco: calcula o SHA-256, confere o cabeçalho ZIP
+    e o tamanho máximo durante a própria escrita (o arquivo é lido uma vez só).
+    """
+
+    def __init__(self, max_bytes: int = UPLOAD_MAX_BYTES, validar_zip: bool = True):
+        self.max_bytes = max_bytes
+        self.validar_zip = validar_zip
+        self.sha = hashlib.sha256()
+        self.tamanho = 0
+        self._cabecalho = b"" if validar_zip else ASSINATURA_ZIP
+
+    def receber(self, bloco: bytes) -> None:
+        self.tamanho += len(bloco)
+        if self.tamanho > self.max_bytes:
+            raise UploadRejected(f"Arquivo excede o limite de {self.max_bytes // (1024 * 1024)} MB.", 413)
+        if len(self._cabecalho) < len(ASSINATURA_ZIP):
+            self._cabecalho += bloco[:len(ASSINATURA_ZIP) - len(self._cabecalho)]
+            if not ASSINATURA_ZIP.startswith(self._cabecalho):
+                raise UploadRejected("Arquivo inválido: esperado um APK ou ZIP.", 415)
+        self.sha.update(bloco)
+
+    def finalizar(self) -> str:
+        if self.validar_zip and self._cabecalho != ASSINATURA_ZIP:
+            raise UploadRejected("Arquivo inválido: esperado um APK ou ZIP.", 415)
+        return self.sha.hexdigest()
+
+
+def _gravar_bloco(recebimento: UploadReceiver, destino: BinaryIO, dados: bytes) -> None:
+    recebimento.receber(dados)
+    destino.write(dados)
+
+
+class UploadService:
+    @staticmethod
+    def nome_seguro(nome: str, padrao: str = "upload.bin") -> str:
+        """Descarta diretórios do nome enviado pelo cliente (evita path traversal)."""
+        nome = os.path.basename((nome or "").replace("\\", "/"))
+        return nome if nome not in ("", ".", "..") else padrao
+
+    @staticmethod
+    async def receber_formulario(
+        content_type: Optional[str],
+        fluxo: AsyncIterator[bytes],
+        campos_arquivo: Sequence[str],
+        max_bytes: int = UPLOAD_MAX_BYTES,
+    ) -> Tuple[Dict[str, str], Dict[str, Dict]]:
+        """
+        Lê um formulário conforme ele chega. No multipart/form-data, cada arquivo vai direto
+        para um temporário em storage/uploads, com SHA-256, cabeçalho ZIP e tamanho
+        máximo conferidos durante a escrita (sem o arquivo intermediário do Starlette).
+        Retorna (campos, arquivos); cada arquivo é {"nome", "caminho", "sha256", "tamanho"}
+        e o chamador move ou remove o temporário. Só os campos em `campos_arquivo` podem
+        trazer arquivos. Se o envio falhar, nada fica no disco. Formulários urlencoded
+        (só campos, ex: `apk_upload_id`) também são aceitos.
+        """
+        if MultipartParser is None:
+            raise UploadRejected("Suporte a multipart indisponível (instale python-multipart).", 500)
+        tipo, opcoes = parse_options_header(content_type)
+        if tipo == b"application/x-www-form-urlencoded":
+            corpo = bytearray()
+            async for bloco in fluxo:
+                corpo += bloco
+                if len(corpo) > TAMANHO_CAMPO:
+                    raise UploadRejected(f"Formulário excede {TAMANHO_CAMPO} bytes.", 413)
+            return dict(parse_qsl(corpo.decode("utf-8", "replace"), keep_blank_values=True)), {}
+        if tipo != b"multipart/form-data" or not opcoes.get(b"boundary"):
+            raise UploadRejected("Envie os arquivos como multipart/form-data.", 400)
+
+        # O parser do python-multipart é síncrono: os callbacks só enfileiram eventos
+        eventos: List[Tuple[str, object]] = []
+        cabecalho = {"campo": b"", "valor": b""}
+
+        def fim_cabecalho():
+            eventos.append(("cabecalho", (cabecalho["campo"].lower(), cabecalho["valor"])))
+            cabecalho.update(campo=b"", valor=b"")
+
+        parser = MultipartParser(opcoes[b"boundary"], {
+            "on_part_begin": lambda: eventos.append(("inicio", None)),
+            "on_header_field": lambda dados, i, f: cabecalho.update(campo=cabecalho["campo"] + dados[i:f]),
+            "on_header_value": lambda dados, i, f: cabecalho.update(valor=cabecalho["valor"] + dados[i:f]),
+            "on_header_end": fim_cabecalho,
+            "on_headers_finished": lambda: eventos.append(("pronto", None)),
+            "on_part_data": lambda dados, i, f: eventos.append(("dados", dados[i:f])),
+            "on_part_end": lambda: eventos.append(("fim", None)),
+        })
+
+        campos: Dict[str, str] = {}
+        arquivos: Dict[str, Dict] = {}
+        parte: Optional[Dict] = None
+        cabecalhos: Dict[bytes, bytes] = {}
+
+        async def gravar_pendente():
+            if parte.get("destino") and parte["pendente"]:
+                await asyncio.to_thread(_gravar_bloco, parte["recebimento"], parte["destino"], bytes(parte["pendente"]))
+                parte["pendente"].clear()
+
+        async def processar():
+            nonlocal parte, cabecalhos
+            for evento, valor in eventos:
+                if evento == "inicio":
+                    parte, cabecalhos = None, {}
+                elif evento == "cabecalho":
+                    cabecalhos[valor[0]] = valor[1]
+                elif evento == "pronto":
+                    _, disposicao = parse_options_header(cabecalhos.get(b"content-disposition"))
+                    parte = {"campo": disposicao.get(b"name", b"").decode("utf-8", "replace"), "pendente": bytearray()}
+                    if b"filename" in disposicao:
+                        if parte["campo"] not in campos_arquivo or parte["campo"] in arquivos:
+                            raise UploadRejected(f"Campo de arquivo inesperado: '{parte['campo']}'.", 400)
+                        parte["nome"] = disposicao[b"filename"].decode("utf-8", "replace")
+                        parte["caminho"] = UploadService.arquivo_temporario()
+                        parte["recebimento"] = UploadReceiver(max_bytes, validar_zip=True)
+                        parte["destino"] = await asyncio.to_thread(open, parte["caminho"], "wb")
+                        arquivos[parte["campo"]] = parte
+                elif evento == "dados" and parte is not None:
+                    parte["pendente"] += valor
+                    if parte.get("destino") is None:
+                        if len(parte["pendente"]) > TAMANHO_CAMPO:
+                            raise UploadRejected(f"Campo '{parte['campo']}' excede {TAMANHO_CAMPO} bytes.", 413)
+                    elif len(parte["pendente"]) >= TAMANHO_BLOCO:
+                        await gravar_pendente()
+                elif evento == "fim" and parte is not None:
+                    if parte.get("destino") is None:
+                        campos[parte["campo"]] = parte["pendente"].decode("utf-8", "replace")
+                    else:
+                        await gravar_pendente()
+                        await asyncio.to_thread(parte["destino"].close)
+                    parte = None
+            eventos.clear()
+
+        try:
+            async for bloco in fluxo:
+                UploadService._alimentar(parser, bloco)
+                await processar()
+            UploadService._alimentar(parser, None)
+            await processar()
+            recebidos = {}
+            for campo, arquivo in arquivos.items():
+                if arquivo["recebimento"].tamanho == 0:
+                    # Campo de arquivo enviado vazio (formulário sem arquivo escolhido)
+                    os.remove(arquivo["caminho"])
+                    continue
+                recebidos[campo] = {
+                    "nome": arquivo["nome"],
+                    "caminho": arquivo["caminho"],
+                    "sha256": arquivo["recebimento"].finalizar(),
+                    "tamanho": arquivo["recebimento"].tamanho,
+                }
+            return campos, recebidos
+        except BaseException:
+            for arquivo in arquivos.values():
+                arquivo["destino"].close()
+                if os.path.exists(arquivo["caminho"]):
+                    os.remove(arquivo["caminho"])
+            raise
+
+    @staticmethod
+    def _alimentar(parser, bloco: Optional[bytes]) -> None:
+        """Entrega um bloco ao parser (None finaliza); corpo malformado vira 400."""
+        try:
+            if bloco is None:
+                parser.finalize()
+            else:
+                parser.write(bloco)
+        except Exception as e:
+            raise UploadRejected(f"Formulário multipart inválido: {e}", 400)
+
+    # ------------------------------------------------------------------
+    # Armazenamento endereçado pelo conteúdo (storage/blobs/<sha256>)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def pasta_blobs() -> str:
+        pasta = os.path.join(STORAGE_DIR, "blobs")
+        os.makedirs(pasta, exist_ok=True)
+        return pasta
+
+    @staticmethod
+    def caminho_blob(sha256: str) -> str:
+        if not re.fullmatch(r"[0-9a-f]{64}", sha256 or ""):
+            raise UploadRejected("SHA-256 inválido.", 400)
+        return os.path.join(UploadService.pasta_blobs(), sha256)
+
+    @staticmethod
+    def armazenar_blob(temporario: str, sha256: str) -> str:
+        """Move o arquivo recebido para o armazenamento; conteúdo repetido é descartado."""
+        destino = UploadService.caminho_blob(sha256)
+        if os.path.exists(destino):
+            os.remove(temporario)
+        else:
+            os.replace(temporario, destino)
+        UploadService.limitar_blobs(manter=destino)
+        return destino
+
+    @staticmethod
+    def liberar_blob(sha256: str) -> bool:
+        """
+        Remove o blob se nenhuma pasta de job o referencia mais (os jobs usam hard
+        links, então o blob sem outros vínculos tem `st_nlink == 1`).
+        """
+        caminho = UploadService.caminho_blob(sha256)
+        try:
+            if os.stat(caminho).st_nlink > 1:
+                return False
+            os.remove(caminho)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def limitar_blobs(max_bytes: int = BLOBS_MAX_BYTES, manter: Optional[str] = None) -> None:
+        """Acima de `max_bytes`, remove os blobs mais antigos que não estão em uso por um job."""
+        pasta = UploadService.pasta_blobs()
+        blobs = []
+        for nome in os.listdir(pasta):
+            caminho = os.path.join(pasta, nome)
+            try:
+                blobs.append((os.stat(caminho), caminho))
+            except FileNotFoundError:
+                continue
+        total = sum(info.st_size for info, _ in blobs)
+        for info, caminho in sorted(blobs, key=lambda item: item[0].st_mtime):
+            if total <= max_bytes:
+                break
+            if caminho == manter or info.st_nlink > 1:
+                continue
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= info.st_size
+            print(f"Blobs: {os.path.basename(caminho)[:12]} removido (limite de espaço).")
+
+    @staticmethod
+    def arquivo_temporario() -> str:
+        pasta = os.path.join(STORAGE_DIR, "uploads")
+        os.makedirs(pasta, exist_ok=True)
+        return os.path.join(pasta, f"{uuid.uuid4().hex}.tmp")
+
+    @staticmethod
+    def vincular_blob(sha256: str, destino: str) -> Optional[str]:
+        """
+        Disponibiliza um blob já recebido na pasta do job (hard link, sem copiar
+        os bytes; cópia apenas se o sistema de arquivos não suportar).
+        Retorna None se o blob não existir.
+        """
+        origem = UploadService.caminho_blob(sha256)
+        if not os.path.exists(origem):
+            return None
+        try:
+            os.link(origem, destino)
+        except OSError:
+            shutil.copyfile(origem, destino)
+        return destino
@@ -0,0 +1,200 @@
+# Arquivo: app/services/upload_sessions.py
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional
+
+from app.core.config import STORAGE_DIR, UPLOAD_MAX_BYTES, UPLOAD_SESSAO_TTL
+from app.services.upload_service import TAMANHO_BLOCO, UploadReceiver, UploadRejected, UploadService
+
+
+class UploadSessions:
+    """
+    Uploads retomáveis em partes (no estilo do protocolo tus): o cliente abre uma
+    sessão informando o tamanho total e envia os blocos com o offset em que cada
+    um começa. Se a conexão cair, consulta o offset já gravado e continua dali.
+
+    O arquivo parcial (`storage/uploads/<id>.part`) é a fonte da verdade do offset,
+    então as sessões sobrevivem a um reinício do servidor. O SHA-256 é calculado
+    conforme os blocos chegam; só depois de um reinício o parcial é relido uma vez.
+    Ao completar, o arquivo vai para o armazenamento endereçado pelo conteúdo.
+    Sessões sem nenhum envio há mais de `ttl` segundos são descartadas (cada
+    envio renova a validade).
+    """
+
+    def __init__(self, pasta: Optional[str] = None, max_bytes: int = UPLOAD_MAX_BYTES, ttl: int = UPLOAD_SESSAO_TTL):
+        self.pasta = pasta or os.path.join(STORAGE_DIR, "uploads")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._recebimentos: Dict[str, UploadReceiver] = {}
+        self._em_uso = set()
+        self._lock = threading.Lock()
+        os.makedirs(self.pasta, exist_ok=True)
+
+    def criar(self, nome: str, tamanho_total: int) -> Dict:
+        if tamanho_total <= 0:
+            raise UploadRejected("Informe o tamanho total do arquivo.", 400)
+        if tamanho_total > self.max_bytes:
+            raise UploadRejected(f"Arquivo excede o limite de {self.max_bytes // (1024 * 1024)} MB.", 413)
+        self._remover_expiradas()
+
+        sessao = {
+            "id": uuid.uuid4().hex,
+            "nome": UploadService.nome_seguro(nome),
+            "tamanho_total": tamanho_total,
+            "criado_em": time.time(),
+            "sha256": None,
+        }
+        open(self._caminho_parcial(sessao["id"]), "wb").close()
+        self._salvar_sessao(sessao)
+        return self.obter(sessao["id"])
+
+    def registrar_concluido(self, nome: str, temporario: str, sha256: str, tamanho: int) -> Dict:
+        """Registra como sessão concluída um arquivo recebido de uma vez só (ex: multipart)."""
+        UploadService.armazenar_blob(temporario, sha256)
+        sessao = {
+            "id": uuid.uuid4().hex,
+            "nome": UploadService.nome_seguro(nome),
+            "tamanho_total": tamanho,
+            "criado_em": time.time(),
+            "sha256": sha256,
+        }
+        self._salvar_sessao(sessao)
+        return self.obter(sessao["id"])
+
+    def obter(self, upload_id: str) -> Dict:
+        sessao = self._carregar_sessao(upload_id)
+        if sessao["sha256"]:
+            sessao["offset"] = sessao["tamanho_total"]
+        else:
+            sessao["offset"] = os.path.getsize(self._caminho_parcial(upload_id))
+        sessao["concluido"] = bool(sessao["sha256"])
+        return sessao
+
+    async def anexar(self, upload_id: str, offset: int, fluxo: AsyncIterator[bytes]) -> Dict:
+        """
+        Grava um bloco a partir de `offset` (que precisa ser igual ao offset atual).
+        Quando o arquivo fica completo, valida e move para storage/blobs/<sha256>.
+        Escrita em disco e hash rodam em threads (asyncio.to_thread), acumulando os
+        pedaços da requisição até TAMANHO_BLOCO, para não travar o event loop.
+        """
+        with self._lock:
+            if upload_id in self._em_uso:
+                raise UploadRejected("Já existe um envio em andamento para este upload.", 409)
+            self._em_uso.add(upload_id)
+        try:
+            sessao = await asyncio.to_thread(self._registrar_atividade, upload_id)
+            if sessao["concluido"]:
+                return sessao
+            if offset != sessao["offset"]:
+                raise UploadRejected(f"Offset divergente: o servidor está em {sessao['offset']}.", 409)
+
+            recebimento = await asyncio.to_thread(self._recebimento, upload_id, sessao["offset"])
+            caminho = self._caminho_parcial(upload_id)
+            try:
+                with open(caminho, "ab") as parcial:
+                    pendente = bytearray()
+                    async for bloco in fluxo:
+                        if recebimento.tamanho + len(pendente) + len(bloco) > sessao["tamanho_total"]:
+                            raise UploadRejected("Bloco ultrapassa o tamanho total declarado.", 413)
+                        pendente += bloco
+                        if len(pendente) >= TAMANHO_BLOCO:
+                            await asyncio.to_thread(UploadSessions._gravar, recebimento, parcial, bytes(pendente))
+                            pendente.clear()
+                    if pendente:
+                        await asyncio.to_thread(UploadSessions._gravar, recebimento, parcial, bytes(pendente))
+            except BaseException:
+                # Conexão interrompida: o que já foi gravado continua valendo, mas o
+                # hash em memória pode ter avançado além do disco; relê no próximo envio
+                self._recebimentos.pop(upload_id, None)
+                raise
+
+            if recebimento.tamanho == sessao["tamanho_total"]:
+                return await asyncio.to_thread(self._finalizar, sessao, recebimento)
+            return await asyncio.to_thread(self._registrar_atividade, upload_id)
+        finally:
+            with self._lock:
+                self._em_uso.discard(upload_id)
+
+    @staticmethod
+    def _gravar(recebimento: UploadReceiver, parcial, dados: bytes) -> None:
+        recebimento.receber(dados)
+        parcial.write(dados)
+
+    def _registrar_atividade(self, upload_id: str) -> Dict:
+        """Renova a validade da sessão (o TTL conta a partir do último envio) e a devolve."""
+        sessao = self.obter(upload_id)
+        os.utime(self._caminho_sessao(upload_id))
+        return sessao
+
+    def remover(self, upload_id: str) -> None:
+        self._carregar_sessao(upload_id)
+        self._recebimentos.pop(upload_id, None)
+        for caminho in (self._caminho_parcial(upload_id), self._caminho_sessao(upload_id)):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    def _finalizar(self, sessao: Dict, recebimento: UploadReceiver) -> Dict:
+        self._recebimentos.pop(sessao["id"], None)
+        try:
+            sha256 = recebimento.finalizar()
+        except UploadRejected:
+            self.remover(sessao["id"])
+            raise
+        UploadService.armazenar_blob(self._caminho_parcial(sessao["id"]), sha256)
+        sessao = {k: v for k, v in sessao.items() if k not in ("offset", "concluido")}
+        sessao["sha256"] = sha256
+        self._salvar_sessao(sessao)
+        print(f"Upload {sessao['id']} concluído: {sessao['nome']} (sha256: {sha256})")
+        return self.obter(sessao["id"])
+
+    def _recebimento(self, upload_id: str, offset: int) -> UploadReceiver:
+        recebimento = self._recebimentos.get(upload_id)
+        if recebimento is None or recebimento.tamanho != offset:
+            # Servidor reiniciado (ou envio interrompido): refaz o hash do parcial uma vez
+            recebimento = UploadReceiver(self.max_bytes, validar_zip=True)
+            with open(self._caminho_parcial(upload_id), "rb") as parcial:
+                for bloco in iter(lambda: parcial.read(TAMANHO_BLOCO), b""):
+                    recebimento.receber(bloco)
+            self._recebimentos[upload_id] = recebimento
+        return recebimento
+
+    def _remover_expiradas(self) -> None:
+        limite = time.time() - self.ttl
+        for nome in os.listdir(self.pasta):
+            if not nome.endswith(".json"):
+                continue
+            upload_id = nome[:-len(".json")]
+            if upload_id in self._em_uso:
+                continue
+            try:
+                if os.path.getmtime(self._caminho_sessao(upload_id)) < limite:
+                    self.remover(upload_id)
+            except (OSError, UploadRejected):
+                continue
+
+    def _caminho_parcial(self, upload_id: str) -> str:
+        return os.path.join(self.pasta, f"{upload_id}.part")
+
+    def _caminho_sessao(self, upload_id: str) -> str:
+        return os.path.join(self.pasta, f"{upload_id}.json")
+
+    def _carregar_sessao(self, upload_id: str) -> Dict:
+        caminho = self._caminho_sessao(upload_id) if upload_id.isalnum() else None
+        if caminho is None or not os.path.exists(caminho):
+            raise UploadRejected(f"Upload '{upload_id}' não encontrado.", 404)
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _salvar_sessao(self, sessao: Dict) -> None:
+        caminho = self._caminho_sessao(sessao["id"])
+        with open(f"{caminho}.tmp", "w", encoding="utf-8") as f:
+            json.dump(sessao, f)
+        os.replace(f"{caminho}.tmp", caminho)
+
+
+# Instância única usada pela API
+sessoes_upload = UploadSessions()
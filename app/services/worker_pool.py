@@ -0,0 +1,148 @@
+# Arquivo: app/services/worker_pool.py
+import multiprocessing
+import queue
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.core.config import SAST_MEMORIA_MB, SAST_PROCESSOS, SAST_TIMEOUT_TAREFA
+
+try:
+    import resource # Indisponível no Windows: o limite de memória é ignorado
+except ImportError:
+    resource = None
+
+
+def _limitar_memoria(memoria_mb: int) -> None:
+    """Initializer dos processos: aplica o teto de memória (espaço de endereçamento)."""
+    if memoria_mb and resource is not None:
+        limite = memoria_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+        except (ValueError, OSError) as e:
+            print(f"Aviso: Não foi possível limitar a memória do worker: {e}")
+
+
+_fila_inicios = None
+
+
+def _inicializar_worker(memoria_mb: int, fila_inicios) -> None:
+    """Initializer dos processos: teto de memória + fila onde cada tarefa avisa que começou."""
+    global _fila_inicios
+    _fila_inicios = fila_inicios
+    _limitar_memoria(memoria_mb)
+
+
+def _executar_tarefa(indice: int, funcao: Callable, args: tuple):
+    _fila_inicios.put(indice)
+    return funcao(*args)
+
+
+class WorkerPool:
+    @staticmethod
+    def mapear(
+        funcao: Callable,
+        tarefas: Sequence[tuple],
+        max_processos: int = SAST_PROCESSOS,
+        timeout: int = SAST_TIMEOUT_TAREFA,
+        memoria_mb: int = SAST_MEMORIA_MB,
+        ao_concluir: Optional[Callable[[int, int], None]] = None,
+        pesos: Optional[Sequence[int]] = None,
+    ) -> List[Dict]:
+        """
+        Executa `funcao(*args)` para cada tarefa em um pool de processos e devolve,
+        NA ORDEM DAS TAREFAS, um dicionário {"ok", "resultado", "erro"} por tarefa.
+        O tempo limite vale por tarefa, contado de quando um worker a começa; a tarefa
+        que o estoura ou passa do teto de memória vira erro sem derrubar as demais.
+        Se todos os workers ficarem presos em tarefas travadas, o pool é recriado para
+        as que faltam; ao final ele é encerrado (processos travados são mortos).
+        Uma tarefa com `ok=False` não tem resultado: quem chama deve tratá-la como
+        análise incompleta, e não como "nada encontrado".
+        Com `max_processos=0`, ou quando chamado de um processo daemon, tudo roda no
+        próprio processo.
+        `ao_concluir(feito, total)` é chamado a cada tarefa concluída, em qualquer ordem;
+        com `pesos` (ex: arquivos de cada lote) o progresso soma o peso de cada tarefa
+        concluída em vez de contá-las.
+        """
+        resultados: List[Dict] = []
+        if not tarefas:
+            return resultados
+        pesos = list(pesos) if pesos is not None else [1] * len(tarefas)
+        total = sum(pesos)
+
+        processos = min(max_processos, len(tarefas))
+        if multiprocessing.current_process().daemon:
+            # Processos daemon (ex: workers do pytest) não podem criar filhos
+            processos = 0
+        if processos <= 0:
+            # Pool desativado: executa no próprio processo
+            feito = 0
+            for i, args in enumerate(tarefas):
+                resultados.append(WorkerPool._executar_local(funcao, args))
+                feito += pesos[i]
+                if ao_concluir:
+                    ao_concluir(feito, total)
+            return resultados
+
+        # "spawn" evita herdar threads/locks do servidor (e é o único modo no Windows)
+        contexto = multiprocessing.get_context("spawn")
+        fila_inicios = contexto.Queue()
+        saidas: List[Optional[Dict]] = [None] * len(tarefas)
+        restantes = list(range(len(tarefas)))
+        feito = 0
+        while restantes:
+            pool = contexto.Pool(processos, initializer=_inicializar_worker, initargs=(memoria_mb, fila_inicios))
+            try:
+                pendentes = {i: pool.apply_async(_executar_tarefa, (i, funcao, tarefas[i])) for i in restantes}
+                # O prazo de cada tarefa conta a partir de quando um worker a pegou
+                inicios: Dict[int, float] = {}
+                travadas = 0
+                while pendentes and travadas < processos:
+                    WorkerPool._receber_inicios(fila_inicios, inicios)
+                    agora = time.monotonic()
+                    for i, pendente in list(pendentes.items()):
+                        if pendente.ready():
+                            saidas[i] = WorkerPool._coletar(pendente, memoria_mb)
+                        elif i in inicios and agora - inicios[i] >= timeout:
+                            # O worker segue ocupado com a tarefa travada até o pool ser encerrado
+                            saidas[i] = {"ok": False, "resultado": None, "erro": f"Tempo limite de {timeout}s excedido"}
+                            travadas += 1
+                        else:
+                            continue
+                        del pendentes[i]
+                        feito += pesos[i]
+                        if ao_concluir:
+                            ao_concluir(feito, total)
+                # Todos os workers presos em tarefas travadas: as que nem começaram vão para um pool novo
+                restantes = sorted(pendentes)
+            finally:
+                pool.terminate()
+                pool.join()
+        fila_inicios.close()
+        return saidas
+
+    @staticmethod
+    def _receber_inicios(fila_inicios, inicios: Dict[int, float], espera: float = 0.05) -> None:
+        """Registra o instante em que cada tarefa começou (aguarda até `espera` pelo primeiro aviso)."""
+        try:
+            indice = fila_inicios.get(timeout=espera)
+            while True:
+                inicios.setdefault(indice, time.monotonic())
+                indice = fila_inicios.get_nowait()
+        except queue.Empty:
+            pass
+
+    @staticmethod
+    def _coletar(pendente, memoria_mb: int) -> Dict:
+        try:
+            return {"ok": True, "resultado": pendente.get(0), "erro": None}
+        except MemoryError:
+            return {"ok": False, "resultado": None, "erro": f"Limite de memória de {memoria_mb} MB excedido"}
+        except Exception as e:
+            return {"ok": False, "resultado": None, "erro": str(e)}
+
+    @staticmethod
+    def _executar_local(funcao: Callable, args: tuple) -> Dict:
+        try:
+            return {"ok": True, "resultado": funcao(*args), "erro": None}
+        except Exception as e:
+            return {"ok": False, "resultado": None, "erro": str(e)}
@@ -0,0 +1,74 @@
+# Arquivo: benchmarks/bench_pdf_reporter.py
+"""
+Tempo de geração do relatório PDF em função da quantidade de falhas.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_pdf_reporter.py
+    python benchmarks/bench_pdf_reporter.py 1000 5000 10000
+
+O tempo por falha (ms) deve ficar estável conforme a lista cresce (crescimento linear).
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.pdf_reporter import PDFReporter  # noqa: E402
+
+QUANTIDADES_PADRAO = (500, 1000, 2500, 5000, 10000)
+MENSAGENS = (
+    "APK com android:debuggable='true' no Manifesto",
+    "Backup habilitado (android:allowBackup='true')",
+    "Activity exportada sem permissão: {classe}",
+    "Performance: {n} frames lentos durante a rolagem",
+    "AssertionError: elemento '{classe}' não encontrado após {n}s",
+)
+
+
+def gerar_falhas(quantidade: int, semente: int = 42) -> list:
+    sorteio = random.Random(semente)
+    falhas = []
+    for i in range(quantidade):
+        classe = f"com.exemplo.app.ui.Tela{i % 97}Activity"
+        falhas.append({
+            "teste": f"tests_repo/test_simulacao.py::test_{i:05d}",
+            "severidade": sorteio.choice(("S1", "S2", "S3")),
+            "mensagem": sorteio.choice(MENSAGENS).format(classe=classe, n=sorteio.randint(1, 60)),
+            "descricao": "Verificação de segurança e qualidade.",
+            "detalhes": "\n".join(f"  File \"{classe}.py\", line {linha}, in executar" for linha in range(40)),
+        })
+    return falhas
+
+
+def medir(quantidade: int, pasta: str) -> float:
+    falhas = gerar_falhas(quantidade)
+    resultados = {
+        "total_testes": quantidade * 2,
+        "aprovados": quantidade,
+        "defeitos_s1": sum(1 for f in falhas if f["severidade"] == "S1"),
+        "defeitos_s2": sum(1 for f in falhas if f["severidade"] == "S2"),
+        "lista_falhas": falhas,
+    }
+    motivos = [f"[CÓDIGO] {f['mensagem']}" for f in falhas[:20]]
+    destino = os.path.join(pasta, f"relatorio_{quantidade}.pdf")
+    inicio = time.perf_counter()
+    PDFReporter.gerar(resultados, False, motivos, "BENCH", destino=destino)
+    return time.perf_counter() - inicio
+
+
+def main(argumentos: list) -> None:
+    quantidades = [int(a) for a in argumentos] or list(QUANTIDADES_PADRAO)
+    with tempfile.TemporaryDirectory() as pasta:
+        medir(10, pasta)  # Aquecimento (imports e fontes do ReportLab)
+        print(f"{'falhas':>8} {'tempo (s)':>10} {'ms/falha':>9} {'tamanho (KB)':>13}")
+        for quantidade in quantidades:
+            segundos = medir(quantidade, pasta)
+            tamanho = os.path.getsize(os.path.join(pasta, f"relatorio_{quantidade}.pdf")) / 1024
+            print(f"{quantidade:>8} {segundos:>10.2f} {segundos / quantidade * 1000:>9.2f} {tamanho:>13.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,9 @@
+# Arquivo: tests/conftest.py
+# Testes unitários da plataforma (sem APK, dispositivo ou Appium). As suítes
+# executadas contra os APKs enviados ficam em tests_repo/ e tests_mobile/.
+import os
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
@@ -0,0 +1,65 @@
+# Arquivo: tests/test_apk_model.py
+import pytest
+
+from app.services import apk_model
+from app.services.apk_analyzer import ApkAnalyzer
+from app.services.apk_model import VERSAO_MODELO, ApkModel
+
+SHA256 = "ab" * 32
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(apk_model, "STORAGE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _modelo(dex_falhas=None) -> ApkModel:
+    return ApkModel({
+        "versao_modelo": VERSAO_MODELO, "sha256": SHA256, "valido": True, "package": "com.exemplo.app",
+        "app_name": "Exemplo", "version_code": "1", "manifesto_xml": None, "permissoes": [],
+        "dex": {"classes.dex": ["ok"]}, "achados_dex": {"classes.dex": []},
+        "dex_falhas": dex_falhas or {}, "versao_regras": None,
+    })
+
+
+def _construcoes(monkeypatch, modelo: ApkModel) -> list:
+    chamadas = []
+
+    def construir(caminho_apk, sha256=None, ao_processar_dex=None, processos=0):
+        chamadas.append(caminho_apk)
+        return modelo
+
+    monkeypatch.setattr(ApkModel, "construir", staticmethod(construir))
+    return chamadas
+
+
+def test_modelo_completo_em_cache_e_reaproveitado(monkeypatch):
+    _modelo().salvar()
+    chamadas = _construcoes(monkeypatch, _modelo())
+
+    modelo = ApkModel.carregar_ou_construir("app.apk", SHA256)
+
+    assert chamadas == [] and modelo.get_dex_falhas() == {}
+
+
+def test_modelo_com_dex_que_falhou_e_reconstruido(monkeypatch):
+    _modelo({"classes2.dex": "Tempo limite de 300s excedido"}).salvar()
+    chamadas = _construcoes(monkeypatch, _modelo())
+
+    modelo = ApkModel.carregar_ou_construir("app.apk", SHA256)
+
+    assert chamadas == ["app.apk"] and modelo.get_dex_falhas() == {}
+    # O modelo completo substitui o incompleto no cache
+    assert ApkModel.carregar(ApkModel.caminho_cache(SHA256)).get_dex_falhas() == {}
+
+
+def test_dex_nao_analisado_vira_achado_bloqueante():
+    modelo = _modelo({"classes2.dex": "Limite de memória de 2048 MB excedido"})
+
+    falhas = ApkAnalyzer.analisar_codigo("app.apk", modelo)["falhas_encontradas"]
+
+    incompletas = [f for f in falhas if f["tipo"] == "ANÁLISE INCOMPLETA"]
+    assert len(incompletas) == 1
+    assert incompletas[0]["severidade"] == "S1" and incompletas[0]["arquivo"] == "classes2.dex"
+    assert "Limite de memória" in incompletas[0]["mensagem"]
@@ -0,0 +1,92 @@
+# Arquivo: tests/test_device_pool.py
+import time
+
+import pytest
+
+from app.services.device_pool import DevicePool, NoDeviceAvailable
+
+
+class AdbFalso:
+    """`adb devices` / `adb -s <serial> shell echo ok` com aparelhos e falhas configuráveis."""
+
+    def __init__(self, seriais, com_falha=()):
+        self.seriais = list(seriais)
+        self.com_falha = set(com_falha)
+
+    def __call__(self, argumentos):
+        if argumentos[1:] == ["devices"]:
+            linhas = ["List of devices attached"] + [f"{serial}\tdevice" for serial in self.seriais]
+            return 0, "\n".join(linhas)
+        serial = argumentos[2]
+        if serial in self.com_falha:
+            return 1, "error: device offline"
+        return 0, "ok\n"
+
+
+def _pool(adb, max_falhas=2, quarentena_s=900):
+    return DevicePool(
+        executar_comando=adb, porta_aberta=lambda host, porta: True, iniciar_appium=None,
+        adb="adb", max_falhas=max_falhas, quarentena_s=quarentena_s,
+    )
+
+
+def _dispositivo(pool, serial):
+    return next(d for d in pool.listar() if d["serial"] == serial)
+
+
+def test_health_check_reprovado_nao_conta_execucao_e_coloca_em_quarentena():
+    pool = _pool(AdbFalso(["A"], com_falha={"A"}))
+
+    with pytest.raises(NoDeviceAvailable, match="quarentena"):
+        pool._reservar("job1", timeout=60)
+
+    dispositivo = _dispositivo(pool, "A")
+    assert dispositivo["estado"] == "quarentena"
+    assert dispositivo["execucoes"] == 0
+
+
+def test_unico_dispositivo_em_quarentena_falha_sem_esperar_o_timeout():
+    pool = _pool(AdbFalso(["A"]))
+    pool.descobrir()
+    for _ in range(2):
+        pool.devolver("A", sucesso=False)
+    assert _dispositivo(pool, "A")["estado"] == "quarentena"
+
+    inicio = time.monotonic()
+    with pytest.raises(NoDeviceAvailable, match="quarentena"):
+        with pool.arrendar("job1", timeout=600):
+            pass
+    assert time.monotonic() - inicio < 1
+
+
+def test_aparelho_reprovado_cede_a_vez_para_outro_saudavel():
+    adb = AdbFalso(["A", "B"], com_falha={"A"})
+    pool = _pool(adb, max_falhas=1)
+
+    with pool.arrendar("job1", timeout=5) as arrendamento:
+        assert arrendamento["serial"] == "B"
+
+    assert _dispositivo(pool, "A")["estado"] == "quarentena"
+    assert _dispositivo(pool, "B")["execucoes"] == 1
+
+
+def test_quarentena_vencida_devolve_o_aparelho_a_farm():
+    pool = _pool(AdbFalso(["A"]), max_falhas=1, quarentena_s=0)
+    pool.descobrir()
+    pool.devolver("A", sucesso=False)
+
+    with pool.arrendar("job1", timeout=5) as arrendamento:
+        assert arrendamento["serial"] == "A"
+    assert _dispositivo(pool, "A")["falhas"] == 0
+
+
+def test_execucao_com_falha_de_ambiente_conta_para_a_quarentena():
+    pool = _pool(AdbFalso(["A"]), max_falhas=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.arrendar("job1", timeout=5):
+            raise RuntimeError("Appium travado")
+
+    dispositivo = _dispositivo(pool, "A")
+    assert dispositivo["estado"] == "quarentena"
+    assert dispositivo["execucoes"] == 1
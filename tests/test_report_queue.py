@@ -0,0 +1,60 @@
+# Arquivo: tests/test_report_queue.py
+import os
+import threading
+import time
+
+from app.services.report_queue import ReportQueue
+
+ARGUMENTOS = ({}, True, [], "E2E", "relatorio.pdf", None)
+
+
+def _rapido(resultados, aprovado, motivos, fase, destino, screenshot):
+    return f"/storage/{destino}"
+
+
+def _travado(resultados, aprovado, motivos, fase, destino, screenshot):
+    time.sleep(60)
+    return f"/storage/{destino}"
+
+
+def _aguardar(fila: ReportQueue, argumentos: tuple = ARGUMENTOS):
+    concluido = threading.Event()
+    retorno = {}
+
+    def ao_concluir(url, erro):
+        retorno.update(url=url, erro=erro)
+        concluido.set()
+
+    fila.submeter(*argumentos, ao_concluir=ao_concluir)
+    assert concluido.wait(60)
+    return retorno
+
+
+def test_tempo_limite_encerra_o_worker_travado_e_recria_o_pool():
+    fila = ReportQueue(processos=1, timeout=2, gerar=_travado)
+    try:
+        pool = fila._pool_processos()
+        # Sobe o worker antes para o tempo limite não contar a inicialização do "spawn"
+        pool.submit(os.getpid).result(timeout=60)
+        processos = list(pool._processes.values())
+
+        retorno = _aguardar(fila)
+
+        assert retorno["url"] is None and "Tempo limite de 2s" in retorno["erro"]
+        for processo in processos:
+            processo.join(10)
+            assert not processo.is_alive()
+        assert fila._pool is None
+
+        fila._gerar_pdf = _rapido
+        assert _aguardar(fila) == {"url": "/storage/relatorio.pdf", "erro": None}
+    finally:
+        fila.encerrar()
+
+
+def test_sem_processos_gera_na_thread_da_fila():
+    fila = ReportQueue(processos=0, gerar=_rapido)
+    try:
+        assert _aguardar(fila) == {"url": "/storage/relatorio.pdf", "erro": None}
+    finally:
+        fila.encerrar()
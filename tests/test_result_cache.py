@@ -0,0 +1,34 @@
+# Arquivo: tests/test_result_cache.py
+import pytest
+
+from app.services.result_cache import ResultCache
+
+
+def _resultado(modo="REAL_DEVICE", completa=True, interrompidos=0):
+    return {
+        "modo_execucao": modo,
+        "analise_estatica": {"completa": completa, "falhas_identificadas": []},
+        "analise_dinamica": {"total_testes": 10, "interrompidos": interrompidos},
+    }
+
+
+@pytest.mark.parametrize("resultado, cacheavel", [
+    (_resultado(), True),
+    (_resultado(modo="APENAS_CODIGO_FONTE"), True),
+    # Nenhum aparelho disponível: a próxima tentativa pode rodar no dispositivo
+    (_resultado(modo="ANALISE_ESTATICA"), False),
+    (_resultado(completa=False), False),
+    (_resultado(interrompidos=1), False),
+])
+def test_so_resultados_reproduziveis_entram_no_cache(resultado, cacheavel):
+    assert ResultCache.cacheavel(resultado) is cacheavel
+
+
+def test_resultado_salvo_e_lido_pela_mesma_chave(tmp_path):
+    cache = ResultCache(pasta=str(tmp_path / "cache"))
+    chave = ResultCache.chave("a" * 64, None, "E2E")
+
+    cache.salvar(chave, _resultado())
+
+    assert cache.obter(chave) == _resultado()
+    assert cache.obter(ResultCache.chave("a" * 64, None, "UAT")) is None
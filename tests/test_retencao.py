@@ -0,0 +1,76 @@
+# Arquivo: tests/test_retencao.py
+import os
+import time
+
+import pytest
+
+from app.services import apk_model, upload_service
+from app.services.apk_model import ApkModel
+from app.services.job_queue import JobQueue
+from app.services.upload_service import UploadService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(apk_model, "STORAGE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _blob(conteudo: bytes, sha256: str) -> str:
+    temporario = UploadService.arquivo_temporario()
+    with open(temporario, "wb") as f:
+        f.write(conteudo)
+    return UploadService.armazenar_blob(temporario, sha256)
+
+
+def test_fila_notifica_jobs_descartados_do_historico():
+    fila = JobQueue(max_workers=1, historico_max=2)
+    descartados = []
+    fila.adicionar_ouvinte_descarte(descartados.append)
+
+    for i in range(3):
+        fila.registrar_concluido(f"job{i}", "app.apk", {})
+
+    assert [job["id"] for job in descartados] == ["job0"]
+    assert fila.obter("job0") is None
+
+
+def test_blob_so_e_liberado_sem_pasta_de_job_vinculada(storage):
+    sha256 = "a" * 64
+    caminho = _blob(b"PK\x03\x04apk", sha256)
+    pasta_job = storage / "jobs" / "job1"
+    pasta_job.mkdir(parents=True)
+    UploadService.vincular_blob(sha256, str(pasta_job / "app.apk"))
+
+    assert UploadService.liberar_blob(sha256) is False
+    os.remove(pasta_job / "app.apk")
+    assert UploadService.liberar_blob(sha256) is True
+    assert not os.path.exists(caminho)
+
+
+def test_limite_de_blobs_remove_os_mais_antigos_fora_de_uso(storage):
+    antigo = _blob(b"x" * 100, "1" * 64)
+    em_uso = _blob(b"y" * 100, "2" * 64)
+    os.utime(antigo, (time.time() - 60, time.time() - 60))
+    os.utime(em_uso, (time.time() - 120, time.time() - 120))
+    os.link(em_uso, str(storage / "vinculo"))
+    novo = _blob(b"z" * 100, "3" * 64)
+
+    UploadService.limitar_blobs(max_bytes=250, manter=novo)
+
+    assert not os.path.exists(antigo)
+    assert os.path.exists(em_uso) and os.path.exists(novo)
+
+
+def test_cache_de_modelos_remove_os_usados_ha_mais_tempo(storage):
+    caminhos = []
+    for i, sha256 in enumerate(("b" * 64, "c" * 64, "d" * 64)):
+        caminho = ApkModel({"sha256": sha256, "dados": "x" * 1000}).salvar()
+        os.utime(caminho, (time.time() - 100 + i, os.path.getmtime(caminho)))
+        caminhos.append(caminho)
+    tamanho = os.path.getsize(caminhos[0])
+
+    ApkModel.limitar_cache(max_bytes=tamanho * 2, manter=caminhos[2])
+
+    assert [os.path.exists(c) for c in caminhos] == [False, True, True]
@@ -0,0 +1,57 @@
+# Arquivo: tests/test_run_store.py
+import itertools
+
+import pytest
+
+from app.services.run_store import RunStore
+
+_ids = itertools.count()
+
+
+@pytest.fixture
+def historico(tmp_path):
+    return RunStore(str(tmp_path / "runs.db"))
+
+
+def _registrar(historico, package, status, sha256_apk="a" * 64, teste="test_login"):
+    historico.registrar({
+        "job_id": f"job{next(_ids)}",
+        "package": package,
+        "sha256_apk": sha256_apk,
+        "status_final": "APROVADO",
+        "analise_dinamica": {
+            "total_testes": 1,
+            "aprovados": int(status == "APROVADO"),
+            "lista_testes": [{"classname": "tests_mobile.test_android_apk", "name": teste, "status": status}],
+        },
+    })
+
+
+def test_mesmo_teste_em_apps_diferentes_nao_e_instavel(historico):
+    for _ in range(3):
+        _registrar(historico, "com.exemplo.estavel", "APROVADO")
+        _registrar(historico, "com.exemplo.quebrado", "REPROVADO")
+
+    assert historico.testes_instaveis() == []
+
+
+def test_alternancia_no_mesmo_app_e_instavel(historico):
+    for status in ("APROVADO", "REPROVADO", "APROVADO", "REPROVADO"):
+        _registrar(historico, "com.exemplo.app", status)
+        _registrar(historico, "com.exemplo.outro", "APROVADO")
+
+    instaveis = historico.testes_instaveis()
+
+    assert [(t["package"], t["nome"]) for t in instaveis] == [("com.exemplo.app", "test_login")]
+    assert instaveis[0]["taxa_alternancia"] == 1.0
+    assert instaveis[0]["taxa_falha"] == 0.5
+
+
+def test_por_apk_separa_regressao_de_um_binario_novo(historico):
+    for _ in range(3):
+        _registrar(historico, "com.exemplo.app", "APROVADO", sha256_apk="1" * 64)
+    for _ in range(3):
+        _registrar(historico, "com.exemplo.app", "REPROVADO", sha256_apk="2" * 64)
+
+    assert len(historico.testes_instaveis()) == 1
+    assert historico.testes_instaveis(por_apk=True) == []
@@ -0,0 +1,148 @@
+# Arquivo: tests/test_runtime_metrics.py
+import os
+
+import pytest
+
+from app.core import quality_gate
+from app.core.quality_gate import QualityGateEvaluator
+from app.services.runtime_metrics import MetricsSampler, RuntimeParsers
+
+PASTA_SAIDAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "runtime")
+
+
+def _saida(nome: str) -> str:
+    with open(os.path.join(PASTA_SAIDAS, nome), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class AdbGravado:
+    """`adb shell ...` respondendo com as saídas gravadas (comando -> (código, saída))."""
+
+    def __init__(self, respostas):
+        self.respostas = respostas
+        self.comandos = []
+
+    def __call__(self, argumentos, timeout=30):
+        comando = " ".join(argumentos[argumentos.index("shell") + 1:])
+        self.comandos.append(comando)
+        for prefixo, resposta in self.respostas.items():
+            if comando.startswith(prefixo):
+                return resposta(comando) if callable(resposta) else resposta
+        return 0, ""
+
+
+# --- RuntimeParsers ---
+
+def test_am_start_com_launch_state():
+    assert RuntimeParsers.am_start(_saida("am_start_w.txt")) == {"estado": "COLD", "total_ms": 1234, "espera_ms": 1250}
+
+
+def test_am_start_antigo_sem_launch_state():
+    assert RuntimeParsers.am_start(_saida("am_start_w_antigo.txt")) == {"estado": None, "total_ms": 845, "espera_ms": 871}
+
+
+def test_am_start_com_erro_nao_tem_medida():
+    assert RuntimeParsers.am_start(_saida("am_start_w_erro.txt")) is None
+
+
+@pytest.mark.parametrize("arquivo, pss_kb", [
+    ("meminfo_android10.txt", 105462), # "TOTAL PSS:" do App Summary
+    ("meminfo_android7.txt", 59505), # Primeira coluna da linha TOTAL da tabela
+])
+def test_meminfo_pss_nos_formatos_novo_e_antigo(arquivo, pss_kb):
+    assert RuntimeParsers.meminfo_pss_kb(_saida(arquivo)) == pss_kb
+
+
+def test_meminfo_sem_processo():
+    assert RuntimeParsers.meminfo_pss_kb("No process found for: com.exemplo.app\n") is None
+
+
+def test_proc_stat_soma_utime_e_stime_com_parenteses_no_nome():
+    assert RuntimeParsers.proc_stat_ticks(_saida("proc_stat.txt")) == 1523 + 311
+    assert RuntimeParsers.proc_stat_ticks("cat: /proc/12345/stat: No such file or directory") is None
+
+
+def test_gfxinfo_framestats_ignora_frames_marcados():
+    frames = RuntimeParsers.gfxinfo_frames(_saida("gfxinfo_framestats.txt"))
+
+    assert [round(d, 3) for d in frames["duracoes_ms"]] == [8.0, 12.5, 25.0]
+    assert frames["total"] == 4
+    assert frames["janky"] == 2
+
+
+# --- MetricsSampler ---
+
+def test_amostra_com_saidas_gravadas_e_avisos_no_resumo(capsys):
+    adb = AdbGravado({
+        "pidof": (0, "12345\n"),
+        "dumpsys meminfo": (0, _saida("meminfo_android10.txt")),
+        "cat /proc/12345/stat": (0, _saida("proc_stat.txt")),
+        "dumpsys gfxinfo com.exemplo.app framestats": (0, _saida("gfxinfo_framestats.txt")),
+        "am start -W": lambda comando: (0, _saida("am_start_w_erro.txt" if "Inexistente" in comando else "am_start_w.txt")),
+    })
+    amostrador = MetricsSampler("com.exemplo.app", serial="emulador-5554", adb="adb", executar_comando=adb)
+
+    amostrador.amostrar()
+    amostrador.medir_inicializacao(".MainActivity", repeticoes=1)
+    amostrador.medir_inicializacao(".Inexistente", repeticoes=1)
+    resumo = amostrador.resumo()
+
+    assert resumo["memoria_pss_mb"]["serie"][0][1] == round(105462 / 1024, 2)
+    assert resumo["frames"]["total"] == 4 and resumo["frames"]["percentual_janky"] == 50.0
+    assert [m["tipo"] for m in resumo["inicializacao"]["medidas"]] == ["frio", "quente"]
+    assert len(resumo["avisos"]) == 2
+    assert "sem TotalTime (frio)" in resumo["avisos"][0]
+    # Os avisos vão para o resumo do job, não para o console do servidor
+    assert "TotalTime" not in capsys.readouterr().out
+
+
+def test_avisos_repetidos_sao_limitados():
+    amostrador = MetricsSampler("com.exemplo.app", adb="adb", executar_comando=AdbGravado({}))
+    for i in range(25):
+        amostrador._avisar(f"falha {i}")
+
+    avisos = amostrador.resumo()["avisos"]
+
+    assert len(avisos) == 21
+    assert avisos[-1] == "... e mais 5 aviso(s)"
+
+
+# --- Quality Gate ---
+
+def _metricas(frio_p50=900, memoria_p95=180.0, cpu_p95=35.0, jank=4.0):
+    return {
+        "inicializacao": {"frio_ms": {"amostras": 3, "p50": frio_p50}},
+        "memoria_pss_mb": {"resumo": {"amostras": 10, "p95": memoria_p95}},
+        "cpu_percentual": {"resumo": {"amostras": 9, "p95": cpu_p95}},
+        "frames": {"total": 300, "janky": 12, "percentual_janky": jank},
+    }
+
+
+def test_quality_gate_aprova_metricas_dentro_dos_limites():
+    assert QualityGateEvaluator.avaliar_metricas_runtime(_metricas()) == (True, [])
+    assert QualityGateEvaluator.avaliar_metricas_runtime(None) == (True, [])
+
+
+def test_quality_gate_reprova_cada_limite_excedido(monkeypatch):
+    monkeypatch.setattr(quality_gate, "LIMITE_INICIALIZACAO_FRIO_MS", 2000)
+    monkeypatch.setattr(quality_gate, "LIMITE_MEMORIA_PSS_MB", 300)
+    monkeypatch.setattr(quality_gate, "LIMITE_CPU_PERCENTUAL", 80)
+    monkeypatch.setattr(quality_gate, "LIMITE_JANK_PERCENTUAL", 10)
+
+    aprovado, motivos = QualityGateEvaluator.avaliar_metricas_runtime(
+        _metricas(frio_p50=2500, memoria_p95=412.5, cpu_p95=93.0, jank=18.0)
+    )
+
+    assert not aprovado
+    assert motivos == [
+        "[RUNTIME] Inicialização a frio lenta: p50 2500 ms (Meta: < 2000 ms)",
+        "[RUNTIME] Consumo de memória alto: p95 412.5 MB (Máx: 300 MB)",
+        "[RUNTIME] Uso de CPU alto: p95 93.0% (Máx: 80%)",
+        "[RUNTIME] Frames lentos (Jank): 18.0% (Máx: 10%)",
+    ]
+
+
+def test_quality_gate_ignora_metricas_sem_amostras():
+    metricas = {"inicializacao": {"frio_ms": {"amostras": 0}}, "frames": {"total": 0, "percentual_janky": None}}
+
+    assert QualityGateEvaluator.avaliar_metricas_runtime(metricas) == (True, [])
@@ -0,0 +1,127 @@
+# Arquivo: tests/test_test_runner.py
+from app.core.quality_gate import QualityGateEvaluator
+from app.services import test_runner
+from app.services.pytest_pool import PytestTimeout
+from app.services.test_runner import TestRunner
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites>
+  <testsuite name="pytest" tests="3">
+    <testcase classname="tests_repo.test_seguranca" name="test_01_permissoes" time="0.012"/>
+    <testcase classname="tests_repo.test_seguranca" name="test_02_debuggable" time="0.5">
+      <failure message="android:debuggable=true">AssertionError: debuggable</failure>
+    </testcase>
+    <testcase classname="tests_repo.test_seguranca" name="test_03_backup" time="0">
+      <skipped message="sem manifest"/>
+    </testcase>
+  </testsuite>
+  <testsuite name="mobile" tests="1">
+    <testcase classname="tests_mobile.test_login" name="test_login" time="1.25"/>
+  </testsuite>
+</testsuites>
+"""
+
+
+def test_ler_junit_le_cada_testcase_e_esvazia_a_arvore(tmp_path, monkeypatch):
+    caminho = tmp_path / "junit.xml"
+    caminho.write_text(JUNIT, encoding="utf-8")
+    raizes = []
+    iterparse = test_runner.ET.iterparse
+
+    def iterparse_registrando(*args, **kwargs):
+        for evento, elem in iterparse(*args, **kwargs):
+            if not raizes:
+                raizes.append(elem)
+            yield evento, elem
+
+    monkeypatch.setattr(test_runner.ET, "iterparse", iterparse_registrando)
+
+    casos = list(TestRunner.ler_junit(str(caminho)))
+
+    assert [(c["nome"], c["status"]) for c in casos] == [
+        ("test_01_permissoes", "APROVADO"),
+        ("test_02_debuggable", "REPROVADO"),
+        ("test_03_backup", "PULADO"),
+        ("test_login", "APROVADO"),
+    ]
+    assert casos[1]["mensagem"] == "android:debuggable=true"
+    assert casos[1]["detalhes"] == "AssertionError: debuggable"
+    assert casos[3]["classname"] == "tests_mobile.test_login" and casos[3]["duracao"] == 1.25
+    # Nenhum testcase/testsuite fica pendurado na raiz depois da leitura
+    assert raizes[0].tag == "testsuites" and len(raizes[0]) == 0
+
+
+def _caso(nome, status="APROVADO", mensagem=""):
+    return {
+        "nome": nome, "classname": "tests_repo.test_simulacao", "status": status, "fase": "call",
+        "duracao": 0.1, "mensagem": mensagem, "detalhes": "", "descricao": "",
+        "severidade": "S1" if "[S1]" in mensagem else None,
+    }
+
+
+def test_tempo_limite_no_worker_reprova_a_execucao_incompleta(tmp_path, monkeypatch):
+    # test_1 e test_2 passam, test_3 trava: test_4 ([S1]) nunca chega a rodar
+    def executar(caminho_testes, argumentos, ambiente, ao_resultado, **kwargs):
+        ao_resultado(_caso("test_1"))
+        ao_resultado(_caso("test_2"))
+        raise PytestTimeout(f"Suíte {caminho_testes} excedeu o tempo limite de 8s")
+
+    monkeypatch.setattr(test_runner.pool_pytest, "processos", 1)
+    monkeypatch.setattr(test_runner.pool_pytest, "executar", executar)
+    publicados = []
+
+    resultados = TestRunner.executar_testes("tests_repo", str(tmp_path / "junit.xml"), ao_resultado=publicados.append)
+
+    assert resultados["total_testes"] == 3 and resultados["executados"] == 2
+    assert resultados["interrompidos"] == 1 and resultados["defeitos_s1"] == 1
+    assert resultados["lista_falhas"][0]["teste"] == "execucao_interrompida"
+    assert "tempo limite de 8s" in resultados["lista_falhas"][0]["mensagem"]
+    assert publicados[-1]["status"] == "REPROVADO"
+
+    aprovado, motivos = QualityGateEvaluator.avaliar_e2e_para_uat(
+        resultados["total_testes"], resultados["executados"], resultados["aprovados"],
+        resultados["defeitos_s1"], resultados["defeitos_s2"], resultados["falhas_por_area"],
+    )
+    assert not aprovado
+    assert any("Execução incompleta" in m for m in motivos) and any("S1" in m for m in motivos)
+
+
+def test_worker_encerrado_tambem_conta_como_execucao_interrompida(tmp_path, monkeypatch):
+    def executar(caminho_testes, argumentos, ambiente, ao_resultado, **kwargs):
+        raise RuntimeError("Worker do pytest encerrado durante a execução")
+
+    monkeypatch.setattr(test_runner.pool_pytest, "processos", 1)
+    monkeypatch.setattr(test_runner.pool_pytest, "executar", executar)
+
+    resultados = TestRunner.executar_testes("tests_mobile", str(tmp_path / "junit.xml"))
+
+    assert resultados["total_testes"] == 1 and resultados["executados"] == 0 and resultados["aprovados"] == 0
+
+
+def test_fatia_interrompida_deixa_a_execucao_mesclada_incompleta(tmp_path, monkeypatch):
+    def executar(caminho_testes, argumentos, ambiente, ao_resultado, fatia=None, **kwargs):
+        indice, _ = fatia
+        ao_resultado(_caso(f"test_{indice + 1}"))
+        if indice == 1:
+            raise PytestTimeout(f"Suíte {caminho_testes} excedeu o tempo limite de 8s")
+        return 0
+
+    monkeypatch.setattr(test_runner.pool_pytest, "processos", 2)
+    monkeypatch.setattr(test_runner.pool_pytest, "executar", executar)
+
+    resultados = TestRunner.executar_testes("tests_repo", str(tmp_path / "junit.xml"), fatias=3)
+
+    assert [t["name"] for t in resultados["lista_testes"]] == [
+        "test_1", "test_2", "test_3", "execucao_interrompida_fatia_2",
+    ]
+    assert resultados["total_testes"] == 4 and resultados["executados"] == 3
+    assert resultados["defeitos_s1"] == 1
+
+
+def test_teste_pulado_nao_conta_como_aprovado():
+    resultados = TestRunner.montar_resultados([
+        _caso("test_1"), _caso("test_2", "PULADO", "Métricas de runtime não coletadas"),
+    ])
+
+    assert resultados["total_testes"] == 2 and resultados["pulados"] == 1
+    assert resultados["aprovados"] == 1
@@ -0,0 +1,217 @@
+# Arquivo: tests/test_ui_wait.py
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests_mobile"))
+
+import ui_wait  # noqa: E402
+from ui_wait import Localizador, Snapshot, UiTimeout, UiWait, esperar  # noqa: E402
+
+PASTA_TELAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "page_source")
+
+
+def _tela(nome: str) -> str:
+    with open(os.path.join(PASTA_TELAS, f"{nome}.xml"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class RelogioFalso:
+    """Substitui o módulo `time` do ui_wait: o sleep só avança o relógio."""
+
+    def __init__(self):
+        self.agora = 0.0
+        self.pausas = []
+
+    def monotonic(self) -> float:
+        return self.agora
+
+    def sleep(self, segundos: float) -> None:
+        self.pausas.append(round(segundos, 4))
+        self.agora += segundos
+
+
+class ElementoFalso:
+    def __init__(self, atributos):
+        self.atributos = atributos
+        self.cliques = 0
+
+    @property
+    def text(self):
+        return self.atributos.get("text", "")
+
+    def is_enabled(self):
+        return self.atributos.get("enabled") == "true"
+
+    def is_displayed(self):
+        return self.atributos.get("displayed") == "true"
+
+    def click(self):
+        self.cliques += 1
+
+
+class DriverGravado:
+    """
+    Driver do Appium reproduzindo telas gravadas (page_source): cada consulta
+    avança para a próxima tela, até a última. `find_elements` resolve os
+    localizadores como o UiAutomator faria no aparelho.
+    """
+
+    def __init__(self, *telas: str):
+        self.telas = telas
+        self.consultas = 0
+
+    def _proxima(self) -> Snapshot:
+        snapshot = Snapshot(self.telas[min(self.consultas, len(self.telas) - 1)])
+        self.consultas += 1
+        return snapshot
+
+    @property
+    def page_source(self) -> str:
+        return self._proxima().xml
+
+    def find_elements(self, by, valor):
+        snapshot = self._proxima()
+        if by == "id":
+            filtro = lambda e: e.get("resource-id") == valor
+        elif by == "accessibility id":
+            filtro = lambda e: e.get("content-desc") == valor
+        else:
+            metodo, argumento = re.fullmatch(r'new UiSelector\(\)\.(\w+)\("(.*)"\)', valor).groups()
+            argumento = argumento.replace('\\"', '"').replace("\\\\", "\\")
+            filtro = {
+                "text": lambda e: e.get("text") == argumento,
+                "textMatches": lambda e: re.fullmatch(argumento, e.get("text", "")) is not None,
+                "textContains": lambda e: argumento in e.get("text", ""),
+                "className": lambda e: e.get("class") == argumento,
+            }[metodo]
+        return [ElementoFalso(e) for e in snapshot.elementos if filtro(e)]
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = RelogioFalso()
+    monkeypatch.setattr(ui_wait, "time", relogio)
+    return relogio
+
+
+# --- Snapshot / Localizador ---
+
+def test_localizadores_reconhecem_os_elementos_da_tela_gravada():
+    snapshot = Snapshot(_tela("termos_de_uso"))
+
+    assert snapshot.encontrar(Localizador.por_id("com.exemplo.app:id/aceite"))["class"] == "android.widget.CheckBox"
+    assert snapshot.encontrar(Localizador.por_acessibilidade("Continuar para o login"))["text"] == "Continuar"
+    assert snapshot.existe(Localizador.por_texto("Continuar", "Acessar"))
+    assert snapshot.existe(Localizador.por_texto_contendo("política de privacidade"))
+    assert not snapshot.existe(Localizador.por_texto("Entrar"))
+    assert len(snapshot.encontrar_todos(Localizador.por_classe("android.widget.TextView"))) == 2
+    assert snapshot.textos()[0] == "Termos de Uso"
+
+
+def test_texto_alternativo_e_trecho_sao_literais_e_nao_regex():
+    snapshot = Snapshot(_tela("inicio"))
+
+    assert snapshot.existe(Localizador.por_texto_contendo("usuario.teste"))
+    assert not snapshot.existe(Localizador.por_texto_contendo("usuarioXteste"))
+    assert not snapshot.existe(Localizador.por_texto("Recarg.", "Extrat."))
+    assert len(snapshot.encontrar_todos(Localizador.por_texto("Recarga", "Extrato"))) == 2
+    # Texto exato: um trecho do texto não basta
+    assert not snapshot.existe(Localizador.por_texto("Olá"))
+
+
+@pytest.mark.parametrize("localizador", [
+    Localizador.por_id("com.exemplo.app:id/botao_continuar"),
+    Localizador.por_acessibilidade("Continuar para o login"),
+    Localizador.por_texto("Continuar", "Acessar"),
+    Localizador.por_texto_contendo("termos"),
+    Localizador.por_classe("android.widget.CheckBox"),
+    Localizador.por_texto('Aspas "e" barra \\'),
+])
+def test_seletor_do_aparelho_e_snapshot_encontram_os_mesmos_elementos(localizador):
+    xml = _tela("termos_de_uso")
+    no_aparelho = DriverGravado(xml).find_elements(localizador.by, localizador.valor)
+
+    assert [e.atributos for e in no_aparelho] == Snapshot(xml).encontrar_todos(localizador)
+
+
+# --- Espera adaptativa ---
+
+def test_esperar_devolve_o_primeiro_resultado_verdadeiro(relogio):
+    respostas = iter([None, [], "pronto"])
+
+    assert esperar(lambda: next(respostas), timeout=5) == "pronto"
+    assert relogio.pausas == [0.1, 0.15]
+
+
+def test_esperar_espaca_as_consultas_e_estoura_no_tempo_limite(relogio):
+    def condicao():
+        raise RuntimeError("elemento obsoleto")
+
+    with pytest.raises(UiTimeout, match=r"Tempo esgotado \(8s\) aguardando botão.*elemento obsoleto"):
+        esperar(condicao, timeout=8, descricao="botão")
+
+    assert relogio.pausas[:4] == [0.1, 0.15, 0.225, 0.3375]
+    assert max(relogio.pausas) == 1.0
+    assert relogio.agora == pytest.approx(8)
+
+
+def test_qualquer_aguarda_a_troca_de_tela_com_um_page_source_por_consulta(relogio):
+    driver = DriverGravado(_tela("termos_de_uso"), _tela("termos_de_uso"), _tela("inicio"))
+    ui = UiWait(driver, timeout_padrao=10)
+
+    localizador, atributos = ui.qualquer([Localizador.por_texto("Entrar"), Localizador.por_texto("Recarga")])
+
+    assert localizador.descricao == "texto=Recarga"
+    assert atributos["resource-id"] == "com.exemplo.app:id/botao_recarga"
+    assert driver.consultas == 3
+
+
+def test_botao_desabilitado_nao_fica_clicavel_ate_o_tempo_limite(relogio):
+    ui = UiWait(DriverGravado(_tela("termos_de_uso")), timeout_padrao=2)
+
+    with pytest.raises(UiTimeout, match="clicável"):
+        ui.clicar(Localizador.por_texto("Continuar"))
+    assert ui.elemento(Localizador.por_id("com.exemplo.app:id/aceite")).is_enabled()
+
+
+def test_clicar_quando_a_tela_habilita_o_botao(relogio):
+    habilitado = _tela("termos_de_uso").replace(
+        'clickable="true" enabled="false"', 'clickable="true" enabled="true"'
+    )
+    ui = UiWait(DriverGravado(_tela("termos_de_uso"), habilitado))
+
+    elemento = ui.clicar(Localizador.por_id("com.exemplo.app:id/botao_continuar"))
+
+    assert elemento.cliques == 1
+
+
+def test_ausente_espera_o_elemento_sumir(relogio):
+    driver = DriverGravado(_tela("termos_de_uso"), _tela("inicio"))
+
+    assert UiWait(driver).ausente(Localizador.por_texto("Termos de Uso"), timeout=5) is True
+    with pytest.raises(UiTimeout):
+        UiWait(DriverGravado(_tela("inicio"))).ausente(Localizador.por_texto("Recarga"), timeout=1)
+
+
+def test_snapshot_quando_comeca_com_intervalo_maior(relogio):
+    driver = DriverGravado(_tela("termos_de_uso"), _tela("termos_de_uso"), _tela("inicio"))
+
+    snapshot = UiWait(driver).snapshot_quando(lambda tela: tela.existe(Localizador.por_texto("Recarga")))
+
+    assert snapshot.existe(Localizador.por_texto("Extrato"))
+    assert relogio.pausas == [0.5, 0.75]
+
+
+def test_textos_por_busca_direcionada_sem_page_source():
+    class SemPageSource(DriverGravado):
+        @property
+        def page_source(self):
+            raise AssertionError("dump completo da hierarquia")
+
+    textos = Localizador.por_classe("android.widget.TextView")
+    ui = UiWait(SemPageSource(_tela("termos_de_uso")))
+
+    assert ui.textos(textos) == [e["text"] for e in Snapshot(_tela("termos_de_uso")).encontrar_todos(textos)]
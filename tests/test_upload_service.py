@@ -0,0 +1,96 @@
+# Arquivo: tests/test_upload_service.py
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.services import upload_service
+from app.services.upload_service import UploadRejected, UploadService
+
+APK = b"PK\x03\x04" + os.urandom(3 * 1024 * 1024)
+FRONTEIRA = "----surf-fronteira"
+CONTENT_TYPE = f"multipart/form-data; boundary={FRONTEIRA}"
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "STORAGE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _multipart(campos=(), arquivos=()) -> bytes:
+    corpo = b""
+    for nome, valor in campos:
+        corpo += f'--{FRONTEIRA}\r\nContent-Disposition: form-data; name="{nome}"\r\n\r\n{valor}\r\n'.encode()
+    for nome, arquivo, dados in arquivos:
+        corpo += (
+            f'--{FRONTEIRA}\r\nContent-Disposition: form-data; name="{nome}"; filename="{arquivo}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode() + dados + b"\r\n"
+    return corpo + f"--{FRONTEIRA}--\r\n".encode()
+
+
+async def _fluxo(dados: bytes, pedaco: int = 64 * 1024):
+    for i in range(0, len(dados), pedaco):
+        await asyncio.sleep(0)
+        yield dados[i:i + pedaco]
+
+
+def _receber(corpo: bytes, campos_arquivo=("arquivo", "codigo"), **kwargs):
+    return asyncio.run(UploadService.receber_formulario(CONTENT_TYPE, _fluxo(corpo), campos_arquivo, **kwargs))
+
+
+def _temporarios(storage):
+    pasta = storage / "uploads"
+    return sorted(os.listdir(pasta)) if pasta.exists() else []
+
+
+def test_multipart_grava_o_arquivo_em_fluxo_com_hash_e_campos(storage):
+    corpo = _multipart([("fase", "E2E"), ("projeto", "")], [("arquivo", "app.apk", APK)])
+
+    campos, arquivos = _receber(corpo)
+
+    assert campos == {"fase": "E2E", "projeto": ""}
+    recebido = arquivos["arquivo"]
+    assert recebido["nome"] == "app.apk" and recebido["tamanho"] == len(APK)
+    assert recebido["sha256"] == hashlib.sha256(APK).hexdigest()
+    # Um único arquivo no disco: o temporário que o chamador move para a pasta do job
+    assert _temporarios(storage) == [os.path.basename(recebido["caminho"])]
+    with open(recebido["caminho"], "rb") as f:
+        assert f.read() == APK
+
+
+def test_campo_de_arquivo_vazio_e_ignorado(storage):
+    campos, arquivos = _receber(_multipart([("fase", "UAT")], [("arquivo", "", b"")]))
+
+    assert campos == {"fase": "UAT"} and arquivos == {}
+    assert _temporarios(storage) == []
+
+
+@pytest.mark.parametrize("corpo, status", [
+    (_multipart(arquivos=[("arquivo", "app.apk", b"nao e um zip" * 10)]), 415),
+    (_multipart(arquivos=[("arquivo", "app.apk", APK)]), 413),
+    (_multipart(arquivos=[("outro", "app.apk", APK[:1024])]), 400),
+])
+def test_upload_recusado_nao_deixa_temporario(storage, corpo, status):
+    with pytest.raises(UploadRejected) as erro:
+        _receber(corpo, max_bytes=1024 * 1024)
+
+    assert erro.value.status_code == status
+    assert _temporarios(storage) == []
+
+
+def test_corpo_que_nao_e_multipart_e_recusado():
+    with pytest.raises(UploadRejected) as erro:
+        asyncio.run(UploadService.receber_formulario("application/json", _fluxo(b"{}"), ("arquivo",)))
+
+    assert erro.value.status_code == 400
+
+
+def test_formulario_urlencoded_so_com_campos():
+    campos, arquivos = asyncio.run(UploadService.receber_formulario(
+        "application/x-www-form-urlencoded", _fluxo(b"apk_upload_id=abc123&fase=UAT&projeto="), ("arquivo",)
+    ))
+
+    assert campos == {"apk_upload_id": "abc123", "fase": "UAT", "projeto": ""} and arquivos == {}
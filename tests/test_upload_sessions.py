@@ -0,0 +1,90 @@
+# Arquivo: tests/test_upload_sessions.py
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from app.services import upload_service
+from app.services.upload_service import UploadRejected
+from app.services.upload_sessions import UploadSessions
+
+CONTEUDO = b"PK\x03\x04" + os.urandom(300 * 1024)
+
+
+@pytest.fixture
+def sessoes(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "STORAGE_DIR", str(tmp_path))
+    return UploadSessions(pasta=str(tmp_path / "uploads"), max_bytes=10 * 1024 * 1024, ttl=3600)
+
+
+async def _fluxo(dados: bytes, pedaco: int = 64 * 1024):
+    for i in range(0, len(dados), pedaco):
+        await asyncio.sleep(0)
+        yield dados[i:i + pedaco]
+
+
+def _anexar(sessoes, upload_id, offset, dados):
+    return asyncio.run(sessoes.anexar(upload_id, offset, _fluxo(dados)))
+
+
+def test_upload_em_partes_retoma_do_offset_e_gera_o_blob(sessoes):
+    sessao = sessoes.criar("app.apk", len(CONTEUDO))
+    meio = len(CONTEUDO) // 2
+
+    parcial = _anexar(sessoes, sessao["id"], 0, CONTEUDO[:meio])
+    assert parcial["offset"] == meio and not parcial["concluido"]
+    with pytest.raises(UploadRejected, match="Offset divergente"):
+        _anexar(sessoes, sessao["id"], 0, CONTEUDO[:10])
+
+    final = _anexar(sessoes, sessao["id"], meio, CONTEUDO[meio:])
+
+    assert final["concluido"]
+    assert final["sha256"] == hashlib.sha256(CONTEUDO).hexdigest()
+    with open(upload_service.UploadService.caminho_blob(final["sha256"]), "rb") as f:
+        assert f.read() == CONTEUDO
+
+
+def test_cada_envio_renova_a_validade_da_sessao(sessoes):
+    ativa = sessoes.criar("app.apk", len(CONTEUDO))
+    parada = sessoes.criar("outro.apk", len(CONTEUDO))
+    antigo = time.time() - 2 * sessoes.ttl
+    for sessao in (ativa, parada):
+        os.utime(sessoes._caminho_sessao(sessao["id"]), (antigo, antigo))
+
+    _anexar(sessoes, ativa["id"], 0, CONTEUDO[:1024])
+    sessoes._remover_expiradas()
+
+    assert sessoes.obter(ativa["id"])["offset"] == 1024
+    with pytest.raises(UploadRejected):
+        sessoes.obter(parada["id"])
+
+
+def test_escrita_e_hash_rodam_fora_do_event_loop(sessoes, monkeypatch):
+    threads = set()
+    gravar = UploadSessions._gravar
+
+    def gravar_registrando(recebimento, parcial, dados):
+        threads.add(threading.get_ident())
+        gravar(recebimento, parcial, dados)
+
+    monkeypatch.setattr(UploadSessions, "_gravar", staticmethod(gravar_registrando))
+    sessao = sessoes.criar("app.apk", len(CONTEUDO))
+
+    async def enviar():
+        return threading.get_ident(), await sessoes.anexar(sessao["id"], 0, _fluxo(CONTEUDO))
+
+    thread_do_loop, final = asyncio.run(enviar())
+
+    assert final["concluido"]
+    assert threads and thread_do_loop not in threads
+
+
+def test_bloco_alem_do_tamanho_declarado_e_recusado(sessoes):
+    sessao = sessoes.criar("app.apk", 1024)
+
+    with pytest.raises(UploadRejected, match="tamanho total"):
+        _anexar(sessoes, sessao["id"], 0, CONTEUDO[:2048])
+    assert sessoes.obter(sessao["id"])["offset"] == 0
@@ -0,0 +1,72 @@
+# Arquivo: tests/test_worker_pool.py
+import multiprocessing
+import os
+import time
+
+from app.services.worker_pool import WorkerPool
+
+
+def _pid(_):
+    return os.getpid()
+
+
+def _mapear_no_daemon(fila):
+    try:
+        saidas = WorkerPool.mapear(_pid, [(i,) for i in range(3)], max_processos=2)
+        fila.put(("ok", os.getpid(), [s["resultado"] for s in saidas]))
+    except BaseException as e:
+        fila.put(("erro", os.getpid(), repr(e)))
+
+
+def test_processo_daemon_executa_as_tarefas_no_proprio_processo():
+    # Como nos workers do pytest: um processo daemon não pode abrir um pool de processos
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_mapear_no_daemon, args=(fila,), daemon=True)
+    processo.start()
+    status, pid, resultado = fila.get(timeout=60)
+    processo.join(10)
+
+    assert status == "ok", resultado
+    assert resultado == [pid, pid, pid]
+
+
+def _dormir(segundos):
+    time.sleep(segundos)
+    return segundos
+
+
+def test_tempo_limite_conta_a_partir_do_inicio_de_cada_tarefa():
+    # Um worker fica preso na tarefa 0; o outro roda as demais em sequência,
+    # a última terminando bem depois de "timeout * rodadas" do início do mapa
+    tarefas = [(60,)] + [(1.0,)] * 5
+
+    saidas = WorkerPool.mapear(_dormir, tarefas, max_processos=2, timeout=1.5)
+
+    assert saidas[0] == {"ok": False, "resultado": None, "erro": "Tempo limite de 1.5s excedido"}
+    assert [s["resultado"] for s in saidas[1:]] == [1.0] * 5
+
+
+def test_pool_preso_em_tarefa_travada_e_recriado_para_as_restantes():
+    progresso = []
+
+    saidas = WorkerPool.mapear(
+        _dormir, [(60,), (0.1,)], max_processos=1, timeout=1,
+        ao_concluir=lambda feitas, total: progresso.append((feitas, total)),
+    )
+
+    assert not saidas[0]["ok"] and "Tempo limite" in saidas[0]["erro"]
+    assert saidas[1] == {"ok": True, "resultado": 0.1, "erro": None}
+    assert progresso == [(1, 2), (2, 2)]
+
+
+def test_progresso_com_pesos_soma_a_tarefa_que_terminou():
+    # A tarefa 0 (peso 3) termina depois da tarefa 1 (peso 1)
+    progresso = []
+
+    WorkerPool.mapear(
+        _dormir, [(1.0,), (0.1,)], max_processos=2, pesos=[3, 1],
+        ao_concluir=lambda feito, total: progresso.append((feito, total)),
+    )
+
+    assert progresso == [(1, 4), (4, 4)]
@@ -1,23 +1,23 @@
 # Arquivo: tests_mobile/test_android_apk.py
 import pytest
 import os
-import time
 import subprocess
+import sys
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
-from appium.webdriver.common.appiumby import AppiumBy
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-# Tenta importar androguard para limpeza prévia (evita erro INSTALL_FAILED_UPDATE_INCOMPATIBLE)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ui_wait import Localizador, Snapshot, UiTimeout, UiWait, esperar
+
+# Modelo do APK (já construído pela plataforma) para limpeza prévia (evita erro INSTALL_FAILED_UPDATE_INCOMPATIBLE)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
-    from androguard.core.apk import APK
+    from app.services.apk_model import ApkModel
+    from app.services.device_installer import DeviceInstaller, InstallError
+    from app.services.session_broker import sessoes_appium
 except ImportError:
-    try:
-        from androguard.core.bytecodes.apk import APK
-    except ImportError:
-        APK = None
+    ApkModel = None
+    sessoes_appium = None
 
 # Usamos scope="session" para garantir uma única sessão para todos os testes (Enterprise)
 @pytest.fixture(scope="session")
@@ -28,13 +28,22 @@ def driver():
     if not apk_path:
         pytest.fail("ERRO: Caminho do APK não encontrado. Faça o upload pela plataforma primeiro.")
 
+    # Dispositivo e Appium arrendados pela farm da plataforma (sem eles: um único celular no localhost)
+    serial = os.getenv("TARGET_DEVICE_SERIAL")
+    appium_url = os.getenv("APPIUM_SERVER_URL", "http://localhost:4723")
+
     # 2. Configurações para Celular Físico
     options = UiAutomator2Options()
     options.platform_name = "Android"
     options.automation_name = "UiAutomator2"
     
     # "Android Device" é genérico, serve para qualquer celular plugado no USB
-    options.device_name = "Android Device" 
+    options.device_name = serial or "Android Device" 
+    if serial:
+        options.udid = serial
+    if os.getenv("APPIUM_SYSTEM_PORT"):
+        # Porta do servidor UiAutomator2 exclusiva do aparelho (vários celulares no mesmo host)
+        options.set_capability("appium:systemPort", int(os.getenv("APPIUM_SYSTEM_PORT")))
     
     # O APK que você fez upload será instalado no seu celular automaticamente
     options.app = apk_path
@@ -62,35 +71,54 @@ def driver():
         potential_adb = os.path.join(android_home, "platform-tools", "adb.exe")
         if os.path.exists(potential_adb):
             adb_cmd = f'"{potential_adb}"'
+    if serial:
+        adb_cmd = f'{adb_cmd} -s {serial}'
 
-    print(f"--- Tentando conectar ao Appium (http://localhost:4723) para testar: {apk_path} ---")
+    print(f"--- Tentando conectar ao Appium ({appium_url}) para testar: {apk_path} ---")
     
     # --- DIAGNÓSTICO PRÉVIO (FORÇA BRUTA) ---
     # Isso garante que sabemos POR QUE a instalação falha antes mesmo do Appium tentar
     print("🔍 Diagnóstico: Verificando conexão ADB e tentando instalação manual...")
+    apk_obj = None
     try:
         # 1. Verifica se tem device
-        chk = subprocess.run(f"{adb_cmd} devices", shell=True, capture_output=True, text=True)
-        if "device" not in chk.stdout.replace("List of devices attached", "").strip():
-             pytest.fail("❌ ERRO FATAL: Nenhum celular detectado pelo ADB. Verifique o cabo USB e a Depuração USB.")
+        if serial:
+            chk = subprocess.run(f"{adb_cmd} get-state", shell=True, capture_output=True, text=True)
+            if chk.stdout.strip() != "device":
+                pytest.fail(f"❌ ERRO FATAL: Celular {serial} não está disponível no ADB ({chk.stderr.strip() or chk.stdout.strip()}).")
+        else:
+            chk = subprocess.run(f"{adb_cmd} devices", shell=True, capture_output=True, text=True)
+            if "device" not in chk.stdout.replace("List of devices attached", "").strip():
+                 pytest.fail("❌ ERRO FATAL: Nenhum celular detectado pelo ADB. Verifique o cabo USB e a Depuração USB.")
 
-        # 1.5 Tenta desinstalar versão anterior para evitar conflito de assinatura
-        if APK:
+        # 1.5 Modelo do APK (package, versionCode e assinatura) para decidir a instalação
+        if ApkModel:
             try:
-                apk_obj = APK(apk_path)
-                pkg_name = apk_obj.get_package()
-                print(f"🗑️ Tentando desinstalar versão antiga de: {pkg_name}")
-                subprocess.run(f"{adb_cmd} uninstall {pkg_name}", shell=True, capture_output=True)
+                caminho_modelo = os.getenv("TARGET_APK_MODEL")
+                if caminho_modelo and os.path.exists(caminho_modelo):
+                    apk_obj = ApkModel.carregar(caminho_modelo)
+                else:
+                    # No próprio processo: os workers do pytest são daemon e não abrem pool de processos
+                    apk_obj = ApkModel.carregar_ou_construir(apk_path, processos=0)
             except Exception as e:
-                print(f"⚠️ Aviso: Falha ao tentar desinstalar versão anterior (pode ser ignorado): {e}")
+                pytest.fail(f"❌ ERRO FATAL: Falha ao carregar o modelo do APK: {e}")
         else:
             print("⚠️ Aviso: Biblioteca 'androguard' não detectada. A desinstalação automática da versão antiga foi pulada.")
 
-        # 2. Tenta instalar via comando direto (mostra o erro real do Android)
-        # flags: -r (reinstall), -g (grant permissions), -t (allow test packages), -d (allow downgrade)
-        print(f"📦 Tentando instalar APK via ADB: {apk_path}")
-        subprocess.run(f'{adb_cmd} install -r -g -t -d "{apk_path}"', shell=True, check=True, capture_output=True, text=True)
-        print("✅ APK instalado com sucesso via ADB! Iniciando automação...")
+        # 2. Instala via ADB (mostra o erro real do Android). Se o aparelho já tem exatamente
+        # este build, a instalação é pulada; se só o conteúdo mudou, usa fastdeploy.
+        if apk_obj is not None:
+            try:
+                acao = DeviceInstaller(serial).instalar(apk_path, apk_obj)
+            except InstallError as e:
+                raise subprocess.CalledProcessError(1, "adb install", output=e.saida)
+            if acao != "ignorado":
+                print("✅ APK instalado com sucesso via ADB! Iniciando automação...")
+        else:
+            # flags: -r (reinstall), -g (grant permissions), -t (allow test packages), -d (allow downgrade)
+            print(f"📦 Tentando instalar APK via ADB: {apk_path}")
+            subprocess.run(f'{adb_cmd} install -r -g -t -d "{apk_path}"', shell=True, check=True, capture_output=True, text=True)
+            print("✅ APK instalado com sucesso via ADB! Iniciando automação...")
     except subprocess.CalledProcessError as e:
         erro_msg = e.stderr if e.stderr else e.stdout
         print(f"❌ O ANDROID RECUSOU O APK. Motivo:\n{erro_msg}")
@@ -106,10 +134,22 @@ def driver():
         pytest.fail(f"Falha na instalação do APK: {erro_msg}{dica}")
     # -----------------------------------------
     
+    # Rodando no worker da plataforma, a sessão do Appium fica aberta para o próximo job
+    # deste dispositivo (só o estado do app é reiniciado)
+    reusar_sessao = sessoes_appium is not None and os.getenv("APPIUM_REUSAR_SESSAO") == "1"
+    chave_sessao = (appium_url, serial or "Android Device")
+
     driver = None
     try:
         # Conecta no Appium Server (que deve estar rodando no seu PC)
-        driver = webdriver.Remote("http://localhost:4723", options=options)
+        if reusar_sessao:
+            driver = sessoes_appium.obter(
+                chave_sessao,
+                lambda: webdriver.Remote(appium_url, options=options),
+                apk_obj.get_package() if apk_obj is not None else None
+            )
+        else:
+            driver = webdriver.Remote(appium_url, options=options)
         print("--- Conexão com Appium estabelecida com sucesso! ---")
         
         # Log informativo do dispositivo conectado
@@ -135,26 +175,51 @@ def driver():
 
     yield driver # Entrega o controle do celular para o teste
     
-    # Ao final, encerra a sessão
+    # Ao final, encerra a sessão (ou a devolve ao broker, que a mantém se ainda responde)
     if driver:
-        driver.quit()
+        if reusar_sessao:
+            sessoes_appium.devolver(chave_sessao)
+        else:
+            driver.quit()
 
 # --- OS TESTES (O que o celular vai fazer sozinho) ---
+# Localizadores via UiSelector (resolvidos no aparelho, sem dump de hierarquia por consulta)
+# e esperas adaptativas no lugar de sleeps fixos: cada etapa segue assim que a tela responde.
+BOTAO_ACESSAR = Localizador.por_texto_contendo("Acessar")
+BOTAO_CONTINUAR = Localizador.por_texto("Continuar", "Acessar")
+BOTAO_ENTRAR = Localizador.por_texto("Entrar")
+BOTAO_SIM = Localizador.por_texto("Sim", "SIM")
+BOTAO_CONFIRMAR_REDE = Localizador.por_texto("Confirmar", "Avançar", "Continuar")
+BOTAO_RECARGA = Localizador.por_texto("Recarga")
+ITEM_PERFIL = Localizador.por_texto("Perfil")
+TELA_VALOR_RECARGA = Localizador.por_texto_contendo("valor")
+CHECKBOX = Localizador.por_classe("android.widget.CheckBox")
+RADIO = Localizador.por_classe("android.widget.RadioButton")
+CAMPO_TEXTO = Localizador.por_classe("android.widget.EditText")
+BOTAO_MENU = Localizador.por_classe("android.widget.ImageButton")
+TEXTOS = Localizador.por_classe("android.widget.TextView")
+
+USUARIO = "99999909914"
+SENHA = "1234"
+
 
-def test_01_abertura_app(driver):
+@pytest.fixture(scope="session")
+def ui(driver):
+    return UiWait(driver)
+
+
+def test_01_abertura_app(driver, ui):
     """ETAPA 1: Valida a abertura do app e a exibição da primeira tela."""
     print("DESC: ETAPA 1 - Validar abertura do aplicativo.")
     # Aguarda até 20s pela tela inicial, procurando um texto de boas-vindas
     try:
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((AppiumBy.XPATH, "//*[contains(@text, 'Acessar')]"))
-        )
+        ui.elemento(BOTAO_ACESSAR, timeout=20)
         print("✅ App aberto, primeira tela (carrossel) exibida.")
         assert driver.current_context == "NATIVE_APP"
     except Exception as e:
         pytest.fail(f"O aplicativo não abriu ou a tela inicial não carregou em 20 segundos. Erro: {e}")
 
-def test_02_carrossel(driver):
+def test_02_carrossel(driver, ui):
     """ETAPA 2: Navega pelo carrossel de introdução e clica para continuar."""
     print("DESC: ETAPA 2 - Passar o carrossel.")
     size = driver.get_window_size()
@@ -164,45 +229,39 @@ def test_02_carrossel(driver):
 
     for i in range(3): # Tenta passar por 3 telas do carrossel
         print(f"Realizando swipe horizontal ({i+1}/3)...")
+        antes = ui.textos(TEXTOS)
         driver.swipe(start_x, y, end_x, y, 400)
-        time.sleep(1)
+        try:
+            # Segue assim que a página do carrossel trocar (no lugar de 1s fixo); a busca
+            # direcionada pelos textos evita o dump completo da hierarquia a cada consulta
+            esperar(lambda: ui.textos(TEXTOS) != antes, timeout=2, descricao="troca de página do carrossel")
+        except UiTimeout:
+            break # Última página: o swipe não muda mais a tela
 
     try:
-        continuar_btn = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((AppiumBy.XPATH, "//*[@text='Continuar' or @text='Acessar']"))
-        )
-        continuar_btn.click()
+        ui.clicar(BOTAO_CONTINUAR, timeout=10)
         print("✅ Carrossel finalizado, botão 'Continuar' clicado.")
     except Exception as e:
         pytest.fail(f"Não foi possível encontrar ou clicar no botão 'Continuar' após o carrossel. Erro: {e}")
 
-def test_03_termos(driver):
+def test_03_termos(driver, ui):
     """ETAPA 3: Aceita os termos de uso para prosseguir."""
     print("DESC: ETAPA 3 - Aceitar Termos.")
     try:
-        checkbox = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((AppiumBy.CLASS_NAME, "android.widget.CheckBox"))
-        )
-        checkbox.click()
+        checkbox = ui.clicar(CHECKBOX, timeout=10)
         print("✅ Checkbox de termos clicado.")
         assert checkbox.get_attribute('checked') == 'true', "O checkbox não ficou marcado."
 
-        continuar_btn = driver.find_element(AppiumBy.XPATH, "//*[@text='Continuar']")
-        continuar_btn.click()
+        ui.clicar(Localizador.por_texto("Continuar"), timeout=5)
         print("✅ Botão 'Continuar' clicado após aceitar os termos.")
     except Exception as e:
         pytest.fail(f"Não foi possível interagir com a tela de Termos de Uso. Erro: {e}")
 
-def test_04_login(driver):
+def test_04_login(driver, ui):
     """ETAPA 4: Realiza o login com credenciais válidas."""
     print("DESC: ETAPA 4 - Login.")
-    USUARIO = "99999909914"
-    SENHA = "1234"
-    
     try:
-        campos_texto = WebDriverWait(driver, 10).until(
-            EC.presence_of_all_elements_located((AppiumBy.CLASS_NAME, "android.widget.EditText"))
-        )
+        campos_texto = ui.todos(CAMPO_TEXTO, minimo=2, timeout=10)
         assert len(campos_texto) >= 2, "Não foram encontrados campos suficientes para login."
 
         print("Preenchendo CPF/CNPJ...")
@@ -212,100 +271,87 @@ def test_04_login(driver):
         campos_texto[1].send_keys(SENHA)
         driver.hide_keyboard()
 
-        entrar_btn = driver.find_element(AppiumBy.XPATH, "//*[@text='Entrar']")
-        entrar_btn.click()
+        ui.clicar(BOTAO_ENTRAR, timeout=5)
         print("✅ Botão 'Entrar' clicado.")
 
         # Validação: Aguarda processamento do login
-        # Não validamos "Recarga" aqui pois pode haver telas intermediárias (Sim / Seleção de Rede)
-        time.sleep(5)
+        # Não validamos "Recarga" aqui pois pode haver telas intermediárias (Sim / Seleção de Rede):
+        # basta a primeira tela pós-login aparecer (um único page_source por consulta)
+        ui.qualquer([BOTAO_SIM, BOTAO_CONFIRMAR_REDE, BOTAO_RECARGA], timeout=15)
         print("✅ Login submetido com sucesso.")
     except Exception as e:
         pytest.fail(f"Falha durante o processo de login. Erro: {e}")
 
-def test_05_confirmacao_sim(driver):
+def test_05_confirmacao_sim(driver, ui):
     """ETAPA 5: Confirmação pós-login (Botão 'Sim')."""
     print("DESC: ETAPA 5 - Confirmação ('Sim').")
     try:
-        # Tenta encontrar o botão Sim.
-        sim_btn = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((AppiumBy.XPATH, "//*[@text='Sim' or @text='SIM']"))
-        )
-        sim_btn.click()
+        # O login já esperou a tela seguinte: se não é a do 'Sim', não espera por ele
+        if not Snapshot.capturar(driver).existe(BOTAO_SIM):
+            raise UiTimeout("tela de confirmação não exibida")
+        ui.clicar(BOTAO_SIM, timeout=10)
         print("✅ Botão 'Sim' clicado.")
     except Exception as e:
         print(f"⚠️ Aviso: Botão 'Sim' não encontrado (pode ter sido pulado ou login falhou): {e}")
 
-def test_06_selecao_rede(driver):
+def test_06_selecao_rede(driver, ui):
     """ETAPA 6: Seleção de Rede/Número."""
     print("DESC: ETAPA 6 - Selecionar Rede.")
     try:
+        # Aguarda a tela de rede ou a Home, verificando as duas no mesmo snapshot
+        encontrado, _ = ui.qualquer([BOTAO_RECARGA, BOTAO_CONFIRMAR_REDE, RADIO], timeout=10)
+        if encontrado is BOTAO_RECARGA:
+            print("✅ Home já exibida; seleção de rede não foi necessária.")
+            return
+
         # Tenta selecionar um item da lista (geralmente o número disponível)
-        # Procura por RadioButton ou CheckBox se houver
-        try:
-            opcao = driver.find_element(AppiumBy.CLASS_NAME, "android.widget.RadioButton")
+        opcao = ui.buscar(RADIO)
+        if opcao is not None:
             opcao.click()
             print("✅ Opção de rede selecionada.")
-        except:
+        else:
             print("ℹ️ Nenhuma opção de rádio encontrada, tentando continuar direto...")
 
         # Clicar em Confirmar/Avançar
-        confirmar_btn = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((AppiumBy.XPATH, "//*[@text='Confirmar' or @text='Avançar' or @text='Continuar']"))
-        )
-        confirmar_btn.click()
+        ui.clicar(BOTAO_CONFIRMAR_REDE, timeout=10)
         print("✅ Botão de confirmação de rede clicado.")
         
         # Valida chegada na Home (agora sim esperamos 'Recarga')
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((AppiumBy.XPATH, "//*[@text='Recarga']"))
-        )
+        ui.elemento(BOTAO_RECARGA, timeout=20)
         print("✅ Redirecionado para Home com sucesso.")
     except Exception as e:
         print(f"⚠️ Aviso: Etapa de seleção de rede não concluída (pode não ser necessária): {e}")
 
-def test_07_recarga(driver):
+def test_07_recarga(driver, ui):
     """ETAPA 7: Valida a navegação para a tela de Recarga e o retorno."""
     print("DESC: ETAPA 5 - Botão de Recarga.")
     try:
-        recarga_btn = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((AppiumBy.XPATH, "//*[@text='Recarga']"))
-        )
-        recarga_btn.click()
+        ui.clicar(BOTAO_RECARGA, timeout=10)
         print("✅ Botão 'Recarga' clicado.")
 
         # Valida se a tela de recarga abriu
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((AppiumBy.XPATH, "//*[contains(@text, 'valor')]"))
-        )
+        ui.elemento(TELA_VALOR_RECARGA, timeout=10)
         print("✅ Tela de recarga aberta.")
 
         driver.back()
         print("✅ Botão 'Voltar' pressionado.")
 
         # Valida se retornou para a Home
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((AppiumBy.XPATH, "//*[@text='Recarga']"))
-        )
+        ui.elemento(BOTAO_RECARGA, timeout=10)
         print("✅ Retornou para a tela principal com sucesso.")
     except Exception as e:
         pytest.fail(f"Falha no fluxo de Recarga. Erro: {e}")
 
-def test_08_menu(driver):
+def test_08_menu(driver, ui):
     """ETAPA 8: Valida a abertura e fechamento do menu."""
     print("DESC: ETAPA 6 - Menu.")
     try:
         # O botão de menu é geralmente o primeiro ImageButton na hierarquia
-        menu_btn = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((AppiumBy.CLASS_NAME, "android.widget.ImageButton"))
-        )
-        menu_btn.click()
+        ui.clicar(BOTAO_MENU, timeout=10)
         print("✅ Botão de menu clicado.")
 
         # Valida se o menu abriu procurando o item 'Perfil'
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((AppiumBy.XPATH, "//*[@text='Perfil']"))
-        )
+        ui.elemento(ITEM_PERFIL, timeout=10)
         print("✅ Menu aberto com sucesso.")
 
         driver.back() # Fecha o menu
@@ -313,39 +359,29 @@ def test_08_menu(driver):
     except Exception as e:
         pytest.fail(f"Falha ao interagir com o menu. Erro: {e}")
 
-def test_09_perfil(driver):
+def test_09_perfil(driver, ui):
     """ETAPA 9: Valida a navegação para a tela de Perfil e o retorno."""
     print("DESC: ETAPA 7 - Perfil.")
     try:
-        menu_btn = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((AppiumBy.CLASS_NAME, "android.widget.ImageButton"))
-        )
-        menu_btn.click()
-
-        perfil_btn = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((AppiumBy.XPATH, "//*[@text='Perfil']"))
-        )
-        perfil_btn.click()
+        ui.clicar(BOTAO_MENU, timeout=10)
+
+        ui.clicar(ITEM_PERFIL, timeout=10)
         print("✅ Navegou para a tela de Perfil.")
 
         # Valida se as informações do usuário aparecem
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((AppiumBy.XPATH, "//*[contains(@text, '99999909914')]"))
-        )
+        ui.elemento(Localizador.por_texto_contendo(USUARIO), timeout=10)
         print("✅ Informações do usuário exibidas na tela de Perfil.")
 
         driver.back()
         print("✅ Botão 'Voltar' pressionado.")
 
         # Valida se retornou para a Home
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((AppiumBy.XPATH, "//*[@text='Recarga']"))
-        )
+        ui.elemento(BOTAO_RECARGA, timeout=10)
         print("✅ Retornou para a tela principal com sucesso.")
     except Exception as e:
         pytest.fail(f"Falha no fluxo de Perfil. Erro: {e}")
 
-def test_10_fluxo_completo(driver):
+def test_10_fluxo_completo(driver, ui):
     """VALIDAÇÃO FINAL: Verifica estabilidade geral e captura evidência."""
     print("DESC: VALIDAÇÃO FINAL - Teste de Navegação e Estabilidade.")
     
@@ -353,11 +389,14 @@ def test_10_fluxo_completo(driver):
     print("Enviando app para segundo plano por 5 segundos...")
     driver.background_app(5)
     assert driver.current_activity is not None, "O app fechou inesperadamente após voltar do background."
+    # Mesma tela de antes (Home) depois de voltar ao primeiro plano
+    ui.elemento(BOTAO_RECARGA, timeout=10)
     print("✅ App permaneceu estável em background.")
 
     # 2. Captura de evidência final
-    os.makedirs("storage", exist_ok=True)
-    caminho = "storage/screenshot_final.png"
+    # A plataforma informa o caminho dentro da pasta do job (anexado ao PDF do job)
+    caminho = os.getenv("TARGET_SCREENSHOT_PATH", "storage/screenshot_final.png")
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
     driver.save_screenshot(caminho)
     assert os.path.exists(caminho), "Falha ao salvar screenshot final."
     print(f"✅ Evidência final capturada em: {caminho}")
\ No newline at end of file
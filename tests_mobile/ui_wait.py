@@ -0,0 +1,222 @@
+# Arquivo: tests_mobile/ui_wait.py
+"""
+Camada de espera orientada a eventos para os testes mobile.
+
+- Localizadores por resource-id, accessibility-id e UiSelector: resolvidos pelo
+  próprio UiAutomator no aparelho, sem o dump completo da hierarquia que cada
+  consulta XPath provoca.
+- Espera adaptativa: consulta rápido logo após a ação (quando a tela costuma
+  responder) e vai espaçando as consultas até o tempo limite, em vez de sleeps fixos.
+- Snapshot da hierarquia: um único `page_source` atende várias verificações.
+  O dump completo pesa no aparelho, então as esperas por snapshot começam com
+  um intervalo maior. O snapshot também é construído a partir de um XML
+  gravado, então os localizadores podem ser verificados sem dispositivo.
+"""
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from appium.webdriver.common.appiumby import AppiumBy
+except ImportError: # Permite usar o Snapshot sem o cliente do Appium instalado
+    AppiumBy = None
+
+# Intervalos da espera adaptativa (segundos)
+INTERVALO_INICIAL = 0.1
+INTERVALO_MAXIMO = 1.0
+FATOR_INTERVALO = 1.5
+# Esperas que capturam o page_source a cada consulta
+INTERVALO_INICIAL_SNAPSHOT = 0.5
+
+
+def _escapar(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class Localizador:
+    """
+    Forma de encontrar um elemento: como o Appium o busca no aparelho (`by`, `valor`)
+    e como reconhecê-lo em um snapshot da hierarquia (`corresponde`).
+    """
+
+    def __init__(self, by: str, valor: str, atributo: str, esperado: str, regex: bool = False, descricao: str = ""):
+        self.by = by
+        self.valor = valor
+        self.atributo = atributo
+        self.esperado = esperado
+        self.regex = re.compile(esperado) if regex else None
+        self.descricao = descricao or valor
+
+    def corresponde(self, atributos: Dict[str, str]) -> bool:
+        atual = atributos.get(self.atributo)
+        if atual is None:
+            return False
+        if self.regex is not None:
+            return self.regex.fullmatch(atual) is not None
+        return atual == self.esperado
+
+    def __repr__(self) -> str:
+        return f"Localizador({self.descricao})"
+
+    # --- Construtores ---
+    @staticmethod
+    def por_id(resource_id: str) -> "Localizador":
+        return Localizador(_by("ID"), resource_id, "resource-id", resource_id, descricao=f"id={resource_id}")
+
+    @staticmethod
+    def por_acessibilidade(descricao: str) -> "Localizador":
+        return Localizador(_by("ACCESSIBILITY_ID"), descricao, "content-desc", descricao, descricao=f"a11y={descricao}")
+
+    @staticmethod
+    def por_texto(*textos: str) -> "Localizador":
+        """Texto exato (um ou vários alternativos), via UiSelector."""
+        if len(textos) == 1:
+            seletor = f'new UiSelector().text("{_escapar(textos[0])}")'
+            return Localizador(_by("ANDROID_UIAUTOMATOR"), seletor, "text", textos[0], descricao=f"texto={textos[0]}")
+        padrao = "|".join(re.escape(t) for t in textos)
+        seletor = f'new UiSelector().textMatches("{_escapar(padrao)}")'
+        return Localizador(_by("ANDROID_UIAUTOMATOR"), seletor, "text", padrao, regex=True, descricao=f"texto={'|'.join(textos)}")
+
+    @staticmethod
+    def por_texto_contendo(trecho: str) -> "Localizador":
+        seletor = f'new UiSelector().textContains("{_escapar(trecho)}")'
+        padrao = f".*{re.escape(trecho)}.*"
+        return Localizador(_by("ANDROID_UIAUTOMATOR"), seletor, "text", padrao, regex=True, descricao=f"texto~={trecho}")
+
+    @staticmethod
+    def por_classe(classe: str) -> "Localizador":
+        seletor = f'new UiSelector().className("{_escapar(classe)}")'
+        return Localizador(_by("ANDROID_UIAUTOMATOR"), seletor, "class", classe, descricao=f"classe={classe}")
+
+
+def _by(nome: str) -> str:
+    if AppiumBy is not None:
+        return getattr(AppiumBy, nome)
+    return {"ID": "id", "ACCESSIBILITY_ID": "accessibility id", "ANDROID_UIAUTOMATOR": "-android uiautomator"}[nome]
+
+
+class Snapshot:
+    """Hierarquia da tela capturada uma única vez (page_source) para várias verificações."""
+
+    def __init__(self, xml: str):
+        self.xml = xml
+        raiz = ET.fromstring(xml.encode("utf-8") if isinstance(xml, str) else xml)
+        self.elementos: List[Dict[str, str]] = [dict(no.attrib, **{"class": no.get("class", no.tag)}) for no in raiz.iter()]
+
+    @staticmethod
+    def capturar(driver) -> "Snapshot":
+        return Snapshot(driver.page_source)
+
+    def encontrar(self, localizador: Localizador) -> Optional[Dict[str, str]]:
+        return next((e for e in self.elementos if localizador.corresponde(e)), None)
+
+    def encontrar_todos(self, localizador: Localizador) -> List[Dict[str, str]]:
+        return [e for e in self.elementos if localizador.corresponde(e)]
+
+    def existe(self, localizador: Localizador) -> bool:
+        return self.encontrar(localizador) is not None
+
+    def contem_texto(self, trecho: str) -> bool:
+        return any(trecho in e.get("text", "") for e in self.elementos)
+
+    def textos(self) -> List[str]:
+        return [e["text"] for e in self.elementos if e.get("text")]
+
+
+class UiTimeout(AssertionError):
+    pass
+
+
+def esperar(
+    condicao: Callable[[], object],
+    timeout: float,
+    descricao: str = "condição",
+    intervalo_inicial: float = INTERVALO_INICIAL,
+    intervalo_maximo: float = INTERVALO_MAXIMO,
+):
+    """
+    Chama `condicao()` até retornar algo verdadeiro (que é devolvido) ou o tempo acabar.
+    O intervalo entre as consultas cresce de `intervalo_inicial` até `intervalo_maximo`.
+    """
+    prazo = time.monotonic() + timeout
+    intervalo = intervalo_inicial
+    ultimo_erro = None
+    while True:
+        try:
+            resultado = condicao()
+            if resultado:
+                return resultado
+        except Exception as e:
+            ultimo_erro = e
+        restante = prazo - time.monotonic()
+        if restante <= 0:
+            detalhe = f" Último erro: {ultimo_erro}" if ultimo_erro else ""
+            raise UiTimeout(f"Tempo esgotado ({timeout}s) aguardando {descricao}.{detalhe}")
+        time.sleep(min(intervalo, restante))
+        intervalo = min(intervalo * FATOR_INTERVALO, intervalo_maximo)
+
+
+class UiWait:
+    """Esperas sobre o driver do Appium usando os localizadores e a espera adaptativa."""
+
+    def __init__(self, driver, timeout_padrao: float = 10):
+        self.driver = driver
+        self.timeout_padrao = timeout_padrao
+
+    def buscar(self, localizador: Localizador):
+        elementos = self.driver.find_elements(localizador.by, localizador.valor)
+        return elementos[0] if elementos else None
+
+    def elemento(self, localizador: Localizador, timeout: Optional[float] = None):
+        """Primeiro elemento presente na tela."""
+        return esperar(lambda: self.buscar(localizador), timeout or self.timeout_padrao, repr(localizador))
+
+    def todos(self, localizador: Localizador, minimo: int = 1, timeout: Optional[float] = None) -> list:
+        def buscar():
+            elementos = self.driver.find_elements(localizador.by, localizador.valor)
+            return elementos if len(elementos) >= minimo else None
+        return esperar(buscar, timeout or self.timeout_padrao, f"{minimo}x {localizador!r}")
+
+    def textos(self, localizador: Localizador) -> List[str]:
+        """Textos dos elementos do localizador, sem o dump completo da hierarquia."""
+        return [elemento.text for elemento in self.driver.find_elements(localizador.by, localizador.valor)]
+
+    def clicavel(self, localizador: Localizador, timeout: Optional[float] = None):
+        def buscar():
+            elemento = self.buscar(localizador)
+            return elemento if elemento is not None and elemento.is_enabled() and elemento.is_displayed() else None
+        return esperar(buscar, timeout or self.timeout_padrao, f"{localizador!r} clicável")
+
+    def clicar(self, localizador: Localizador, timeout: Optional[float] = None):
+        elemento = self.clicavel(localizador, timeout)
+        elemento.click()
+        return elemento
+
+    def qualquer(self, localizadores: Sequence[Localizador], timeout: Optional[float] = None) -> Tuple[Localizador, Dict[str, str]]:
+        """
+        Aguarda a primeira de várias telas possíveis; cada consulta é um único
+        page_source verificado contra todos os localizadores.
+        Retorna (localizador encontrado, atributos do elemento).
+        """
+        def verificar():
+            snapshot = Snapshot.capturar(self.driver)
+            for localizador in localizadores:
+                atributos = snapshot.encontrar(localizador)
+                if atributos is not None:
+                    return localizador, atributos
+            return None
+        return esperar(
+            verificar, timeout or self.timeout_padrao, " ou ".join(repr(l) for l in localizadores),
+            intervalo_inicial=INTERVALO_INICIAL_SNAPSHOT,
+        )
+
+    def snapshot_quando(self, condicao: Callable[[Snapshot], bool], timeout: Optional[float] = None, descricao: str = "tela") -> Snapshot:
+        """Aguarda um snapshot que satisfaça `condicao` e o devolve para as verificações seguintes."""
+        def verificar():
+            snapshot = Snapshot.capturar(self.driver)
+            return snapshot if condicao(snapshot) else None
+        return esperar(verificar, timeout or self.timeout_padrao, descricao, intervalo_inicial=INTERVALO_INICIAL_SNAPSHOT)
+
+    def ausente(self, localizador: Localizador, timeout: Optional[float] = None) -> bool:
+        return esperar(lambda: self.buscar(localizador) is None, timeout or self.timeout_padrao, f"{localizador!r} sumir")
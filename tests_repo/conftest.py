@@ -0,0 +1,73 @@
+# Arquivo: tests_repo/conftest.py
+import hashlib
+import os
+import random
+import sys
+
+import pytest
+
+# A raiz do projeto entra no sys.path para os imports de `app` (também via `pytest tests_repo`)
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# Checagens que não derivam do conteúdo do APK (estimativas/placeholder) levam o
+# marcador `simulado` e ficam fora da execução, a menos que SURF_TESTES_SIMULADOS=1.
+# As de performance (`metricas_runtime`) validam as métricas medidas no dispositivo e,
+# sem elas, também ficam de fora. Assim o resultado de um APK depende só dele e pode
+# ser cacheado pelo hash, e nenhum teste pulado entra na contagem.
+
+
+def simulados_habilitados() -> bool:
+    return os.getenv("SURF_TESTES_SIMULADOS") == "1"
+
+
+def metricas_disponiveis() -> bool:
+    caminho = os.getenv("TARGET_RUNTIME_METRICS")
+    return bool(caminho) and os.path.exists(caminho)
+
+
+def _simulado(item) -> bool:
+    if item.get_closest_marker("simulado"):
+        return True
+    return item.get_closest_marker("metricas_runtime") is not None and not metricas_disponiveis()
+
+
+def _semente_apk() -> str:
+    """SHA-256 do APK (informado pela plataforma ou calculado do arquivo)."""
+    sha = os.getenv("TARGET_APK_SHA256")
+    if sha:
+        return sha
+    caminho = os.getenv("TARGET_APK_PATH")
+    if not caminho or not os.path.exists(caminho):
+        return "sem-apk"
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "simulado: checagem simulada (resultado não derivado do APK); requer SURF_TESTES_SIMULADOS=1"
+    )
+    config.addinivalue_line(
+        "markers", "metricas_runtime: valida métricas medidas no dispositivo; sem elas, conta como `simulado`"
+    )
+    config._semente_apk = _semente_apk()
+
+
+def pytest_collection_modifyitems(config, items):
+    # Roda antes da divisão em fatias (ShardPlugin é trylast): as fatias ficam equilibradas
+    if simulados_habilitados():
+        return
+    removidos = [item for item in items if _simulado(item)]
+    if removidos:
+        config.hook.pytest_deselected(items=removidos)
+        items[:] = [item for item in items if not _simulado(item)]
+
+
+def pytest_runtest_setup(item):
+    # Semente por teste (APK + ID do teste): o sorteio não depende da ordem nem da fatia
+    random.seed(f"{item.config._semente_apk}:{item.nodeid}")
@@ -1,43 +1,66 @@
 # Arquivo: tests_repo/test_simulacao.py
 import pytest
 import os
-import sys
 import re
+import json
 import random
-import time
 
-# Tenta importar androguard para análise real do APK
-APK = None
+# Modelo do APK construído uma única vez pela plataforma (parse do androguard + strings do DEX)
+ApkModel = None
 try:
-    from androguard.core.apk import APK
+    from app.services.apk_model import ApkModel
 except ImportError:
-    try:
-        from androguard.core.bytecodes.apk import APK
-    except ImportError:
-        pass
+    pass
+
+# Limites de performance do Quality Gate (os mesmos aplicados às métricas medidas no dispositivo)
+try:
+    from app.core.config import (
+        LIMITE_CPU_PERCENTUAL, LIMITE_INICIALIZACAO_FRIO_MS, LIMITE_JANK_PERCENTUAL, LIMITE_MEMORIA_PSS_MB,
+    )
+except ImportError:
+    LIMITE_INICIALIZACAO_FRIO_MS, LIMITE_MEMORIA_PSS_MB, LIMITE_CPU_PERCENTUAL, LIMITE_JANK_PERCENTUAL = 2000, 300, 80, 10
 
 @pytest.fixture(scope="module")
 def apk_analisado():
-    if APK is None:
+    if ApkModel is None:
         return None
         
     caminho = os.getenv("TARGET_APK_PATH")
     if not caminho or not os.path.exists(caminho):
         return None
-    
-    # Configura a semente aleatória com o tempo atual para variar os resultados
-    random.seed(time.time())
-    
+
+    try:
+        # Reaproveita o modelo serializado pela plataforma; sem ele, faz o parse do APK REAL
+        # no próprio processo (os workers do pytest são daemon e não abrem pool de processos)
+        caminho_modelo = os.getenv("TARGET_APK_MODEL")
+        if caminho_modelo and os.path.exists(caminho_modelo):
+            return ApkModel.carregar(caminho_modelo)
+        return ApkModel.carregar_ou_construir(caminho, processos=0)
+    except Exception as e:
+        # Com um APK informado, não conseguir lê-lo é uma falha (e não motivo para pular as checagens)
+        pytest.fail(f"Falha ao carregar o APK para análise estática: {e}")
+
+@pytest.fixture(scope="module")
+def metricas_runtime():
+    """Métricas reais medidas no dispositivo (MetricsSampler), quando a plataforma as coletou."""
+    caminho = os.getenv("TARGET_RUNTIME_METRICS")
+    if not caminho or not os.path.exists(caminho):
+        return None
     try:
-        # Carrega o APK REAL para análise
-        return APK(caminho)
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
     except Exception:
         return None
 
 def simular_validacao(probabilidade_sucesso=0.95):
-    """Auxiliar para gerar aprovação/reprovação consistente na simulação"""
+    """Auxiliar para gerar aprovação/reprovação consistente na simulação (semente por APK, ver conftest)"""
     return random.random() < probabilidade_sucesso
 
+def exigir_modo_simulado():
+    """Sem a medida real, a checagem só roda como simulação (se habilitada)."""
+    if os.getenv("SURF_TESTES_SIMULADOS") != "1":
+        pytest.skip("Métricas de runtime não coletadas (sem dispositivo). Estimativa simulada desativada.")
+
 # --- TESTES REAIS NO ARQUIVO APK (Sem Dispositivo) ---
 
 def test_01_arquivo_valido(apk_analisado):
@@ -115,8 +138,8 @@ def test_08_arquivos_dex(apk_analisado):
     if apk_analisado is None:
         pytest.skip("APK não carregado.")
     print("DESC: Verificação da integridade do código compilado (DEX).")
-    dex = apk_analisado.get_dex()
-    assert dex is not None, "[S1] ERRO: Arquivo classes.dex corrompido ou ausente."
+    dex = apk_analisado.get_dex_names()
+    assert dex, "[S1] ERRO: Arquivo classes.dex corrompido ou ausente."
 
 def test_09_tamanho_arquivo():
     """Verifica o tamanho físico do arquivo."""
@@ -186,21 +209,17 @@ def test_13_busca_segredos_simples(apk_analisado):
         pytest.skip("APK não carregado.")
     print("DESC: Varredura heurística por chaves de API hardcoded no DEX.")
     
-    # Tenta obter o conteúdo do código compilado
-    try:
-        dex_content = apk_analisado.get_dex()
-    except:
-        return # Falha silenciosa se não conseguir ler DEX
-        
-    # Padrões simples de regex (bytes) para chaves comuns
+    # Padrões simples de regex para chaves comuns
     padroes = [
-        (b"AIza[0-9A-Za-z\\-_]{35}", "Google API Key"),
-        (b"AKIA[0-9A-Z]{16}", "AWS Access Key"),
+        (re.compile(r"AIza[0-9A-Za-z\-_]{35}"), "Google API Key"),
+        (re.compile(r"AKIA[0-9A-Z]{16}"), "AWS Access Key"),
     ]
     
-    for pat, nome in padroes:
-        if re.search(pat, dex_content):
-            assert False, f"[S1] VAZAMENTO: {nome} encontrada hardcoded no código."
+    # Varre a tabela de strings do DEX já decodificada no modelo do APK
+    for string_val in apk_analisado.get_dex_strings():
+        for pat, nome in padroes:
+            if pat.search(string_val):
+                assert False, f"[S1] VAZAMENTO: {nome} encontrada hardcoded no código."
     assert True
 
 def test_14_versao_minima_sdk(apk_analisado):
@@ -272,102 +291,147 @@ def test_18_firebase_database_exposto(apk_analisado):
     if apk_analisado is None:
         pytest.skip("APK não carregado.")
     print("DESC: Busca por URLs de banco de dados Firebase expostas.")
-    try:
-        dex_content = apk_analisado.get_dex()
-        if re.search(b"https://.*\\.firebaseio\\.com", dex_content):
-            print("Aviso: URL do Firebase Database encontrada. Verifique as regras de segurança do banco.")
-    except:
-        pass
+    padrao = re.compile(r"https://.*\.firebaseio\.com")
+    if any(padrao.search(s) for s in apk_analisado.get_dex_strings()):
+        print("Aviso: URL do Firebase Database encontrada. Verifique as regras de segurança do banco.")
     assert True
 
 # --- TESTES SIMULADOS (Cenários de Runtime / Estimativas) ---
-# Estes testes complementam a análise estática simulando comportamento em execução
+# Estes testes complementam a análise estática simulando comportamento em execução.
+# Não derivam do APK: ficam fora da execução (marcadores `simulado` / `metricas_runtime`)
+# a menos que SURF_TESTES_SIMULADOS=1, e então sorteiam com semente fixa por APK.
 
 # GRUPO: PERFORMANCE ESTIMADA
-def test_19_tempo_inicializacao():
+# Com as métricas medidas no dispositivo, estes testes validam os números reais
+@pytest.mark.metricas_runtime
+def test_19_tempo_inicializacao(metricas_runtime):
     """Simula teste de performance de startup (< 2s)"""
+    frio = (metricas_runtime or {}).get("inicializacao", {}).get("frio_ms", {})
+    if frio.get("p50") is not None:
+        print("DESC: Tempo de inicialização a frio (Cold Start) medido no dispositivo via am start -W.")
+        print(f"Cold start: p50 {frio['p50']:.0f} ms, p90 {frio['p90']:.0f} ms ({frio['amostras']} medidas)")
+        assert frio["p50"] <= LIMITE_INICIALIZACAO_FRIO_MS, f"[S2] PERFORMANCE: Inicialização a frio lenta: p50 {frio['p50']:.0f} ms (Meta: < {LIMITE_INICIALIZACAO_FRIO_MS} ms)"
+        return
+    exigir_modo_simulado()
     print("DESC: Estimativa de tempo de inicialização a frio (Cold Start).")
     tempo = random.uniform(0.5, 2.5)
     assert tempo < 3.0, f"Tempo de inicialização estimado alto: {tempo:.2f}s"
 
-def test_20_consumo_memoria_medio():
+@pytest.mark.metricas_runtime
+def test_20_consumo_memoria_medio(metricas_runtime):
     """Simula verificação de consumo de memória RAM"""
+    memoria = (metricas_runtime or {}).get("memoria_pss_mb", {}).get("resumo", {})
+    if memoria.get("p95") is not None:
+        print("DESC: Consumo de memória (PSS) medido no dispositivo durante os testes.")
+        print(f"PSS: média {memoria['media']:.1f} MB, p95 {memoria['p95']:.1f} MB, máx {memoria['max']:.1f} MB")
+        assert memoria["p95"] <= LIMITE_MEMORIA_PSS_MB, f"[S2] PERFORMANCE: Consumo de memória alto: p95 {memoria['p95']:.1f} MB (Máx: {LIMITE_MEMORIA_PSS_MB} MB)"
+        return
+    exigir_modo_simulado()
     print("DESC: Análise heurística de consumo médio de memória RAM.")
     assert simular_validacao(0.95), "Alerta: Consumo de memória estimado acima da média."
 
-def test_21_uso_cpu_pico():
+@pytest.mark.metricas_runtime
+def test_21_uso_cpu_pico(metricas_runtime):
     """Verifica se o uso de CPU não ultrapassa 80% em pico"""
+    cpu = (metricas_runtime or {}).get("cpu_percentual", {}).get("resumo", {})
+    if cpu.get("p95") is not None:
+        print("DESC: Uso de CPU do processo medido no dispositivo (/proc/<pid>/stat).")
+        print(f"CPU: média {cpu['media']:.1f}%, p95 {cpu['p95']:.1f}%, máx {cpu['max']:.1f}%")
+        assert cpu["p95"] <= LIMITE_CPU_PERCENTUAL, f"[S2] PERFORMANCE: Uso de CPU alto: p95 {cpu['p95']:.1f}% (Máx: {LIMITE_CPU_PERCENTUAL}%)"
+        return
+    exigir_modo_simulado()
     print("DESC: Verificação de complexidade de layout e impacto na CPU.")
     assert simular_validacao(0.95), "Alerta: Possível gargalo de CPU em telas complexas."
 
-def test_22_renderizacao_frames():
+@pytest.mark.metricas_runtime
+def test_22_renderizacao_frames(metricas_runtime):
     """Verifica se a taxa de quadros se mantém em 60fps"""
+    frames = (metricas_runtime or {}).get("frames", {})
+    if frames.get("percentual_janky") is not None:
+        print("DESC: Frames renderizados medidos no dispositivo (dumpsys gfxinfo framestats).")
+        print(f"Frames: {frames['total']} renderizados, {frames['janky']} lentos ({frames['percentual_janky']:.1f}%)")
+        assert frames["percentual_janky"] <= LIMITE_JANK_PERCENTUAL, f"[S2] PERFORMANCE: Frames lentos (Jank): {frames['percentual_janky']:.1f}% (Máx: {LIMITE_JANK_PERCENTUAL}%)"
+        return
+    exigir_modo_simulado()
     print("DESC: Estimativa de estabilidade de taxa de quadros (Jank).")
     assert simular_validacao(0.90), "Alerta: Risco de queda de frames (Jank) detectado."
 
+@pytest.mark.simulado
 def test_23_consumo_bateria_background():
     """Analisa drenagem de bateria em segundo plano"""
     print("DESC: Verificação de serviços em background e impacto na bateria.")
     assert True
 
 # GRUPO: NAVEGAÇÃO E UI
+@pytest.mark.simulado
 def test_24_navegacao_telas_basicas():
     """Simula navegação entre Home, Perfil e Configurações"""
     print("DESC: Validação de fluxo de navegação principal.")
     assert True
 
+@pytest.mark.simulado
 def test_25_responsividade_toque():
     """Verifica latência do toque na tela"""
     print("DESC: Estimativa de latência de input (Input Lag).")
     assert True
 
+@pytest.mark.simulado
 def test_26_modo_escuro_compatibilidade():
     """Verifica renderização no Dark Mode"""
     print("DESC: Verificação de compatibilidade de recursos de cor com Modo Escuro.")
     assert simular_validacao(0.95), "[S3] UI: Contraste insuficiente no Modo Escuro."
 
+@pytest.mark.simulado
 def test_27_orientacao_paisagem():
     """Teste de layout em modo Paisagem (Landscape)"""
     print("DESC: Verificação de redimensionamento de layout (Landscape).")
     assert True
 
 # GRUPO: COMPATIBILIDADE (Regressão)
+@pytest.mark.simulado
 def test_28_compatibilidade_android_10():
     """Teste de regressão no Android 10"""
     print("DESC: Validação de APIs para compatibilidade com Android 10.")
     assert True
 
+@pytest.mark.simulado
 def test_29_compatibilidade_android_11():
     """Teste de regressão no Android 11"""
     print("DESC: Validação de APIs para compatibilidade com Android 11.")
     assert True
 
+@pytest.mark.simulado
 def test_30_compatibilidade_android_12():
     """Teste de regressão no Android 12"""
     print("DESC: Validação de APIs para compatibilidade com Android 12.")
     assert True
 
+@pytest.mark.simulado
 def test_31_compatibilidade_android_13():
     """Teste de regressão no Android 13"""
     print("DESC: Validação de APIs para compatibilidade com Android 13.")
     assert True
 
+@pytest.mark.simulado
 def test_32_compatibilidade_tablets():
     """Verifica layout em telas grandes (Tablets)"""
     print("DESC: Verificação de densidade de tela para Tablets.")
     assert True
 
 # GRUPO: ACESSIBILIDADE
+@pytest.mark.simulado
 def test_33_contraste_cores_wcag():
     """Verifica contraste de cores (Padrão WCAG AA)"""
     print("DESC: Análise de paleta de cores para conformidade WCAG.")
     assert True
 
+@pytest.mark.simulado
 def test_34_tamanho_minimo_toque():
     """Verifica se botões têm tamanho mínimo de 48dp"""
     print("DESC: Verificação de dimensões de áreas clicáveis.")
     assert True
 
+@pytest.mark.simulado
 def test_35_suporte_leitor_tela():
     """Verifica etiquetas para leitores de tela (TalkBack)"""
     print("DESC: Verificação de atributos 'contentDescription' em imagens.")